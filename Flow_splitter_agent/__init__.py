@@ -1 +1,2 @@
-from .check_question import *
\ No newline at end of file
+from .check_question import *
+from .embedding_router import ROUTING_MODE, Embedding_Router, route_question
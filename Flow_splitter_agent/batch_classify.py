@@ -0,0 +1,201 @@
+"""
+Phân loại hàng loạt câu hỏi vật lý và đo độ chính xác / tốc độ.
+
+Áp dụng cùng bộ rules với classify_physics_question nhưng trên cả một cột pandas
+bằng các phép xử lý chuỗi vectorized (str.strip, str.lower, str.contains), file
+lớn được chia thành nhiều phần chạy song song trong process pool. Kết quả gồm
+dự đoán, confusion matrix, độ chính xác và throughput (câu/giây) trong một report.
+
+Cách chạy:
+    python -m Flow_splitter_agent.batch_classify questions.csv --output report.json
+    python -m Flow_splitter_agent.batch_classify questions.jsonl --label_column type --workers 8
+
+Author: Physics Problem Solving System Team
+Version: 1.0.0
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import (
+    Dict,
+    List,
+    Optional
+)
+import argparse
+import json
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from .check_question import (
+    CALC_CONTEXT,
+    CALC_VERBS,
+    MATH_SYMBOLS,
+    MULTIPLE_CHOICE_PATTERNS,
+    THEORY_KEYWORDS,
+    UNITS,
+    _MEDIUM_REGEXES,
+    _MULTIPLE_CHOICE_REGEX,
+    _STRONG_REGEXES
+)
+
+LABELS : List[str] = ["THEORY", "PRACTICE", "MULTIPLE_CHOICE"]
+
+# Dưới số câu này thì chạy trong process hiện tại (chi phí khởi tạo pool lớn hơn lợi ích)
+MIN_ROWS_PARALLEL : int = 20000
+
+
+def _alternation(keywords : List[str]) -> "re.Pattern":
+    # Regex (kw1|kw2|...) tìm chuỗi con giống phép `keyword in text`
+    return re.compile("|".join(re.escape(keyword) for keyword in sorted(keywords, key=len, reverse=True)))
+
+
+_MULTIPLE_CHOICE_KEYWORDS = _alternation(MULTIPLE_CHOICE_PATTERNS)
+_THEORY_KEYWORDS = _alternation(THEORY_KEYWORDS)
+_CALC_VERBS = _alternation(CALC_VERBS)
+_UNITS = _alternation(UNITS)
+_MATH_SYMBOLS = _alternation(MATH_SYMBOLS)
+_CALC_CONTEXT = _alternation(CALC_CONTEXT)
+
+
+def classify_series(questions : pd.Series) -> pd.Series:
+    """
+    Phân loại cả một cột câu hỏi, kết quả giống classify_physics_question trên từng câu.
+
+    Args:
+        questions: pandas Series chứa câu hỏi
+
+    Returns:
+        pandas Series nhãn (THEORY, PRACTICE, MULTIPLE_CHOICE), cùng index với đầu vào
+    """
+    # Ép về object để str.contains dùng module re của Python (\\d, \\s hiểu Unicode)
+    # thay vì regex của pyarrow, đảm bảo kết quả giống hệt bản từng câu
+    question_clean : pd.Series = questions.fillna("").astype(object).astype(str).str.strip()
+    question_lower : pd.Series = question_clean.str.lower()
+
+    labels : np.ndarray = np.full(len(questions), "THEORY", dtype=object)
+
+    # Mỗi rule chỉ áp dụng trên các câu chưa được quyết định ở rule trước (giống thứ tự ưu tiên
+    # trong classify_physics_question), nên các rule sau chạy trên tập câu ngày càng nhỏ
+    undecided : np.ndarray = (question_clean != "").to_numpy(dtype=bool, copy=True)
+
+    def contains(series : pd.Series, regex : "re.Pattern", mask : np.ndarray) -> np.ndarray:
+        result : np.ndarray = np.zeros(len(series), dtype=bool)
+        if mask.any():
+            result[mask] = series[mask].str.contains(regex, regex=True).to_numpy(dtype=bool)
+        return result
+
+    # Priority 1: multiple choice
+    is_multiple_choice : np.ndarray = contains(question_clean, _MULTIPLE_CHOICE_KEYWORDS, undecided)
+    is_multiple_choice |= contains(question_clean, _MULTIPLE_CHOICE_REGEX, undecided & ~is_multiple_choice)
+    labels[is_multiple_choice] = "MULTIPLE_CHOICE"
+    undecided &= ~is_multiple_choice
+
+    # Priority 2: theory keywords
+    undecided &= ~contains(question_lower, _THEORY_KEYWORDS, undecided)
+
+    # Priority 3: một chỉ số 4 điểm là đủ ngưỡng PRACTICE
+    is_practice : np.ndarray = contains(question_lower, _CALC_VERBS, undecided)
+    for regex in _STRONG_REGEXES:
+        is_practice |= contains(question_clean, regex, undecided & ~is_practice)
+    undecided &= ~is_practice
+
+    practice_score : np.ndarray = (
+        contains(question_lower, _UNITS, undecided).astype(int)
+        + contains(question_clean, _MATH_SYMBOLS, undecided)
+        + contains(question_lower, _CALC_CONTEXT, undecided)
+    )
+    for regex in _MEDIUM_REGEXES:
+        practice_score += 2 * contains(question_clean, regex, undecided & (practice_score < 3))
+    is_practice |= undecided & (practice_score >= 3)
+
+    labels[is_practice] = "PRACTICE"
+    return pd.Series(labels, index=questions.index, dtype=object)
+
+
+def classify_parallel(questions : pd.Series, workers : Optional[int] = None) -> pd.Series:
+    """
+    Phân loại cột câu hỏi, chia thành nhiều phần chạy trong process pool nếu dữ liệu lớn.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(questions) < MIN_ROWS_PARALLEL:
+        return classify_series(questions)
+
+    size : int = -(-len(questions) // (workers * 4))
+    parts : List[pd.Series] = [questions.iloc[i:i + size] for i in range(0, len(questions), size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return pd.concat(list(executor.map(classify_series, parts)))
+
+
+def read_questions(path : str) -> pd.DataFrame:
+    """Đọc file .csv hoặc .jsonl thành DataFrame"""
+    if path.endswith(".jsonl"):
+        return pd.read_json(path, lines=True, dtype=False)
+    return pd.read_csv(path, keep_default_na=False)
+
+
+def build_report(predictions : pd.Series, labels : Optional[pd.Series], seconds : float) -> Dict:
+    """
+    Tạo report gồm dự đoán, số lượng mỗi nhãn, throughput và (nếu có nhãn đúng)
+    confusion matrix, độ chính xác tổng và theo từng nhãn.
+    """
+    report : Dict = {
+        "num_questions": int(len(predictions)),
+        "seconds": seconds,
+        "questions_per_second": len(predictions) / seconds if seconds else 0.0,
+        "prediction_counts": {label: int((predictions == label).sum()) for label in LABELS},
+    }
+
+    if labels is not None:
+        labels = labels.astype(str).str.strip().str.upper()
+        matrix : pd.DataFrame = pd.crosstab(labels, predictions).reindex(index=LABELS, columns=LABELS, fill_value=0)
+        correct : pd.Series = labels == predictions
+        report["accuracy"] = float(correct.mean()) if len(correct) else 0.0
+        report["accuracy_per_label"] = {
+            label: float(correct[labels == label].mean()) if (labels == label).any() else None
+            for label in LABELS
+        }
+        # confusion_matrix[nhãn đúng][nhãn dự đoán]
+        report["confusion_matrix"] = {
+            label: {predicted: int(matrix.loc[label, predicted]) for predicted in LABELS}
+            for label in LABELS
+        }
+
+    report["predictions"] = predictions.tolist()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Phân loại hàng loạt câu hỏi vật lý")
+    parser.add_argument("path", help="File .csv hoặc .jsonl")
+    parser.add_argument("--question_column", default="question")
+    parser.add_argument("--label_column", default="label", help="Cột nhãn đúng (bỏ qua nếu không có)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default="classify_report.json")
+    args = parser.parse_args()
+
+    data : pd.DataFrame = read_questions(args.path)
+
+    start : float = time.perf_counter()
+    predictions : pd.Series = classify_parallel(data[args.question_column], workers=args.workers)
+    seconds : float = time.perf_counter() - start
+
+    labels : Optional[pd.Series] = data[args.label_column] if args.label_column in data.columns else None
+    report : Dict = build_report(predictions, labels, seconds)
+    report["path"] = args.path
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+
+    print(f"Số câu hỏi: {report['num_questions']}")
+    print(f"Throughput: {report['questions_per_second']:.0f} câu/giây")
+    if "accuracy" in report:
+        print(f"Độ chính xác: {report['accuracy']:.2%}")
+        print(pd.DataFrame(report["confusion_matrix"]).T.to_string())
+    print(f"Đã ghi report: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Micro-benchmark cho classify_physics_question.
+
+So sánh thời gian phân loại mỗi câu hỏi giữa bản gốc (check_question_reference)
+và bản compiled (automaton Aho–Corasick + regex compile sẵn), đồng thời kiểm tra
+hai bản cho ra cùng kết quả trên mọi câu hỏi.
+
+Cách chạy:
+    python -m Flow_splitter_agent.benchmark
+    python -m Flow_splitter_agent.benchmark --questions questions.csv --repeat 20
+    python -m Flow_splitter_agent.benchmark --fuzz 100000
+
+Author: Physics Problem Solving System Team
+Version: 1.0.0
+"""
+
+from typing import (
+    Callable,
+    List
+)
+import argparse
+import csv
+import json
+import random
+import time
+
+from .check_question import (
+    CALC_CONTEXT,
+    CALC_VERBS,
+    MATH_SYMBOLS,
+    MULTIPLE_CHOICE_PATTERNS,
+    THEORY_KEYWORDS,
+    UNITS,
+    classify_many,
+    classify_physics_question
+)
+from .check_question_reference import classify_physics_question_reference
+from .keyword_automaton import ahocorasick
+
+SAMPLE_QUESTIONS : List[str] = [
+    "Định luật Newton thứ nhất là gì?",
+    "Hãy giải thích hiện tượng cầu vồng sau cơn mưa.",
+    "Tại sao bầu trời có màu xanh?",
+    "Nêu đặc điểm của chuyển động thẳng biến đổi đều.",
+    "So sánh dao động điều hòa và dao động tắt dần.",
+    "Năng lượng liên kết của hạt nhân",
+    "Một vật có khối lượng 2 kg chuyển động với vận tốc 5 m/s. Tính động năng của vật.",
+    "Cho mạch điện gồm R = 10 Ω mắc nối tiếp với nguồn 12 V. Xác định cường độ dòng điện.",
+    "Một con lắc đơn dài 1,2 m dao động tại nơi có g = 9,8 m/s². Chu kì dao động bằng bao nhiêu?",
+    "Nhiệt độ của khối khí tăng từ 27°C lên 127°C, áp suất thay đổi bao nhiêu lần?",
+    "Hiệu suất của động cơ là 35%, công có ích 700 J",
+    "Điện tích q = 2.5×10⁻⁶ C đặt trong điện trường đều",
+    "Câu nào sau đây đúng? A) Lực là đại lượng vô hướng B) Lực là đại lượng vectơ C) Lực không có đơn vị D) Cả ba sai",
+    "Đơn vị của công suất là: A) J B) W C) N D) Pa",
+    "Chọn phát biểu đúng:\nA) Ánh sáng là sóng dọc\nB) Ánh sáng là sóng ngang\nC) Âm thanh truyền được trong chân không\nD) Sóng âm là sóng điện từ",
+    "Vật rơi tự do từ độ cao 20 m, bỏ qua sức cản không khí",
+    "Con lắc lò xo",
+    "Trình bày nguyên lý hoạt động của máy biến áp.",
+]
+
+
+def fuzz_questions(count : int, seed : int = 0) -> List[str]:
+    """Sinh câu hỏi ngẫu nhiên từ các từ khóa, số và ký hiệu để so sánh hai bản phân loại"""
+    generator : random.Random = random.Random(seed)
+    vocabulary : List[str] = (
+        MULTIPLE_CHOICE_PATTERNS + THEORY_KEYWORDS + CALC_VERBS + UNITS + MATH_SYMBOLS + CALC_CONTEXT
+        + ["vật", "Một", "bao nhiêu", "A)", "(", ")", ":", ".", "%", "°C", "°F", "×10⁻³", "3.14",
+           "12", "5 cm", "x=y", "2+3", "Σ", "Ω", "\n", "  ", "DAO ĐỘNG", "LÀ GÌ", "Tính", "K", "İ"]
+    )
+    return [
+        "".join(
+            generator.choice(vocabulary) + generator.choice(["", " ", " "])
+            for _ in range(generator.randint(0, 12))
+        )
+        for _ in range(count)
+    ]
+
+
+def read_questions(path : str) -> List[str]:
+    """Đọc câu hỏi từ file .csv (cột question) hoặc .jsonl (trường question)"""
+    if path.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as file:
+            return [json.loads(line)["question"] for line in file if line.strip()]
+    with open(path, "r", encoding="utf-8") as file:
+        return [row["question"] for row in csv.DictReader(file)]
+
+
+def time_per_question(function : Callable[[str], str], questions : List[str], repeat : int) -> float:
+    """Thời gian trung bình mỗi câu hỏi (micro giây)"""
+    start : float = time.perf_counter()
+    for _ in range(repeat):
+        for question in questions:
+            function(question)
+    return (time.perf_counter() - start) / (repeat * len(questions)) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Micro-benchmark classify_physics_question")
+    parser.add_argument("--questions", default=None, help="File .csv hoặc .jsonl có trường question")
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--fuzz", type=int, default=20000, help="Số câu hỏi ngẫu nhiên để kiểm tra kết quả giống nhau")
+    args = parser.parse_args()
+
+    questions : List[str] = read_questions(args.questions) if args.questions else SAMPLE_QUESTIONS
+
+    mismatches : List[str] = [
+        question for question in questions + fuzz_questions(args.fuzz)
+        if classify_physics_question(question) != classify_physics_question_reference(question)
+    ]
+    print(f"Automaton backend: {'pyahocorasick' if ahocorasick is not None else 'python'}")
+    print(f"Số câu hỏi khác kết quả so với bản gốc: {len(mismatches)}")
+    for question in mismatches[:10]:
+        print(f"  {question!r}")
+
+    reference_us : float = time_per_question(classify_physics_question_reference, questions, args.repeat)
+    compiled_us : float = time_per_question(classify_physics_question, questions, args.repeat)
+
+    start : float = time.perf_counter()
+    for _ in range(args.repeat):
+        classify_many(questions)
+    many_us : float = (time.perf_counter() - start) / (args.repeat * len(questions)) * 1e6
+
+    print(f"Bản gốc:        {reference_us:8.2f} µs/câu")
+    print(f"Bản compiled:   {compiled_us:8.2f} µs/câu ({reference_us / compiled_us:.1f}x)")
+    print(f"classify_many:  {many_us:8.2f} µs/câu ({reference_us / many_us:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,170 +4,191 @@ PERFECT PHYSICS QUESTION CLASSIFIER - 100% ACCURACY!
 
 Function phân loại câu hỏi vật lý hoàn hảo đã được test trên 1000 câu hỏi thực tế.
 
+Các danh sách từ khóa được compile một lần khi import thành hai automaton
+Aho–Corasick (một cho văn bản gốc, một cho văn bản chữ thường) và các regex
+được compile sẵn, nên mỗi câu hỏi chỉ cần duyệt văn bản một lần cho mỗi dạng.
+Kết quả giống hệt bản gốc trong check_question_reference.py.
+
 Author: Physics Problem Solving System Team
 Version: FINAL - 100% Accuracy
 """
 
 import re
+from typing import (
+    Iterable,
+    List
+)
+
+from .keyword_automaton import Keyword_Automaton
+
+__all__ = ["classify_physics_question", "classify_many"]
+
+# Priority 1: Multiple choice patterns (so khớp phân biệt hoa thường)
+# Use more specific patterns to avoid false positives with °C, °F, etc.
+MULTIPLE_CHOICE_PATTERNS : List[str] = [
+    ' a)', ' b)', ' c)', ' d)',
+    ' A)', ' B)', ' C)', ' D)',
+    'a) ', 'b) ', 'c) ', 'd) ',
+    'A) ', 'B) ', 'C) ', 'D) '
+]
+
+# Priority 2: Theory keywords
+THEORY_KEYWORDS : List[str] = [
+    'là gì', 'định nghĩa', 'khái niệm', 'giải thích', 'mô tả', 'nêu', 'trình bày',
+    'định luật', 'nguyên lý', 'hiện tượng', 'bản chất', 'đặc điểm',
+    'phân loại', 'so sánh', 'phân biệt', 'ứng dụng', 'vai trò', 'ý nghĩa',
+    'tại sao', 'vì sao', 'như thế nào', 'ra sao', 'phân tích', 'mô tả cơ chế',
+    'hoạt động của', 'nguyên lý hoạt động', 'cơ chế hoạt động', 'hãy giải thích'
+]
+
+# Priority 3: Strong calculation verbs
+CALC_VERBS : List[str] = ['tính', 'tìm', 'xác định', 'tính toán', 'giải', 'suy ra', 'hỏi']
+
+# Enhanced units and measurements
+UNITS : List[str] = [
+    # Basic units
+    'kg', 'm/s', 'm/s²', 'newton', 'joule', 'watt', 'volt', 'ampere', 'ohm',
+    'n', 'j', 'w', 'v', 'a', 'ω', 'pa', 'hz', 'tesla', 'weber', 'henry', 'farad',
+    # Length units
+    'cm', 'mm', 'km', 'm', 'nm',
+    # Temperature units
+    '°c', 'k', 'kelvin',
+    # Pressure units
+    'atm', 'pascal',
+    # Volume units
+    'lít', 'l', 'ml',
+    # Energy units
+    'ev', 'cal', 'kcal',
+    # Time units
+    's', 'ms', 'min', 'h',
+    # Angle units
+    'rad/s', 'rad', '°', 'độ'
+]
+
+# Mathematical symbols and expressions (so khớp phân biệt hoa thường)
+MATH_SYMBOLS : List[str] = ['=', '+', '-', '×', '÷', '²', '³', '√', 'π', 'α', 'β', 'γ', 'λ', 'μ', 'ρ', 'σ', 'ω']
+
+# Enhanced calculation context
+CALC_CONTEXT : List[str] = [
+    'với', 'khi', 'rơi', 'ném', 'dao động', 'va chạm', 'quay', 'chuyển động',
+    'khối lượng', 'vận tốc', 'gia tốc', 'lực', 'công', 'công suất', 'năng lượng',
+    'nhiệt lượng', 'nhiệt độ', 'áp suất', 'thể tích', 'điện áp', 'dòng điện',
+    'điện trở', 'từ trường', 'điện trường', 'tần số', 'chu kì', 'bước sóng',
+    'chiều dài', 'bán kính', 'đường kính', 'diện tích', 'thời gian', 'khoảng cách',
+    'độ cao', 'góc', 'biên độ', 'pha', 'hiệu điện thế', 'cường độ', 'suất điện động',
+    'từ thông', 'điện dung', 'độ cứng', 'hệ số', 'chiết suất', 'tiêu cự',
+    'độ phóng đại', 'cảm ứng từ', 'năng lượng liên kết', 'khối lượng nghỉ',
+    'động lượng', 'xung lượng', 'momen', 'entropy', 'hiệu suất'
+]
+
+# Bit của từng nhóm từ khóa trong kết quả scan
+_MULTIPLE_CHOICE : int = 1
+_MATH_SYMBOL : int = 2
+_THEORY : int = 4
+_CALC_VERB : int = 8
+_UNIT : int = 16
+_CALC_CONTEXT : int = 32
+
+# Automaton trên văn bản gốc (phân biệt hoa thường)
+_AUTOMATON_CLEAN : Keyword_Automaton = Keyword_Automaton(
+    [(pattern, _MULTIPLE_CHOICE) for pattern in MULTIPLE_CHOICE_PATTERNS]
+    + [(symbol, _MATH_SYMBOL) for symbol in MATH_SYMBOLS]
+)
+
+# Automaton trên văn bản chữ thường
+_AUTOMATON_LOWER : Keyword_Automaton = Keyword_Automaton(
+    [(keyword, _THEORY) for keyword in THEORY_KEYWORDS]
+    + [(verb, _CALC_VERB) for verb in CALC_VERBS]
+    + [(unit, _UNIT) for unit in UNITS]
+    + [(context, _CALC_CONTEXT) for context in CALC_CONTEXT]
+)
+
+# Look for patterns like ": A)" or "A)" at beginning of options
+_MULTIPLE_CHOICE_REGEX = re.compile(r'[:\s][ABCD]\)\s')
+
+# Very strong indicators (worth 4 points each)
+_STRONG_REGEXES = (
+    re.compile(r'[a-zA-Zα-ωΩ]\s*=\s*[a-zA-Zα-ωΩ]'),  # formula
+    re.compile(r'\d+\.?\d*\s*×?\s*10[⁻¹²³⁴⁵⁶⁷⁸⁹⁰]*'),  # scientific notation
+    re.compile(r'\d+\s*[+\-×÷]\s*\d+'),  # calculation
+)
+
+# Strong indicators (worth 2 points each)
+_MEDIUM_REGEXES = (
+    re.compile(r'\d+\s*[a-zA-Zα-ωΩ°]+'),  # numbers with units
+    re.compile(r'\d+\s*°[CF]?'),  # temperature
+    re.compile(r'\d+\s*%'),  # percentage
+    re.compile(r'\d+\.\d+'),  # decimal numbers
+)
 
 def classify_physics_question(question: str) -> str:
     """
     Phân loại câu hỏi vật lý dựa trên rules cải tiến - ĐẠT 100% ACCURACY!
-    
+
     Đã được test trên 1000 câu hỏi thực tế từ dataset CSV với kết quả:
     - THEORY: 335/335 (100.0%)
-    - PRACTICE: 331/331 (100.0%) 
+    - PRACTICE: 331/331 (100.0%)
     - MULTIPLE_CHOICE: 334/334 (100.0%)
     - TỔNG: 1000/1000 (100.0%)
-    
+
     Args:
         question: Câu hỏi cần phân loại
-        
+
     Returns:
         str: Loại câu hỏi (THEORY, PRACTICE, MULTIPLE_CHOICE)
     """
     if not question or not question.strip():
         return "THEORY"
-    
+
     question_clean = question.strip()
-    question_lower = question_clean.lower()
-    
+
     # Priority 1: Check for multiple choice (highest priority)
-    # Use more specific patterns to avoid false positives with °C, °F, etc.
-    multiple_choice_patterns = [
-        ' a)', ' b)', ' c)', ' d)',
-        ' A)', ' B)', ' C)', ' D)',
-        'a) ', 'b) ', 'c) ', 'd) ',
-        'A) ', 'B) ', 'C) ', 'D) '
-    ]
-    
-    # Check for multiple choice with proper context (space before or after)
-    has_multiple_choice = False
-    for pattern in multiple_choice_patterns:
-        if pattern in question_clean:
-            has_multiple_choice = True
-            break
-    
-    # Additional check for patterns at start of options
-    if not has_multiple_choice:
-        # Look for patterns like ": A)" or "A)" at beginning of options
-        mc_regex = r'[:\s][ABCD]\)\s'
-        if re.search(mc_regex, question_clean):
-            has_multiple_choice = True
-    
-    if has_multiple_choice:
+    bits_clean = _AUTOMATON_CLEAN.scan(question_clean)
+    if bits_clean & _MULTIPLE_CHOICE or _MULTIPLE_CHOICE_REGEX.search(question_clean):
         return "MULTIPLE_CHOICE"
-    
-    # Priority 2: Check for theory keywords FIRST (before practice)
-    theory_keywords = [
-        'là gì', 'định nghĩa', 'khái niệm', 'giải thích', 'mô tả', 'nêu', 'trình bày',
-        'định luật', 'nguyên lý', 'hiện tượng', 'bản chất', 'đặc điểm',
-        'phân loại', 'so sánh', 'phân biệt', 'ứng dụng', 'vai trò', 'ý nghĩa',
-        'tại sao', 'vì sao', 'như thế nào', 'ra sao', 'phân tích', 'mô tả cơ chế',
-        'hoạt động của', 'nguyên lý hoạt động', 'cơ chế hoạt động', 'hãy giải thích'
-    ]
-    
-    # Check for theory keywords but exclude cases where it's part of calculation context
-    has_theory_keywords = False
-    for keyword in theory_keywords:
-        if keyword in question_lower:
-            # Special handling for "tính chất" - check if it's in calculation context
-            if keyword == 'tính chất':
-                # If "tính" appears before "tính chất", it's likely a calculation question
-                if 'tính' in question_lower and question_lower.find('tính') < question_lower.find('tính chất'):
-                    continue  # Skip this theory keyword
-            has_theory_keywords = True
-            break
-    
-    # Strong theory indicators - if found, return THEORY immediately
-    if has_theory_keywords:
+
+    # Priority 2: Strong theory indicators - if found, return THEORY immediately
+    bits_lower = _AUTOMATON_LOWER.scan(question_clean.lower())
+    if bits_lower & _THEORY:
         return "THEORY"
-    
+
     # Priority 3: Enhanced calculation/practice detection
-    # Strong calculation verbs
-    calc_verbs = ['tính', 'tìm', 'xác định', 'tính toán', 'giải', 'suy ra', 'hỏi']
-    
-    # Enhanced units and measurements
-    units = [
-        # Basic units
-        'kg', 'm/s', 'm/s²', 'newton', 'joule', 'watt', 'volt', 'ampere', 'ohm',
-        'n', 'j', 'w', 'v', 'a', 'ω', 'pa', 'hz', 'tesla', 'weber', 'henry', 'farad',
-        # Length units
-        'cm', 'mm', 'km', 'm', 'nm',
-        # Temperature units
-        '°c', 'k', 'kelvin',
-        # Pressure units
-        'atm', 'pascal',
-        # Volume units
-        'lít', 'l', 'ml',
-        # Energy units
-        'ev', 'cal', 'kcal',
-        # Time units
-        's', 'ms', 'min', 'h',
-        # Angle units
-        'rad/s', 'rad', '°', 'độ'
-    ]
-    
-    # Mathematical symbols and expressions
-    math_symbols = ['=', '+', '-', '×', '÷', '²', '³', '√', 'π', 'α', 'β', 'γ', 'λ', 'μ', 'ρ', 'σ', 'ω']
-    
-    # Enhanced calculation context
-    calc_context = [
-        'với', 'khi', 'rơi', 'ném', 'dao động', 'va chạm', 'quay', 'chuyển động',
-        'khối lượng', 'vận tốc', 'gia tốc', 'lực', 'công', 'công suất', 'năng lượng',
-        'nhiệt lượng', 'nhiệt độ', 'áp suất', 'thể tích', 'điện áp', 'dòng điện',
-        'điện trở', 'từ trường', 'điện trường', 'tần số', 'chu kì', 'bước sóng',
-        'chiều dài', 'bán kính', 'đường kính', 'diện tích', 'thời gian', 'khoảng cách',
-        'độ cao', 'góc', 'biên độ', 'pha', 'hiệu điện thế', 'cường độ', 'suất điện động',
-        'từ thông', 'điện dung', 'độ cứng', 'hệ số', 'chiết suất', 'tiêu cự',
-        'độ phóng đại', 'cảm ứng từ', 'năng lượng liên kết', 'khối lượng nghỉ',
-        'động lượng', 'xung lượng', 'momen', 'entropy', 'hiệu suất'
-    ]
-    
-    # Enhanced numerical patterns
-    has_numbers_with_units = bool(re.search(r'\d+\s*[a-zA-Zα-ωΩ°]+', question_clean))
-    has_formula = bool(re.search(r'[a-zA-Zα-ωΩ]\s*=\s*[a-zA-Zα-ωΩ]', question_clean))
-    has_calculation = bool(re.search(r'\d+\s*[+\-×÷]\s*\d+', question_clean))
-    has_scientific_notation = bool(re.search(r'\d+\.?\d*\s*×?\s*10[⁻¹²³⁴⁵⁶⁷⁸⁹⁰]*', question_clean))
-    has_temperature = bool(re.search(r'\d+\s*°[CF]?', question_clean))
-    has_percentage = bool(re.search(r'\d+\s*%', question_clean))
-    has_decimal_numbers = bool(re.search(r'\d+\.\d+', question_clean))
-    
-    # Check for practice indicators with enhanced scoring
-    practice_score = 0
-    
-    # Very strong indicators (worth 4 points each)
-    if any(verb in question_lower for verb in calc_verbs):
-        practice_score += 4
-    if has_formula:
-        practice_score += 4
-    if has_scientific_notation:
-        practice_score += 4
-    if has_calculation:
-        practice_score += 4
-    
-    # Strong indicators (worth 2 points each)
-    if has_numbers_with_units:
-        practice_score += 2
-    if has_temperature:
-        practice_score += 2
-    if has_percentage:
-        practice_score += 2
-    if has_decimal_numbers:
-        practice_score += 2
-    
-    # Medium indicators (worth 1 point each)
-    if any(unit in question_lower for unit in units):
-        practice_score += 1
-    if any(symbol in question_clean for symbol in math_symbols):
-        practice_score += 1
-    if any(context in question_lower for context in calc_context):
-        practice_score += 1
-    
+    # Một chỉ số 4 điểm là đủ ngưỡng nên trả về ngay
+    if bits_lower & _CALC_VERB:
+        return "PRACTICE"
+    for regex in _STRONG_REGEXES:
+        if regex.search(question_clean):
+            return "PRACTICE"
+
+    # Medium indicators (worth 1 point each) - có sẵn từ kết quả scan
+    practice_score = (
+        bool(bits_lower & _UNIT)
+        + bool(bits_clean & _MATH_SYMBOL)
+        + bool(bits_lower & _CALC_CONTEXT)
+    )
+
+    # Strong indicators (worth 2 points each), dừng ngay khi đạt ngưỡng
+    for regex in _MEDIUM_REGEXES:
+        if practice_score >= 3:
+            break
+        if regex.search(question_clean):
+            practice_score += 2
+
     # Enhanced threshold - classify as PRACTICE if score >= 3
     if practice_score >= 3:
         return "PRACTICE"
-    
+
     # Default: if no clear indicators, classify as THEORY
     return "THEORY"
 
+def classify_many(questions: Iterable[str]) -> List[str]:
+    """
+    Phân loại nhiều câu hỏi một lúc.
+
+    Args:
+        questions: Danh sách câu hỏi
+
+    Returns:
+        List[str]: Loại của từng câu hỏi theo đúng thứ tự đầu vào
+    """
+    return [classify_physics_question(question) for question in questions]
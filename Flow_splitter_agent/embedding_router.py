@@ -0,0 +1,225 @@
+"""
+Router phân loại câu hỏi bằng embedding (nearest centroid).
+
+Dùng lại chính vector embedding MiniLM mà bước retrieval đã tính cho câu hỏi,
+nên việc định tuyến chỉ tốn thêm một phép nhân ma trận 3 x d (vài micro giây).
+Khi router không chắc chắn (khoảng cách giữa hai nhãn gần nhất nhỏ hơn
+min_margin), chưa có file router hoặc không có embedding thì dùng lại
+classify_physics_question (rules) làm fallback.
+
+Train và đánh giá offline so với router rules:
+    python -m Flow_splitter_agent.embedding_router train.csv --eval test.csv --save Flow_splitter_agent/embedding_router.npz
+
+Author: Physics Problem Solving System Team
+Version: 1.0.0
+"""
+
+from pathlib import Path
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple
+)
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import yaml
+
+from pipeline_metrics import stage_timer
+from .check_question import classify_physics_question
+
+path_config_information_model_llm : Path = Path(__file__).parent.parent / "config_information_model_llm.yaml"
+
+with open(path_config_information_model_llm, "r") as file:
+    information_rag : Dict[str, str] = yaml.safe_load(file)
+
+ROUTING_MODE : str = information_rag.get("routing_mode", "rules")
+PATH_EMBEDDING_ROUTER : Path = Path(__file__).parent.parent / information_rag.get(
+    "path_embedding_router", "Flow_splitter_agent/embedding_router.npz"
+)
+MIN_MARGIN : float = information_rag.get("embedding_router_min_margin", 0.05)
+
+
+def _normalize(vectors : np.ndarray) -> np.ndarray:
+    norms : np.ndarray = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class Embedding_Router:
+    """
+    Phân loại câu hỏi theo centroid (trung bình embedding đã chuẩn hóa) của từng nhãn.
+    """
+
+    def __init__(self, labels : Sequence[str], centroids : np.ndarray, min_margin : float = MIN_MARGIN) -> None:
+        """
+        Args:
+            labels: Tên các nhãn (THEORY, PRACTICE, MULTIPLE_CHOICE)
+            centroids: Ma trận (số nhãn, số chiều embedding)
+            min_margin: Chênh lệch cosine tối thiểu giữa hai nhãn gần nhất để tin kết quả
+        """
+        self.labels : List[str] = list(labels)
+        self.centroids : np.ndarray = _normalize(np.asarray(centroids, dtype=np.float32))
+        self.min_margin : float = min_margin
+
+    @classmethod
+    def fit(cls, embeddings : np.ndarray, labels : Sequence[str], min_margin : float = MIN_MARGIN) -> "Embedding_Router":
+        """
+        Train router từ embedding và nhãn của các câu hỏi mẫu.
+        """
+        embeddings = _normalize(np.asarray(embeddings, dtype=np.float32))
+        labels_array : np.ndarray = np.asarray(labels)
+        names : List[str] = sorted(set(labels_array.tolist()))
+        centroids : np.ndarray = np.stack([embeddings[labels_array == name].mean(axis=0) for name in names])
+        return cls(names, centroids, min_margin=min_margin)
+
+    def save(self, path : str) -> None:
+        np.savez(path, labels=np.asarray(self.labels), centroids=self.centroids, min_margin=self.min_margin)
+
+    @classmethod
+    def load(cls, path : str) -> "Embedding_Router":
+        data = np.load(path)
+        return cls(data["labels"].tolist(), data["centroids"], min_margin=float(data["min_margin"]))
+
+    def scores(self, embeddings : np.ndarray) -> np.ndarray:
+        """Cosine similarity giữa embedding và centroid của từng nhãn"""
+        return _normalize(np.asarray(embeddings, dtype=np.float32)) @ self.centroids.T
+
+    def predict(self, embedding : Sequence[float]) -> Tuple[str, float]:
+        """
+        Returns:
+            (nhãn có cosine cao nhất, chênh lệch với nhãn thứ hai)
+        """
+        scores : np.ndarray = self.scores(np.asarray(embedding)[None, :])[0]
+        order : np.ndarray = np.argsort(scores)[::-1]
+        margin : float = float(scores[order[0]] - scores[order[1]]) if len(order) > 1 else float("inf")
+        return self.labels[int(order[0])], margin
+
+    def route(self, question : str, embedding : Optional[Sequence[float]]) -> str:
+        """
+        Định tuyến một câu hỏi, fallback về rules khi không có embedding hoặc không chắc chắn.
+        """
+        if embedding is None:
+            return classify_physics_question(question)
+        label, margin = self.predict(embedding)
+        if margin < self.min_margin:
+            return classify_physics_question(question)
+        return label
+
+
+_router : Optional[Embedding_Router] = None
+
+def get_router() -> Optional[Embedding_Router]:
+    """Load router một lần, trả về None nếu chưa train (chưa có file .npz)"""
+    global _router
+    if _router is None and os.path.exists(PATH_EMBEDDING_ROUTER):
+        _router = Embedding_Router.load(str(PATH_EMBEDDING_ROUTER))
+    return _router
+
+
+def route_question(question : str, query_embedding : Optional[Sequence[float]] = None) -> str:
+    """
+    Định tuyến câu hỏi theo routing_mode trong config_information_model_llm.yaml.
+
+    Args:
+        question: Câu hỏi của người dùng
+        query_embedding: Embedding của câu hỏi mà retrieval đã tính (nếu có)
+
+    Returns:
+        str: Loại câu hỏi (THEORY, PRACTICE, MULTIPLE_CHOICE)
+    """
+    # Thời gian phân loại được đo ở đây (bước classify) để mọi nơi gọi định tuyến đều được tính
+    router : Optional[Embedding_Router] = get_router() if ROUTING_MODE == "embedding" else None
+    with stage_timer("classify"):
+        if router is None:
+            return classify_physics_question(question)
+        return router.route(question, query_embedding)
+
+
+def _read_labeled(path : str, question_column : str, label_column : str) -> Tuple[List[str], List[str]]:
+    import pandas as pd
+
+    data = pd.read_json(path, lines=True) if path.endswith(".jsonl") else pd.read_csv(path, keep_default_na=False)
+    return data[question_column].astype(str).tolist(), data[label_column].astype(str).str.strip().str.upper().tolist()
+
+
+def evaluate(router : Embedding_Router, questions : List[str], labels : List[str], embeddings : np.ndarray) -> Dict:
+    """
+    So sánh router rules, router embedding và router embedding + fallback rules trên cùng tập câu hỏi.
+    """
+    start : float = time.perf_counter()
+    rules : List[str] = [classify_physics_question(question) for question in questions]
+    rules_us : float = (time.perf_counter() - start) / len(questions) * 1e6
+
+    start = time.perf_counter()
+    predictions : List[Tuple[str, float]] = [router.predict(embedding) for embedding in embeddings]
+    embedding_us : float = (time.perf_counter() - start) / len(questions) * 1e6
+
+    hybrid : List[str] = [router.route(question, embedding) for question, embedding in zip(questions, embeddings)]
+    fallback_rate : float = float(np.mean([margin < router.min_margin for _, margin in predictions]))
+
+    def accuracy(predicted : List[str]) -> float:
+        return float(np.mean([p == label for p, label in zip(predicted, labels)]))
+
+    return {
+        "num_questions": len(questions),
+        "accuracy_rules": accuracy(rules),
+        "accuracy_embedding": accuracy([label for label, _ in predictions]),
+        "accuracy_embedding_with_fallback": accuracy(hybrid),
+        "fallback_rate": fallback_rate,
+        "agreement_rules_embedding": float(np.mean([r == h for r, h in zip(rules, hybrid)])),
+        "us_per_question_rules": rules_us,
+        "us_per_question_embedding": embedding_us,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Train và đánh giá router embedding")
+    parser.add_argument("train", help="File .csv hoặc .jsonl có cột question và label")
+    parser.add_argument("--eval", default=None, help="File đánh giá (mặc định tách 20% từ file train)")
+    parser.add_argument("--question_column", default="question")
+    parser.add_argument("--label_column", default="label")
+    parser.add_argument("--min_margin", type=float, default=MIN_MARGIN)
+    parser.add_argument("--save", default=str(PATH_EMBEDDING_ROUTER))
+    parser.add_argument("--output", default=None, help="Ghi kết quả đánh giá ra file json")
+    args = parser.parse_args()
+
+    from onnx_backend import load_embedding_model
+
+    # Cùng backend (PyTorch / ONNX) với embedding lúc chạy router
+    model_embedding = load_embedding_model(information_rag["model_embedding"])
+
+    questions, labels = _read_labeled(args.train, args.question_column, args.label_column)
+    embeddings : np.ndarray = np.asarray(model_embedding.embed_documents(questions), dtype=np.float32)
+
+    if args.eval:
+        eval_questions, eval_labels = _read_labeled(args.eval, args.question_column, args.label_column)
+        eval_embeddings : np.ndarray = np.asarray(model_embedding.embed_documents(eval_questions), dtype=np.float32)
+    else:
+        order : np.ndarray = np.random.default_rng(42).permutation(len(questions))
+        split : int = int(len(questions) * 0.8)
+        train_index, eval_index = order[:split], order[split:]
+        eval_questions = [questions[i] for i in eval_index]
+        eval_labels = [labels[i] for i in eval_index]
+        eval_embeddings = embeddings[eval_index]
+        questions = [questions[i] for i in train_index]
+        labels = [labels[i] for i in train_index]
+        embeddings = embeddings[train_index]
+
+    router : Embedding_Router = Embedding_Router.fit(embeddings, labels, min_margin=args.min_margin)
+    router.save(args.save)
+    print(f"Đã lưu router: {args.save}")
+
+    report : Dict = evaluate(router, eval_questions, eval_labels, eval_embeddings)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
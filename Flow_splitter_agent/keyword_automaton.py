@@ -0,0 +1,85 @@
+"""
+Automaton Aho–Corasick để tìm nhiều từ khóa trong một lần duyệt văn bản.
+
+Mỗi từ khóa gắn với một bit (nhóm từ khóa). Hàm scan trả về OR các bit của mọi
+từ khóa xuất hiện trong văn bản (so khớp chuỗi con, giống phép `keyword in text`).
+Dùng thư viện pyahocorasick (viết bằng C) nếu đã cài, nếu không thì dùng mỗi
+nhóm một regex compile sẵn với cùng kết quả.
+
+Author: Physics Problem Solving System Team
+Version: 1.0.0
+"""
+
+from typing import (
+    Dict,
+    Iterable,
+    List,
+    Tuple
+)
+import re
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+class Keyword_Automaton:
+    """
+    Automaton Aho–Corasick cho tập từ khóa cố định, build một lần khi import.
+    """
+
+    def __init__(self, keywords : Iterable[Tuple[str, int]]) -> None:
+        """
+        Args:
+            keywords: Danh sách (từ khóa, bit của nhóm từ khóa)
+        """
+        # Một từ khóa có thể thuộc nhiều nhóm
+        merged : Dict[str, int] = {}
+        for keyword, bit in keywords:
+            merged[keyword] = merged.get(keyword, 0) | bit
+
+        self.all_bits : int = 0
+        for bit in merged.values():
+            self.all_bits |= bit
+
+        if ahocorasick is not None:
+            self.__automaton = ahocorasick.Automaton()
+            for keyword, bits in merged.items():
+                self.__automaton.add_word(keyword, bits)
+            self.__automaton.make_automaton()
+            self.scan = self.__scan_c
+        else:
+            self.__build_regex(merged)
+            self.scan = self.__scan_regex
+
+    def __build_regex(self, merged : Dict[str, int]) -> None:
+        # Mỗi bit một regex dạng (kw1|kw2|...) đã escape: re.search tìm được mọi chuỗi con
+        # giống automaton nhưng chạy trong C nên nhanh hơn duyệt từng ký tự bằng Python
+        groups : Dict[int, List[str]] = {}
+        for keyword, bits in merged.items():
+            bit : int = 1
+            while bit <= bits:
+                if bits & bit:
+                    groups.setdefault(bit, []).append(keyword)
+                bit <<= 1
+        self.__regexes : List[Tuple[int, "re.Pattern"]] = [
+            (bit, re.compile("|".join(re.escape(keyword) for keyword in sorted(keywords, key=len, reverse=True))))
+            for bit, keywords in groups.items()
+        ]
+
+    def __scan_c(self, text : str) -> int:
+        bits : int = 0
+        all_bits : int = self.all_bits
+        for _, value in self.__automaton.iter(text):
+            bits |= value
+            if bits == all_bits:
+                break
+        return bits
+
+    def __scan_regex(self, text : str) -> int:
+        bits : int = 0
+        for bit, regex in self.__regexes:
+            if regex.search(text):
+                bits |= bit
+        return bits
@@ -1 +1,3 @@
-from .convert import *
\ No newline at end of file
+from .convert import *
+from .latex_parser import *
+from .stream import *
\ No newline at end of file
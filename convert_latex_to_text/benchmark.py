@@ -0,0 +1,207 @@
+"""
+Micro-benchmark cho latex_to_text.
+
+So sánh throughput (công thức/giây) giữa bản gốc (convert_reference) và bản
+compiled (regex compile sẵn + gộp quy tắc + cache), đồng thời kiểm tra hai bản
+cho ra kết quả giống hệt từng byte trên bộ công thức vật lý mẫu và công thức
+sinh ngẫu nhiên.
+
+Phần thứ hai đo throughput (ký tự/giây) trên văn bản dài (nhiều công thức xen
+lẫn lời giải) của latex_to_text so với parser một lần duyệt (latex_parser).
+
+Cách chạy:
+    python -m convert_latex_to_text.benchmark
+    python -m convert_latex_to_text.benchmark --formulas formulas.txt --repeat 200
+    python -m convert_latex_to_text.benchmark --fuzz 50000
+    python -m convert_latex_to_text.benchmark --document_sizes 1000 10000 100000
+
+Author: Physics Problem Solving System Team
+Version: 1.0.0
+"""
+
+from typing import (
+    Callable,
+    List
+)
+import argparse
+import random
+import re
+import time
+
+from .convert import (
+    REPLACEMENTS,
+    convert_many,
+    latex_to_text
+)
+from .convert_reference import latex_to_text_reference
+from .latex_parser import parse_latex_to_text
+
+SAMPLE_FORMULAS : List[str] = [
+    r"$F = m \cdot a$",
+    r"$v = v_0 + a t$",
+    r"$s = v_0 t + \frac{1}{2} a t^2$",
+    r"$W_đ = \frac{1}{2} m v^2$",
+    r"$T = 2\pi \sqrt{\frac{l}{g}}$",
+    r"$\omega = \sqrt{\frac{k}{m}}$",
+    r"$x = A \cos(\omega t + \varphi)$",
+    r"$E = mc^2$",
+    r"$\Delta E = \Delta m \cdot c^2$",
+    r"$\lambda = \frac{v}{f}$",
+    r"$U = I \cdot R$",
+    r"$P = U I \cos\varphi$",
+    r"$Z = \sqrt{R^2 + (Z_L - Z_C)^2}$",
+    r"$\vec{F} = q \vec{E}$",
+    r"$\oint \vec{B} \cdot d\vec{l} = \mu_0 I$",
+    r"$\nabla \cdot \vec{E} = \frac{\rho}{\varepsilon_0}$",
+    r"$pV = nRT$",
+    r"$\eta = \frac{A'}{Q_1} \times 100\%$",
+    r"$\sum_{i=1}^{n} F_i = 0$",
+    r"$\int_0^{\infty} e^{-x^2} dx = \frac{\sqrt{\pi}}{2}$",
+    r"$q = 2.5 \times 10^{-6} \text{ C}$",
+    r"$\alpha \approx 30^\circ \Rightarrow \sin\alpha = \frac{1}{2}$",
+    r"$\left( \frac{\partial U}{\partial T} \right)_V \geq 0$",
+    r"$\begin{array}{cc} a & b \\ c & d \end{array}$",
+    r"$\mathbb{R}, \mathcal{L}, \mathrm{kg}, \hbar \omega$",
+]
+
+# Công thức lồng ngoặc mà regex [^}]+ không xử lý đúng
+NESTED_FORMULAS : List[str] = [
+    r"$\frac{\sqrt{a}}{b}$",
+    r"$x^{\frac{1}{2}}$",
+    r"$T = 2\pi\sqrt{\frac{l}{g}}$",
+    r"$v = \sqrt{\frac{2 E_{k}}{m}}$",
+    r"$\frac{\Delta \vec{p}}{\Delta t} = \vec{F}_{\text{net}}$",
+]
+
+# Phân số có d là khoảng cách (công thức thấu kính), không phải đạo hàm: parser phải giữ
+# ngoặc giống latex_to_text
+DISTANCE_FORMULAS : List[str] = [
+    r"$\frac{d_1 + d_2}{d_1 d_2}$",
+    r"$\frac{d+1}{d-1}$",
+    r"$\frac{1}{f} = \frac{1}{d} + \frac{1}{d'}$",
+    r"$f = \frac{d d_2}{d + d_2}$",
+    r"$\frac{d_1}{d_2}$",
+]
+
+SAMPLE_SENTENCES : List[str] = [
+    "Áp dụng định luật bảo toàn năng lượng, ta có",
+    "Thay số vào công thức trên ta được",
+    "Vậy chu kì dao động của con lắc là",
+    "Suy ra vận tốc của vật tại thời điểm đó bằng",
+]
+
+
+def fuzz_formulas(count : int, seed : int = 0) -> List[str]:
+    """Sinh công thức ngẫu nhiên từ các lệnh LaTeX đã hỗ trợ để so sánh hai bản chuyển đổi"""
+    generator : random.Random = random.Random(seed)
+    # Lấy lại chuỗi lệnh (ví dụ \alpha, \frac) từ pattern của các quy tắc
+    commands : List[str] = sorted({
+        pattern.replace("\\\\", "\\").replace("\\{", "{").replace("\\}", "}")
+        for pattern in REPLACEMENTS
+        if not re.search(r"[(\[*+?|]", pattern)
+    })
+    vocabulary : List[str] = commands + [
+        "\\", "{", "}", "^", "_", "(", ")", "[", "]", "$", " ", "  ", "\n", "&",
+        "x", "2", "n", "ab", "10", "+", "-", "=", "^2", "_0", "^{-1}", "_{max}",
+        "\\frac{a}{b}", "\\sqrt{x}", "\\sqrt[3]{x}", "\\text{m/s}", "\\vec{v}",
+        "\\unknown", "Ω", "đ",
+    ]
+    return [
+        "".join(generator.choice(vocabulary) for _ in range(generator.randint(0, 16)))
+        for _ in range(count)
+    ]
+
+
+def build_document(size : int, seed : int = 0) -> str:
+    """Văn bản dài gồm size công thức xen lẫn câu lời giải (giống câu trả lời của mô hình)"""
+    generator : random.Random = random.Random(seed)
+    formulas : List[str] = SAMPLE_FORMULAS + NESTED_FORMULAS
+    return "\n".join(
+        f"{generator.choice(SAMPLE_SENTENCES)} {generator.choice(formulas)}."
+        for _ in range(size)
+    )
+
+
+def characters_per_second(function : Callable[[str], str], document : str, repeat : int) -> float:
+    """Số ký tự xử lý được mỗi giây trên một văn bản"""
+    start : float = time.perf_counter()
+    for _ in range(repeat):
+        function(document)
+    return repeat * len(document) / (time.perf_counter() - start)
+
+
+def read_formulas(path : str) -> List[str]:
+    """Đọc công thức từ file text, mỗi dòng một công thức"""
+    with open(path, "r", encoding="utf-8") as file:
+        return [line.rstrip("\n") for line in file if line.strip()]
+
+
+def formulas_per_second(function : Callable[[str], str], formulas : List[str], repeat : int) -> float:
+    """Số công thức chuyển đổi được mỗi giây"""
+    start : float = time.perf_counter()
+    for _ in range(repeat):
+        for formula in formulas:
+            function(formula)
+    return repeat * len(formulas) / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Micro-benchmark latex_to_text")
+    parser.add_argument("--formulas", default=None, help="File text, mỗi dòng một công thức")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--fuzz", type=int, default=20000, help="Số công thức ngẫu nhiên để kiểm tra kết quả giống nhau")
+    parser.add_argument("--document_sizes", type=int, nargs="+", default=[100, 1000, 10000],
+                        help="Số công thức trong mỗi văn bản dài")
+    args = parser.parse_args()
+
+    formulas : List[str] = read_formulas(args.formulas) if args.formulas else SAMPLE_FORMULAS
+
+    mismatches : List[str] = [
+        formula for formula in formulas + DISTANCE_FORMULAS + fuzz_formulas(args.fuzz)
+        if latex_to_text.__wrapped__(formula) != latex_to_text_reference(formula)
+    ]
+    print(f"Số công thức khác kết quả so với bản gốc: {len(mismatches)}")
+    for formula in mismatches[:10]:
+        print(f"  {formula!r}")
+
+    parser_mismatches : List[str] = [
+        formula for formula in DISTANCE_FORMULAS
+        if parse_latex_to_text(formula) != latex_to_text(formula)
+    ]
+    print(f"Phân số khoảng cách parser khác latex_to_text: {len(parser_mismatches)}")
+    for formula in parser_mismatches:
+        print(f"  {formula!r}: {parse_latex_to_text(formula)!r} != {latex_to_text(formula)!r}")
+
+    reference : float = formulas_per_second(latex_to_text_reference, formulas, args.repeat)
+    # Không dùng cache để đo đúng chi phí chuyển đổi
+    compiled : float = formulas_per_second(latex_to_text.__wrapped__, formulas, args.repeat)
+
+    latex_to_text.cache_clear()
+    start : float = time.perf_counter()
+    for _ in range(args.repeat):
+        convert_many(formulas)
+    cached : float = args.repeat * len(formulas) / (time.perf_counter() - start)
+
+    print(f"Bản gốc:            {reference:10.0f} công thức/giây")
+    print(f"Bản compiled:       {compiled:10.0f} công thức/giây ({compiled / reference:.1f}x)")
+    print(f"Compiled + cache:   {cached:10.0f} công thức/giây ({cached / reference:.1f}x)")
+
+    print("\nCông thức lồng ngoặc:")
+    for formula in NESTED_FORMULAS:
+        print(f"  {formula}")
+        print(f"    latex_to_text:       {latex_to_text(formula)}")
+        print(f"    parse_latex_to_text: {parse_latex_to_text(formula)}")
+
+    print("\nVăn bản dài (ký tự/giây):")
+    print(f"  {'công thức':>10} {'ký tự':>10} {'latex_to_text':>15} {'parser':>15} {'tăng tốc':>9}")
+    for size in args.document_sizes:
+        document : str = build_document(size)
+        # Văn bản lớn chạy ít lần hơn để thời gian đo tương đương nhau
+        repeat : int = max(1, 2000 // size)
+        regex : float = characters_per_second(latex_to_text.__wrapped__, document, repeat)
+        parsed : float = characters_per_second(parse_latex_to_text, document, repeat)
+        print(f"  {size:>10} {len(document):>10} {regex:>15.0f} {parsed:>15.0f} {parsed / regex:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+"""
+Chuyển đổi LaTeX sang text bằng tokenizer + parser đệ quy (recursive descent).
+
+Khác với latex_to_text (áp dụng lần lượt hơn 200 regex lên cả chuỗi, phụ thuộc
+thứ tự và dùng [^}]+ nên dừng ở dấu } đầu tiên), module này duyệt văn bản đúng
+một lần: tokenizer tách lệnh / ký tự đặc biệt / text bằng một regex compile sẵn,
+parser đọc tham số của lệnh theo cặp ngoặc nên xử lý đúng công thức lồng nhau
+như \\frac{\\sqrt{a}}{b} hay x^{\\frac{1}{2}}. Thời gian chạy tuyến tính theo độ
+dài văn bản.
+
+Tập lệnh hỗ trợ giống convert.py: ký hiệu không có tham số lấy trực tiếp từ
+REPLACEMENTS, các lệnh có tham số được khai báo trong các bảng bên dưới.
+
+Author: Physics Problem Solving System Team
+Version: 1.0.0
+"""
+
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Tuple
+)
+import re
+
+from .convert import (
+    REPLACEMENTS,
+    SUBSCRIPTS,
+    SUPERSCRIPTS,
+    latex_to_text
+)
+
+__all__ = ["tokenize", "Incomplete_Input", "LaTeX_Parser", "parse_latex_to_text", "parse_many"]
+
+# Token là chuỗi con của văn bản, loại token nhận biết theo ký tự đầu:
+# lệnh (\alpha, \frac), lệnh một ký tự (\, \{ \\), ký tự đặc biệt, hoặc một đoạn text
+# (gồm cả khoảng trắng) không chứa ký tự đặc biệt nào
+_TOKEN_REGEX = re.compile(r"(\\[a-zA-Z]+|\\.|[{}^_&$\[\]])", re.DOTALL)
+
+SPECIAL_CHARACTERS : str = "{}^_&$[]"
+
+# Một vế của đạo hàm: d hoặc ∂ (có thể bậc 2), rồi đúng một ký hiệu (chữ cái, có thể kèm dấu
+# vector / chấm phía trên), có thể bình phương: dx, d²x, dt², ∂ U, dp⃗
+_DERIVATIVE_REGEX = re.compile(r"(d|∂)²? ?(\w)[\u0300-\u036f\u20d0-\u20ff]?²?")
+
+
+def tokenize(latex : str) -> List[str]:
+    """
+    Tách văn bản LaTeX thành danh sách token trong một lần duyệt.
+    """
+    return [token for token in _TOKEN_REGEX.split(latex) if token]
+
+
+def _symbol_tables() -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    Lấy các ký hiệu không có tham số (\\alpha, \\leq, \\, ...) từ REPLACEMENTS của convert.py.
+    """
+    commands : Dict[str, str] = {}
+    symbols : Dict[str, str] = {}
+    for pattern, replacement in REPLACEMENTS.items():
+        match = re.fullmatch(r"\\\\([a-zA-Z]+)", pattern)
+        if match:
+            commands.setdefault(match.group(1), replacement)
+            continue
+        match = re.fullmatch(r"\\\\(\\?[^a-zA-Z0-9])", pattern)
+        if match:
+            symbols.setdefault(match.group(1)[-1], replacement)
+    return commands, symbols
+
+
+COMMANDS, SYMBOLS = _symbol_tables()
+
+# Lệnh có một tham số: khuôn kết quả với {0} là nội dung tham số
+ONE_ARGUMENT : Dict[str, str] = {
+    "sqrt": "√({0})",
+    "dot": "{0}̇",  # Đạo hàm theo thời gian
+    "ddot": "{0}̈",  # Đạo hàm bậc 2 theo thời gian
+    "vec": "{0}⃗",  # Vector
+    "overrightarrow": "{0}⃗",
+    "mathbf": "𝐛({0})",  # Bold vector
+    "boldsymbol": "𝜷({0})",
+    "hat": "{0}̂",  # Unit vector
+    "tilde": "{0}̃",
+    "bar": "{0}̄",
+    "overline": "{0}̅",
+    "underline": "{0}̲",
+    "text": "{0}",  # Text thường
+    "mathrm": "{0}",  # Roman
+    "mathit": "{0}",  # In nghiêng
+    "mathbb": "𝔹({0})",  # Blackboard bold
+    "mathcal": "𝒞({0})",  # Calligraphy
+    "mathfrak": "𝔉({0})",  # Fraktur
+}
+
+# Môi trường \begin{...} ... \end{...}
+ENVIRONMENTS : Dict[str, Tuple[str, str]] = {
+    "pmatrix": ("(", ")"),
+    "bmatrix": ("[", "]"),
+    "vmatrix": ("|", "|"),
+    "Vmatrix": ("‖", "‖"),
+    "array": ("", ""),
+}
+
+# Dấu ngoặc sau \left, \right
+DELIMITERS : Dict[str, str] = {
+    "\\{": "{", "\\}": "}", "\\|": "‖", ".": "",
+}
+
+_SUPERSCRIPT_TABLE : Dict[int, str] = str.maketrans(SUPERSCRIPTS)
+_SUBSCRIPT_TABLE : Dict[int, str] = str.maketrans(SUBSCRIPTS)
+
+
+def _script(content : str, table : Dict[int, str], marker : str, braced : bool) -> str:
+    """
+    Chuyển chỉ số trên / dưới sang ký tự Unicode nếu mọi ký tự đều có dạng Unicode tương ứng,
+    nếu không thì giữ dạng ^(...) / _(...) (ví dụ x^{\\frac{1}{2}} -> x^((1)/(2))).
+    """
+    if not content:
+        return ""
+    if all(ord(char) in table for char in content):
+        return content.translate(table)
+    if braced or len(content) > 1:
+        return f"{marker}({content})"
+    return f"{marker}{content}"
+
+
+class Incomplete_Input(Exception):
+    """Văn bản kết thúc giữa chừng một lệnh (thiếu tham số, chưa đóng ngoặc...)"""
+
+
+class LaTeX_Parser:
+    """
+    Parser đệ quy trên danh sách token của một công thức.
+    """
+
+    def __init__(self, tokens : List[str], final : bool = True) -> None:
+        """
+        Args:
+            tokens: Danh sách token (tokenize)
+            final: False nếu văn bản còn tiếp (streaming): khi đó hết token giữa chừng một lệnh
+                sẽ raise Incomplete_Input thay vì coi như tham số rỗng
+        """
+        self.tokens : List[str] = tokens
+        self.position : int = 0
+        self.final : bool = final
+        # Các token đã bị cắt bớt (vị trí, giá trị cũ), để khôi phục khi gặp Incomplete_Input
+        self.changes : List[Tuple[int, str]] = []
+
+    def peek(self) -> Optional[str]:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        if not self.final:
+            raise Incomplete_Input()
+        return None
+
+    def replace_token(self, token : str) -> None:
+        """Thay token hiện tại bằng phần còn lại của nó"""
+        if not self.final:
+            self.changes.append((self.position, self.tokens[self.position]))
+        self.tokens[self.position] = token
+
+    def skip_space(self) -> None:
+        """Bỏ khoảng trắng giữa lệnh và tham số (\\frac {a} {b})"""
+        token : Optional[str] = self.peek()
+        if token is not None and token[0].isspace():
+            token = token.lstrip()
+            if token:
+                self.replace_token(token)
+            else:
+                self.position += 1
+
+    def parse_sequence(self, stop : Optional[str] = None) -> str:
+        """
+        Đọc và chuyển đổi token cho tới token stop (không tính) hoặc hết văn bản.
+        """
+        tokens : List[str] = self.tokens
+        parts : List[str] = []
+        append = parts.append
+        while self.position < len(tokens):
+            token : str = tokens[self.position]
+            if token == stop:
+                break
+            if token[0] == "\\":
+                symbol : Optional[str] = COMMANDS.get(token[1:])
+                if symbol is not None:
+                    # Ký hiệu không có tham số (trường hợp phổ biến nhất)
+                    append(symbol)
+                    self.position += 1
+                else:
+                    append(self.parse_item())
+            elif token in SPECIAL_CHARACTERS:
+                append(self.parse_item())
+            else:
+                # Đoạn text thường: giữ nguyên
+                append(token)
+                self.position += 1
+        return "".join(parts)
+
+    def parse_group(self) -> str:
+        """Nội dung trong cặp { } (đã đọc dấu {)"""
+        content : str = self.parse_sequence("}")
+        if self.peek() == "}":
+            self.position += 1
+        return content
+
+    def parse_argument(self) -> Tuple[str, bool]:
+        """
+        Đọc một tham số của lệnh: cả nhóm { } hoặc một token / một ký tự (\\frac12).
+
+        Returns:
+            (nội dung đã chuyển đổi, tham số có nằm trong { } hay không)
+        """
+        self.skip_space()
+        token : Optional[str] = self.peek()
+        if token is None or token == "}":
+            return "", False
+        if token == "{":
+            self.position += 1
+            return self.parse_group(), True
+        if token[0] != "\\" and token not in SPECIAL_CHARACTERS:
+            # Đoạn text: chỉ lấy ký tự đầu, phần còn lại giữ làm token
+            if len(token) > 1:
+                self.replace_token(token[1:])
+            else:
+                self.position += 1
+            return token[0], False
+        return self.parse_item(), False
+
+    def parse_optional(self) -> Optional[str]:
+        """Tham số tùy chọn [ ... ] (ví dụ \\sqrt[3]{x})"""
+        if self.peek() != "[":
+            return None
+        self.position += 1
+        content : str = self.parse_sequence("]")
+        if self.peek() == "]":
+            self.position += 1
+        return content
+
+    def parse_name(self) -> str:
+        """Tên môi trường sau \\begin / \\end"""
+        self.skip_space()
+        if self.peek() != "{":
+            return ""
+        self.position += 1
+        parts : List[str] = []
+        while self.peek() not in ("}", None):
+            parts.append(self.tokens[self.position])
+            self.position += 1
+        self.position += 1
+        return "".join(parts).strip()
+
+    def parse_item(self) -> str:
+        """Chuyển đổi một token lệnh / ký tự đặc biệt (cùng các tham số của nó)"""
+        token : str = self.tokens[self.position]
+        self.position += 1
+
+        if token[0] == "\\" and len(token) > 1:
+            if token[1].isalpha():
+                return self.parse_command(token[1:])
+            return SYMBOLS.get(token[1], "")
+        if token == "{":
+            return self.parse_group()
+        if token == "}":
+            # Dấu } thừa
+            return ""
+        if token == "^":
+            content, braced = self.parse_argument()
+            return _script(content, _SUPERSCRIPT_TABLE, "^", braced)
+        if token == "_":
+            content, braced = self.parse_argument()
+            return _script(content, _SUBSCRIPT_TABLE, "_", braced)
+        if token == "&":
+            return " | "  # Phân cách cột
+        if token == "$":
+            return ""
+        return token
+
+    def parse_command(self, name : str) -> str:
+        if name in COMMANDS:
+            return COMMANDS[name]
+
+        if name == "frac":
+            numerator, _ = self.parse_argument()
+            denominator, _ = self.parse_argument()
+            # Đạo hàm thường / đạo hàm riêng: dx/dt, ∂f/∂x. Chỉ bỏ ngoặc khi mỗi vế đúng là
+            # d / ∂ cộng một ký hiệu, \frac{d_1 + d_2}{d_1 d_2} (d là khoảng cách) vẫn giữ ngoặc
+            numerator_match = _DERIVATIVE_REGEX.fullmatch(numerator)
+            denominator_match = _DERIVATIVE_REGEX.fullmatch(denominator)
+            if (
+                numerator_match and denominator_match
+                and numerator_match.group(1) == denominator_match.group(1)
+                and numerator_match.group(2).isalpha() and denominator_match.group(2).isalpha()
+            ):
+                return f"{numerator}/{denominator}"
+            return f"({numerator})/({denominator})"
+
+        if name == "sqrt":
+            degree : Optional[str] = self.parse_optional()
+            content, _ = self.parse_argument()
+            return f"{degree}√({content})" if degree is not None else f"√({content})"
+
+        if name in ONE_ARGUMENT:
+            content, _ = self.parse_argument()
+            return ONE_ARGUMENT[name].format(content)
+
+        if name == "begin" or name == "end":
+            environment : str = self.parse_name()
+            if name == "begin" and environment == "array":
+                # Bỏ qua khai báo cột {cc}
+                self.parse_argument()
+            opening, closing = ENVIRONMENTS.get(environment, ("", ""))
+            return opening if name == "begin" else closing
+
+        if name == "left" or name == "right":
+            self.skip_space()
+            token : Optional[str] = self.peek()
+            if token is None or token[0] == "\\" and token[1:2].isalpha():
+                # \\left\\langle, ...: lệnh phía sau được xử lý như bình thường
+                return ""
+            if token[0] == "\\":
+                # \\{ \\} \\|
+                self.position += 1
+                return DELIMITERS.get(token, token[1:])
+            delimiter, _ = self.parse_argument()
+            return DELIMITERS.get(delimiter, delimiter)
+
+        # Lệnh không hỗ trợ: bỏ tên lệnh, nội dung (nếu có) vẫn được giữ lại
+        return ""
+
+
+    def parse_available(self) -> Tuple[str, int]:
+        """
+        Chuyển đổi các phần tử hoàn chỉnh ở đầu văn bản (dùng cho streaming, final=False).
+
+        Returns:
+            (text đã chuyển đổi, vị trí token đầu tiên chưa xử lý)
+        """
+        tokens : List[str] = self.tokens
+        parts : List[str] = []
+        while self.position < len(tokens):
+            token : str = tokens[self.position]
+            if token[0] != "\\" and token not in SPECIAL_CHARACTERS:
+                parts.append(token)
+                self.position += 1
+                continue
+            start : int = self.position
+            self.changes.clear()
+            try:
+                parts.append(self.parse_item())
+            except Incomplete_Input:
+                # Khôi phục token của phần tử dở dang để xử lý lại khi có thêm văn bản
+                for index, old in reversed(self.changes):
+                    tokens[index] = old
+                self.position = start
+                break
+        return "".join(parts), self.position
+
+
+def parse_latex_to_text(latex_formula : str) -> str:
+    """
+    Chuyển đổi công thức LaTeX sang text thông thường trong một lần duyệt,
+    xử lý đúng các cặp ngoặc lồng nhau.
+
+    Args:
+        latex_formula: Công thức (hoặc cả văn bản) LaTeX
+
+    Returns:
+        str: Text đã chuyển đổi, khoảng trắng thừa được gộp lại
+    """
+    try:
+        text : str = LaTeX_Parser(tokenize(latex_formula)).parse_sequence()
+    except RecursionError:
+        # Ngoặc lồng quá sâu (văn bản lỗi): dùng lại bản regex
+        return latex_to_text(latex_formula)
+    # Gộp khoảng trắng thừa (giống re.sub(r'\s+', ' ', text).strip() nhưng nhanh hơn)
+    return " ".join(text.split())
+
+
+def parse_many(latex_formulas : List[str]) -> List[str]:
+    """Chuyển đổi nhiều công thức một lúc"""
+    return [parse_latex_to_text(latex_formula) for latex_formula in latex_formulas]
@@ -0,0 +1,109 @@
+"""
+Chuyển đổi LaTeX sang text cho câu trả lời dạng streaming.
+
+Nhận từng đoạn văn bản (chunk) ngay khi model sinh ra, chuyển đổi và trả lại
+phần đã hoàn chỉnh ngay lập tức. Chỉ giữ lại phần cuối còn dở dang: lệnh chưa
+gõ xong (\\fra...), lệnh còn thiếu tham số (\\frac{a}...) hoặc ngoặc { chưa đóng.
+Phần giữ lại bị giới hạn bởi max_pending ký tự nên độ trễ thêm cho mỗi chunk
+là hằng số, thời gian đến token đầu tiên của streaming không bị ảnh hưởng.
+
+Ghép các phần trả về cho kết quả giống LaTeX_Parser trên toàn bộ văn bản, chỉ
+khác parse_latex_to_text ở chỗ khoảng trắng / xuống dòng được giữ nguyên để
+không làm mất định dạng đoạn văn của câu trả lời.
+
+Cách dùng:
+    converter = Streaming_LaTeX_Converter()
+    for chunk in response:
+        print(converter.feed(chunk.text), end="", flush=True)
+    print(converter.flush())
+
+Author: Physics Problem Solving System Team
+Version: 1.0.0
+"""
+
+from typing import (
+    Iterable,
+    Iterator,
+    List
+)
+import re
+
+from .latex_parser import (
+    LaTeX_Parser,
+    tokenize
+)
+
+__all__ = ["Streaming_LaTeX_Converter", "convert_stream"]
+
+# Lệnh ở cuối văn bản có thể còn tiếp (\al -> \alpha), kể cả dấu \ đứng một mình
+_TRAILING_COMMAND_REGEX = re.compile(r"(\\+)[a-zA-Z]*$")
+
+# Giới hạn số ký tự giữ lại khi chờ lệnh / ngoặc hoàn chỉnh
+MAX_PENDING : int = 512
+
+
+class Streaming_LaTeX_Converter:
+    """
+    Bộ chuyển đổi LaTeX tăng dần, mỗi instance dùng cho một luồng câu trả lời.
+    """
+
+    def __init__(self, max_pending : int = MAX_PENDING) -> None:
+        """
+        Args:
+            max_pending: Số ký tự dở dang tối đa được giữ lại. Vượt quá giới hạn này (ví dụ
+                dấu { không bao giờ được đóng) thì phần đang giữ được chuyển đổi luôn
+        """
+        self.max_pending : int = max_pending
+        self.pending : str = ""
+
+    def feed(self, chunk : str) -> str:
+        """
+        Thêm một chunk, trả về text đã chuyển đổi của phần hoàn chỉnh (có thể rỗng).
+        """
+        text : str = self.pending + chunk
+
+        # Lệnh ở cuối chưa chắc đã gõ xong: giữ lại, không đưa vào parser
+        cut : int = len(text)
+        match = _TRAILING_COMMAND_REGEX.search(text)
+        if match and len(match.group(1)) % 2 == 1:
+            cut = match.end(1) - 1
+
+        tokens : List[str] = tokenize(text[:cut])
+        converted, position = LaTeX_Parser(tokens, final=False).parse_available()
+        self.pending = "".join(tokens[position:]) + text[cut:]
+
+        if len(self.pending) > self.max_pending:
+            # Văn bản lỗi (ngoặc không đóng...): chuyển đổi luôn để không giữ mãi
+            converted += self.flush()
+        return converted
+
+    def flush(self) -> str:
+        """
+        Kết thúc luồng: chuyển đổi toàn bộ phần còn giữ lại.
+        """
+        text : str = self.pending
+        self.pending = ""
+        if not text:
+            return ""
+        return LaTeX_Parser(tokenize(text)).parse_sequence()
+
+
+def convert_stream(chunks : Iterable[str], max_pending : int = MAX_PENDING) -> Iterator[str]:
+    """
+    Chuyển đổi một luồng chunk (ví dụ từ generate_content(stream=True)), bỏ qua các phần rỗng.
+
+    Args:
+        chunks: Các đoạn văn bản theo thứ tự sinh ra
+        max_pending: Số ký tự dở dang tối đa được giữ lại
+
+    Yields:
+        str: Text đã chuyển đổi
+    """
+    converter : Streaming_LaTeX_Converter = Streaming_LaTeX_Converter(max_pending=max_pending)
+    for chunk in chunks:
+        converted : str = converter.feed(chunk)
+        if converted:
+            yield converted
+    converted = converter.flush()
+    if converted:
+        yield converted
@@ -45,10 +45,18 @@
 # #     print(result_check)   
 # # if __name__ == "__main__":
 # #     main()
+import argparse
+
 from upload_dataset import Create_VectorDB_Update_Dataset
 
-path_folder = "dataset_test"
-Create_VectorDB_Update_Dataset(path_folder,"dataset/dataset_theory").run
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tạo / cập nhật VectorDB từ folder PDF và Word")
+    parser.add_argument("--path_folder", default="dataset_test", help="Folder chứa file PDF và Word")
+    parser.add_argument("--path_save", default="dataset/dataset_theory", help="Folder lưu VectorDB")
+    parser.add_argument("--resume", action="store_true", help="Tiếp tục từ checkpoint của lần chạy trước")
+    args = parser.parse_args()
+
+    Create_VectorDB_Update_Dataset(args.path_folder, args.path_save, resume=args.resume).run
 
 
 
@@ -0,0 +1 @@
+from .models import *
\ No newline at end of file
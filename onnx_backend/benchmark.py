@@ -0,0 +1,190 @@
+"""
+Kiểm tra parity và đo độ trễ của backend ONNX Runtime so với PyTorch.
+
+Embedding: so cosine giữa vector của hai backend trên cùng bộ câu vật lý mẫu.
+Reranking: so điểm và thứ tự xếp hạng các đoạn văn cho từng câu hỏi. Độ trễ
+được đo đúng như lúc trả lời một câu hỏi lý thuyết: embed_query một câu và
+compute_score 15 cặp (initial_k của get_information), cùng throughput
+embed_documents theo batch như khi tạo VectorDB.
+
+Trả về mã lỗi 1 nếu backend ONNX lệch quá ngưỡng (--min_cosine, --min_top1).
+
+Cách chạy:
+    python -m onnx_backend.benchmark
+    python -m onnx_backend.benchmark --quantize --repeat 50 --output onnx_report.json
+
+Author: Physics Problem Solving System Team
+Version: 1.0.0
+"""
+
+from typing import (
+    Callable,
+    Dict,
+    List
+)
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from .models import (
+    MODEL_NAME_EMBEDDING,
+    MODEL_NAME_RERANKING,
+    load_embedding_model,
+    load_reranker
+)
+
+SAMPLE_QUERIES : List[str] = [
+    "Định luật II Newton phát biểu như thế nào?",
+    "Thế nào là dao động điều hòa?",
+    "Hiện tượng quang điện là gì?",
+    "Công thức tính động năng của vật",
+    "Phân biệt sóng ngang và sóng dọc",
+    "Điện trở của dây dẫn phụ thuộc vào những yếu tố nào?",
+]
+
+SAMPLE_PASSAGES : List[str] = [
+    "Gia tốc của một vật cùng hướng với lực tác dụng lên vật, độ lớn tỉ lệ thuận với độ lớn của lực và tỉ lệ nghịch với khối lượng của vật: a = F / m.",
+    "Dao động điều hòa là dao động trong đó li độ của vật là một hàm cosin (hay sin) của thời gian: x = A cos(ωt + φ).",
+    "Hiện tượng ánh sáng làm bật các electron ra khỏi mặt kim loại gọi là hiện tượng quang điện ngoài.",
+    "Động năng của vật khối lượng m chuyển động với vận tốc v là W = ½ m v².",
+    "Sóng ngang là sóng trong đó các phần tử môi trường dao động theo phương vuông góc với phương truyền sóng; sóng dọc thì dao động theo phương truyền sóng.",
+    "Điện trở của dây dẫn tỉ lệ thuận với chiều dài, tỉ lệ nghịch với tiết diện và phụ thuộc vào vật liệu làm dây: R = ρ l / S.",
+    "Khi một vật chuyển động tròn đều, gia tốc hướng tâm có độ lớn a = v² / r.",
+    "Năng lượng của photon ánh sáng có tần số f là ε = h f, với h là hằng số Planck.",
+    "Chu kì dao động của con lắc đơn T = 2π √(l / g) không phụ thuộc vào khối lượng vật nặng.",
+    "Trong mạch điện xoay chiều RLC nối tiếp, tổng trở Z = √(R² + (Z_L − Z_C)²).",
+    "Nhiệt lượng tỏa ra trên dây dẫn khi có dòng điện chạy qua tỉ lệ với bình phương cường độ dòng điện: Q = I² R t.",
+    "Định luật bảo toàn động lượng: tổng động lượng của hệ cô lập không đổi.",
+    "Bước sóng là quãng đường sóng truyền được trong một chu kì: λ = v T.",
+    "Lực đàn hồi của lò xo tỉ lệ với độ biến dạng: F = −k Δl.",
+    "Công suất của dòng điện P = U I cho biết điện năng tiêu thụ trong một đơn vị thời gian.",
+]
+
+
+def _latency_ms(function : Callable[[], object], repeat : int) -> Dict[str, float]:
+    function()
+    timings : List[float] = []
+    for _ in range(repeat):
+        start : float = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {"p50_ms": timings[len(timings) // 2], "p90_ms": timings[min(len(timings) - 1, int(len(timings) * 0.9))]}
+
+
+def _rank_agreement(scores_reference : List[float], scores : List[float]) -> Dict[str, float]:
+    order_reference : np.ndarray = np.argsort(scores_reference)[::-1]
+    order : np.ndarray = np.argsort(scores)[::-1]
+    return {
+        "top1": float(order_reference[0] == order[0]),
+        "top5_overlap": len(set(order_reference[:5]) & set(order[:5])) / 5,
+    }
+
+
+def embedding_report(repeat : int, quantize : bool) -> Dict:
+    texts : List[str] = SAMPLE_QUERIES + SAMPLE_PASSAGES
+    report : Dict = {"model": MODEL_NAME_EMBEDDING}
+    vectors : Dict[str, np.ndarray] = {}
+
+    for backend in ("pytorch", "onnx"):
+        kwargs : Dict = {"quantize": quantize} if backend == "onnx" else {}
+        start : float = time.perf_counter()
+        model = load_embedding_model(backend=backend, **kwargs)
+        load_seconds : float = time.perf_counter() - start
+
+        vectors[backend] = np.asarray(model.embed_documents(texts), dtype=np.float32)
+        query_latency : Dict[str, float] = _latency_ms(lambda: model.embed_query(SAMPLE_QUERIES[0]), repeat)
+        documents : List[str] = SAMPLE_PASSAGES * 8
+        documents_latency : Dict[str, float] = _latency_ms(lambda: model.embed_documents(documents), max(3, repeat // 10))
+
+        report[backend] = {
+            "load_seconds": load_seconds,
+            "embed_query": query_latency,
+            "embed_documents_per_second": len(documents) / (documents_latency["p50_ms"] / 1000),
+        }
+
+    reference, onnx = vectors["pytorch"], vectors["onnx"]
+    cosine : np.ndarray = (reference * onnx).sum(axis=1) / (
+        np.linalg.norm(reference, axis=1) * np.linalg.norm(onnx, axis=1)
+    )
+    report["parity"] = {
+        "min_cosine": float(cosine.min()),
+        "mean_cosine": float(cosine.mean()),
+        "max_abs_diff": float(np.abs(reference - onnx).max()),
+    }
+    return report
+
+
+def reranking_report(repeat : int, quantize : bool) -> Dict:
+    report : Dict = {"model": MODEL_NAME_RERANKING}
+    scores : Dict[str, List[List[float]]] = {}
+    pairs_by_query : List[List[List[str]]] = [[[query, passage] for passage in SAMPLE_PASSAGES] for query in SAMPLE_QUERIES]
+
+    for backend in ("pytorch", "onnx"):
+        kwargs : Dict = {"quantize": quantize} if backend == "onnx" else {}
+        start : float = time.perf_counter()
+        model = load_reranker(backend=backend, **kwargs)
+        load_seconds : float = time.perf_counter() - start
+
+        scores[backend] = [list(model.compute_score(pairs)) for pairs in pairs_by_query]
+        report[backend] = {
+            "load_seconds": load_seconds,
+            "compute_score_15_pairs": _latency_ms(lambda: model.compute_score(pairs_by_query[0]), repeat),
+        }
+
+    agreements : List[Dict[str, float]] = [
+        _rank_agreement(reference, onnx) for reference, onnx in zip(scores["pytorch"], scores["onnx"])
+    ]
+    report["parity"] = {
+        "max_abs_diff": float(np.abs(np.asarray(scores["pytorch"]) - np.asarray(scores["onnx"])).max()),
+        "top1_agreement": float(np.mean([agreement["top1"] for agreement in agreements])),
+        "top5_overlap": float(np.mean([agreement["top5_overlap"] for agreement in agreements])),
+    }
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Parity và độ trễ ONNX Runtime so với PyTorch")
+    parser.add_argument("--quantize", action="store_true", help="Dùng model ONNX quantize int8")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--min_cosine", type=float, default=None, help="Cosine tối thiểu giữa embedding hai backend (mặc định 0.999, int8: 0.98)")
+    parser.add_argument("--min_top1", type=float, default=1.0, help="Tỉ lệ tối thiểu câu hỏi có cùng đoạn văn xếp đầu")
+    parser.add_argument("--output", default=None, help="Ghi report ra file json")
+    args = parser.parse_args()
+
+    min_cosine : float = args.min_cosine if args.min_cosine is not None else (0.98 if args.quantize else 0.999)
+
+    report : Dict = {
+        "quantize": args.quantize,
+        "embedding": embedding_report(args.repeat, args.quantize),
+        "reranking": reranking_report(args.repeat, args.quantize),
+    }
+
+    embedding, reranking = report["embedding"], report["reranking"]
+    report["passed"] = (
+        embedding["parity"]["min_cosine"] >= min_cosine
+        and reranking["parity"]["top1_agreement"] >= args.min_top1
+    )
+
+    print(f"Embedding ({embedding['model']}): cosine min {embedding['parity']['min_cosine']:.5f}, "
+          f"trung bình {embedding['parity']['mean_cosine']:.5f}")
+    for backend in ("pytorch", "onnx"):
+        print(f"  {backend:>8}: embed_query p50 {embedding[backend]['embed_query']['p50_ms']:.2f} ms, "
+              f"{embedding[backend]['embed_documents_per_second']:.0f} đoạn/s")
+    print(f"Reranking ({reranking['model']}): lệch điểm tối đa {reranking['parity']['max_abs_diff']:.4f}, "
+          f"top-1 trùng {reranking['parity']['top1_agreement']:.0%}, top-5 trùng {reranking['parity']['top5_overlap']:.0%}")
+    for backend in ("pytorch", "onnx"):
+        print(f"  {backend:>8}: compute_score 15 cặp p50 {reranking[backend]['compute_score_15_pairs']['p50_ms']:.2f} ms")
+    print(f"Parity: {'✅ ĐẠT' if report['passed'] else '❌ KHÔNG ĐẠT'}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+    return 0 if report["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
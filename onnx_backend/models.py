@@ -0,0 +1,340 @@
+"""
+Backend ONNX Runtime cho model embedding (all-MiniLM-L6-v2) và reranking (bge-reranker-base).
+
+Trên CPU, PyTorch eager chạy từng op riêng lẻ và use_fp16 của FlagReranker
+không có tác dụng. Model được export sang ONNX một lần, tối ưu graph (gộp
+attention / layer norm / gelu bằng onnxruntime.transformers) và có thể
+quantize int8 động, lưu vào path_onnx_cache theo tên model. Các lần sau chỉ
+tải file .onnx đã tối ưu.
+
+ONNX_Embeddings có cùng interface với HuggingFaceEmbeddings (embed_documents,
+embed_query), ONNX_Reranker cùng interface compute_score với FlagReranker, nên
+router và bước tạo VectorDB chỉ cần đổi hàm tải model (load_embedding_model,
+load_reranker) theo inference_backend trong config_information_model_llm.yaml.
+
+Author: Physics Problem Solving System Team
+Version: 1.0.0
+"""
+
+from pathlib import Path
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Union
+)
+import json
+import os
+import re
+
+import numpy as np
+import yaml
+from langchain_core.embeddings import Embeddings
+
+__all__ = [
+    "INFERENCE_BACKEND",
+    "ONNX_Embeddings",
+    "ONNX_Reranker",
+    "export_onnx",
+    "load_embedding_model",
+    "load_reranker"
+]
+
+path_config_information_model_llm : Path = Path(__file__).parent.parent / "config_information_model_llm.yaml"
+
+with open(path_config_information_model_llm, "r") as file:
+    information_rag : Dict[str, str] = yaml.safe_load(file)
+
+MODEL_NAME_EMBEDDING : str = information_rag["model_embedding"]
+MODEL_NAME_RERANKING : str = information_rag["model_reranking"]
+DEVICE : str = information_rag.get("device", "cpu")
+
+INFERENCE_BACKEND : str = information_rag.get("inference_backend", "pytorch")
+ONNX_QUANTIZE : bool = information_rag.get("onnx_quantize", False)
+ONNX_NUM_THREADS : int = information_rag.get("onnx_num_threads", 0)
+PATH_ONNX_CACHE : Path = Path(__file__).parent.parent / information_rag.get("path_onnx_cache", "onnx_models")
+
+ONNX_INFO_NAME : str = "onnx_info.json"
+ONNX_OPSET : int = 17
+
+
+def _model_dir(model_name : str, cache_dir : Optional[str] = None) -> str:
+    slug : str = re.sub(r"[^A-Za-z0-9_.-]+", "--", model_name.strip("/"))
+    return os.path.join(str(cache_dir or PATH_ONNX_CACHE), slug)
+
+
+def _onnx_file_name(quantize : bool) -> str:
+    return "model_optimized_int8.onnx" if quantize else "model_optimized.onnx"
+
+
+def export_onnx(model_name : str, task : str, cache_dir : Optional[str] = None, quantize : bool = False) -> str:
+    """
+    Export model sang ONNX, tối ưu graph và quantize int8 (tùy chọn) nếu chưa có trong cache.
+
+    Args:
+        model_name: Tên model trên HuggingFace Hub hoặc đường dẫn local
+        task: "embedding" (sentence-transformers) hoặc "reranking" (sequence classification)
+        cache_dir: Thư mục cache (mặc định path_onnx_cache)
+        quantize: Quantize động trọng số int8
+
+    Returns:
+        Thư mục chứa model .onnx, tokenizer và onnx_info.json
+    """
+    if task not in ("embedding", "reranking"):
+        raise ValueError(f"task không hợp lệ: {task}")
+
+    output_dir : str = _model_dir(model_name, cache_dir)
+    path_optimized : str = os.path.join(output_dir, _onnx_file_name(False))
+    path_target : str = os.path.join(output_dir, _onnx_file_name(quantize))
+    if os.path.exists(path_target) and os.path.exists(os.path.join(output_dir, ONNX_INFO_NAME)):
+        return output_dir
+
+    import torch
+    from onnxruntime.quantization import (
+        QuantType,
+        quantize_dynamic
+    )
+    from onnxruntime.transformers.optimizer import optimize_model
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    if not os.path.exists(path_optimized):
+        print(f"Đang export {model_name} sang ONNX...")
+        if task == "embedding":
+            from sentence_transformers import SentenceTransformer
+
+            sentence_model = SentenceTransformer(model_name, device="cpu")
+            model = sentence_model[0].auto_model
+            tokenizer = sentence_model.tokenizer
+            pooling : str = next(
+                (module.get_pooling_mode_str() for module in sentence_model if hasattr(module, "get_pooling_mode_str")),
+                "mean"
+            )
+            if pooling not in ("mean", "cls"):
+                raise ValueError(f"Pooling chưa hỗ trợ: {pooling}")
+            info : Dict = {
+                "task": task,
+                "model_name": model_name,
+                "pooling": pooling,
+                "normalize": any(type(module).__name__ == "Normalize" for module in sentence_model),
+                "max_length": sentence_model.max_seq_length,
+            }
+            output_name : str = "last_hidden_state"
+        else:
+            from transformers import (
+                AutoModelForSequenceClassification,
+                AutoTokenizer
+            )
+
+            model = AutoModelForSequenceClassification.from_pretrained(model_name)
+            tokenizer = AutoTokenizer.from_pretrained(model_name)
+            info = {"task": task, "model_name": model_name, "max_length": 512}
+            output_name = "logits"
+
+        model.eval()
+        tokenizer.save_pretrained(output_dir)
+        input_names : List[str] = list(tokenizer.model_input_names)
+        sample = tokenizer(["Định luật II Newton", "Gia tốc tỉ lệ thuận với lực"], padding=True, return_tensors="pt")
+        dynamic_axes : Dict[str, Dict[int, str]] = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes[output_name] = {0: "batch"} if task == "reranking" else {0: "batch", 1: "sequence"}
+
+        path_raw : str = os.path.join(output_dir, "model.onnx")
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                ({name: sample[name] for name in input_names},),
+                path_raw,
+                input_names=input_names,
+                output_names=[output_name],
+                dynamic_axes=dynamic_axes,
+                opset_version=ONNX_OPSET
+            )
+
+        # Gộp attention, layer norm, gelu... thành các op fused của ONNX Runtime (BERT và XLM-R)
+        optimized = optimize_model(
+            path_raw,
+            model_type="bert",
+            num_heads=model.config.num_attention_heads,
+            hidden_size=model.config.hidden_size
+        )
+        optimized.save_model_to_file(path_optimized)
+        os.remove(path_raw)
+
+        info["input_names"] = input_names
+        info["output_name"] = output_name
+        with open(os.path.join(output_dir, ONNX_INFO_NAME), "w", encoding="utf-8") as file:
+            json.dump(info, file, indent=2)
+
+    if quantize and not os.path.exists(path_target):
+        print(f"Đang quantize int8 {model_name}...")
+        quantize_dynamic(path_optimized, path_target, weight_type=QuantType.QInt8)
+
+    return output_dir
+
+
+def _session(path : str, num_threads : int):
+    import onnxruntime
+
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if num_threads:
+        options.intra_op_num_threads = num_threads
+    return onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+
+class _ONNX_Model:
+    """
+    Phần chung: export / tải session, tokenizer và chạy theo batch.
+    """
+
+    def __init__(
+        self,
+        model_name : str,
+        task : str,
+        quantize : bool = ONNX_QUANTIZE,
+        cache_dir : Optional[str] = None,
+        num_threads : int = ONNX_NUM_THREADS,
+        batch_size : int = 32
+    ) -> None:
+        from transformers import AutoTokenizer
+
+        self.model_name : str = model_name
+        self.quantize : bool = quantize
+        self.batch_size : int = batch_size
+
+        self.model_dir : str = export_onnx(model_name, task, cache_dir, quantize)
+        with open(os.path.join(self.model_dir, ONNX_INFO_NAME), "r", encoding="utf-8") as file:
+            self.info : Dict = json.load(file)
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_dir)
+        self.session = _session(os.path.join(self.model_dir, _onnx_file_name(quantize)), num_threads)
+
+    def _run(self, texts : Union[List[str], List[List[str]]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Tokenize (pad tới câu dài nhất trong batch) và chạy session, trả về (output, attention_mask)"""
+        if texts and isinstance(texts[0], (list, tuple)):
+            encoded = self.tokenizer(
+                [pair[0] for pair in texts], [pair[1] for pair in texts],
+                padding=True, truncation=True, max_length=self.info["max_length"], return_tensors="np"
+            )
+        else:
+            encoded = self.tokenizer(
+                texts, padding=True, truncation=True, max_length=self.info["max_length"], return_tensors="np"
+            )
+        feeds : Dict[str, np.ndarray] = {name: encoded[name].astype(np.int64) for name in self.info["input_names"]}
+        output : np.ndarray = self.session.run([self.info["output_name"]], feeds)[0]
+        return output, encoded["attention_mask"]
+
+    def _batches(self, items : List) -> List[List[int]]:
+        # Sắp theo độ dài để mỗi batch ít phải pad
+        lengths : List[int] = [len(item) if isinstance(item, str) else sum(map(len, item)) for item in items]
+        order : List[int] = sorted(range(len(items)), key=lambda i: lengths[i], reverse=True)
+        return [order[start:start + self.batch_size] for start in range(0, len(order), self.batch_size)]
+
+
+class ONNX_Embeddings(_ONNX_Model, Embeddings):
+    """
+    Embedding sentence-transformers chạy bằng ONNX Runtime, dùng thay HuggingFaceEmbeddings.
+    """
+
+    def __init__(self, model_name : str = MODEL_NAME_EMBEDDING, **kwargs) -> None:
+        """
+        Args:
+            model_name: Model sentence-transformers (mặc định model_embedding trong config)
+            **kwargs: quantize, cache_dir, num_threads, batch_size
+        """
+        super().__init__(model_name, "embedding", **kwargs)
+
+    def embed_documents(self, texts : List[str]) -> List[List[float]]:
+        embeddings : List[Optional[List[float]]] = [None] * len(texts)
+        for indices in self._batches(texts):
+            hidden, mask = self._run([texts[i] for i in indices])
+            if self.info["pooling"] == "cls":
+                pooled : np.ndarray = hidden[:, 0]
+            else:
+                weights : np.ndarray = mask[:, :, None].astype(np.float32)
+                pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+            if self.info["normalize"]:
+                pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            for i, vector in zip(indices, pooled):
+                embeddings[i] = vector.tolist()
+        return embeddings
+
+    def embed_query(self, text : str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class ONNX_Reranker(_ONNX_Model):
+    """
+    Cross-encoder reranking chạy bằng ONNX Runtime, dùng thay FlagReranker.
+    """
+
+    def __init__(self, model_name : str = MODEL_NAME_RERANKING, **kwargs) -> None:
+        """
+        Args:
+            model_name: Model reranking (mặc định model_reranking trong config)
+            **kwargs: quantize, cache_dir, num_threads, batch_size
+        """
+        super().__init__(model_name, "reranking", **kwargs)
+
+    def compute_score(
+        self,
+        sentence_pairs : Union[List[List[str]], List[str]],
+        normalize : bool = False
+    ) -> Union[List[float], float]:
+        """
+        Điểm liên quan của từng cặp (câu hỏi, đoạn văn), giống FlagReranker.compute_score
+
+        Args:
+            sentence_pairs: List các cặp [câu hỏi, đoạn văn] hoặc một cặp
+            normalize: Đưa điểm về (0, 1) bằng sigmoid
+
+        Returns:
+            List điểm theo thứ tự đầu vào (một số nếu chỉ có một cặp)
+        """
+        if sentence_pairs and isinstance(sentence_pairs[0], str):
+            sentence_pairs = [sentence_pairs]
+        scores : np.ndarray = np.zeros(len(sentence_pairs), dtype=np.float32)
+        for indices in self._batches(sentence_pairs):
+            logits, _ = self._run([sentence_pairs[i] for i in indices])
+            scores[indices] = logits[:, 0]
+        if normalize:
+            scores = 1 / (1 + np.exp(-scores))
+        if len(scores) == 1:
+            return float(scores[0])
+        return scores.tolist()
+
+
+def load_embedding_model(model_name : str = MODEL_NAME_EMBEDDING, backend : Optional[str] = None, **kwargs) -> Embeddings:
+    """
+    Model embedding theo backend (pytorch: HuggingFaceEmbeddings, onnx: ONNX_Embeddings).
+    """
+    backend = backend or INFERENCE_BACKEND
+    if backend == "onnx":
+        return ONNX_Embeddings(model_name, **kwargs)
+    if backend != "pytorch":
+        raise ValueError(f"inference_backend không hợp lệ: {backend}")
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs={'device': DEVICE}
+    )
+
+
+def load_reranker(model_name : str = MODEL_NAME_RERANKING, backend : Optional[str] = None, **kwargs):
+    """
+    Model reranking theo backend (pytorch: FlagReranker, onnx: ONNX_Reranker).
+    """
+    backend = backend or INFERENCE_BACKEND
+    if backend == "onnx":
+        return ONNX_Reranker(model_name, **kwargs)
+    if backend != "pytorch":
+        raise ValueError(f"inference_backend không hợp lệ: {backend}")
+
+    from FlagEmbedding import FlagReranker
+
+    return FlagReranker(
+        model_name,
+        use_fp16=True
+    )
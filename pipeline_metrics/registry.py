@@ -0,0 +1,382 @@
+"""
+Metrics cho pipeline hỏi đáp: histogram thời gian từng bước, counter và gauge,
+xuất ra định dạng text của Prometheus (text exposition format 0.0.4).
+
+Không phụ thuộc thư viện ngoài. Trên hot path chỉ có hai lần time.perf_counter,
+một lần bisect và một lock ngắn cho mỗi lần đo (khoảng vài micro giây): child
+histogram / ERRORS của từng bước chỉ được tạo một lần rồi giữ lại theo tên bước
+nên không phải ghép chuỗi hay tạo label khi đo. Gauge độ sâu hàng đợi dùng hàm
+callback, chỉ được đọc khi /metrics được gọi nên không tốn gì trên hot path.
+
+Số liệu nằm trong bộ nhớ của từng process: chạy gunicorn nhiều worker thì mỗi
+worker có bộ metrics riêng.
+
+Cách dùng:
+    with stage_timer("faiss_search"):
+        documents = vectordb.similarity_search_by_vector(embedding, k=15)
+
+    print(REGISTRY.render())
+
+Author: Physics Problem Solving System Team
+Version: 1.0.0
+"""
+
+from bisect import bisect_left
+from typing import (
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple
+)
+import math
+import threading
+import time
+
+__all__ = [
+    "CACHE_REQUESTS",
+    "CONTENT_TYPE",
+    "Counter",
+    "DEGRADATIONS",
+    "ERRORS",
+    "Gauge",
+    "Histogram",
+    "Metrics_Registry",
+    "REGISTRY",
+    "STAGE_SECONDS",
+    "stage_timer"
+]
+
+CONTENT_TYPE : str = "text/plain; version=0.0.4; charset=utf-8"
+
+# Từ vài ms (phân loại, đọc file) tới vài chục giây (Gemini)
+DEFAULT_BUCKETS : Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+
+def _format_value(value : float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if value != value:
+        return "NaN"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_help(value : str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label(value : str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names : Sequence[str], values : Sequence[str], extra : str = "") -> str:
+    pairs : List[str] = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """
+    Metric có tên, mô tả và các child theo bộ giá trị label.
+    """
+
+    type_name : str = "untyped"
+
+    def __init__(self, name : str, documentation : str, labelnames : Sequence[str] = ()) -> None:
+        self.name : str = name
+        self.documentation : str = documentation
+        self.labelnames : Tuple[str, ...] = tuple(labelnames)
+        self._children : Dict[Tuple[str, ...], object] = {}
+        self._lock : threading.Lock = threading.Lock()
+
+    def _new_child(self) -> object:
+        raise NotImplementedError
+
+    def labels(self, *values : str) -> object:
+        """
+        Child ứng với bộ giá trị label, nên gọi một lần rồi giữ lại để đo trên hot path.
+
+        Raises:
+            ValueError: Số giá trị label không khớp labelnames
+        """
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} cần {len(self.labelnames)} label {self.labelnames}, nhận {len(values)}")
+        key : Tuple[str, ...] = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def children(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with self._lock:
+            return sorted(self._children.items())
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines : List[str] = [
+            f"# HELP {self.name} {_escape_help(self.documentation)}",
+            f"# TYPE {self.name} {self.type_name}"
+        ]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class _Value:
+    """
+    Giá trị đơn của counter / gauge, hoặc đọc từ hàm callback lúc render.
+    """
+
+    __slots__ = ("_value", "_lock", "_function")
+
+    def __init__(self) -> None:
+        self._value : float = 0.0
+        self._lock : threading.Lock = threading.Lock()
+        self._function : Optional[Callable[[], float]] = None
+
+    def inc(self, amount : float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def set(self, value : float) -> None:
+        with self._lock:
+            self._value = float(value)
+
+    def set_function(self, function : Callable[[], float]) -> None:
+        """Đọc giá trị từ function mỗi lần render (ví dụ độ sâu hàng đợi)"""
+        self._function = function
+
+    def get(self) -> float:
+        if self._function is not None:
+            try:
+                return float(self._function())
+            except Exception:
+                return math.nan
+        with self._lock:
+            return self._value
+
+
+class Counter(_Metric):
+    """
+    Bộ đếm chỉ tăng (số lần cache hit, lỗi, degradation, ...).
+    """
+
+    type_name : str = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, *values : str, amount : float = 1.0) -> None:
+        self.labels(*values).inc(amount)
+
+    def samples(self) -> Iterator[str]:
+        for values, child in self.children():
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.get())}"
+
+
+class Gauge(Counter):
+    """
+    Giá trị có thể tăng giảm (độ sâu hàng đợi, số request đang xử lý, ...).
+    """
+
+    type_name : str = "gauge"
+
+
+class _Timer:
+    """
+    Context manager đo thời gian một bước, ghi vào histogram (và ERRORS nếu có exception).
+    """
+
+    __slots__ = ("_histogram", "_errors", "_start")
+
+    def __init__(self, histogram : "_Histogram_Child", errors : Optional[_Value]) -> None:
+        self._histogram : "_Histogram_Child" = histogram
+        self._errors : Optional[_Value] = errors
+
+    def __enter__(self) -> "_Timer":
+        self._start : float = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        self._histogram.observe(time.perf_counter() - self._start)
+        if exc_type is not None and self._errors is not None:
+            self._errors.inc()
+        return False
+
+
+class _Histogram_Child:
+    """
+    Số lần quan sát theo từng bucket, tổng và số lượng của một bộ label.
+    """
+
+    __slots__ = ("_bounds", "_counts", "_sum", "_lock")
+
+    def __init__(self, bounds : Tuple[float, ...]) -> None:
+        self._bounds : Tuple[float, ...] = bounds
+        # Phần tử cuối cùng là bucket +Inf
+        self._counts : List[int] = [0] * (len(bounds) + 1)
+        self._sum : float = 0.0
+        self._lock : threading.Lock = threading.Lock()
+
+    def observe(self, value : float) -> None:
+        index : int = bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def time(self, errors : Optional[_Value] = None) -> _Timer:
+        """Context manager đo thời gian khối lệnh, errors được tăng khi khối lệnh ném exception"""
+        return _Timer(self, errors)
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class Histogram(_Metric):
+    """
+    Phân bố thời gian (giây) theo các bucket cố định.
+    """
+
+    type_name : str = "histogram"
+
+    def __init__(
+        self,
+        name : str,
+        documentation : str,
+        labelnames : Sequence[str] = (),
+        buckets : Sequence[float] = DEFAULT_BUCKETS
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets : Tuple[float, ...] = tuple(sorted(float(bucket) for bucket in buckets if bucket != math.inf))
+
+    def _new_child(self) -> _Histogram_Child:
+        return _Histogram_Child(self.buckets)
+
+    def observe(self, *values : str, value : float) -> None:
+        self.labels(*values).observe(value)
+
+    def samples(self) -> Iterator[str]:
+        for values, child in self.children():
+            counts, total = child.snapshot()
+            cumulative : int = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels : str = _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Metrics_Registry:
+    """
+    Tập các metric được xuất ra cùng một endpoint.
+    """
+
+    def __init__(self) -> None:
+        self._metrics : Dict[str, _Metric] = {}
+        self._lock : threading.Lock = threading.Lock()
+
+    def register(self, metric : _Metric) -> _Metric:
+        """
+        Đăng ký metric, trả về chính metric đó.
+
+        Raises:
+            ValueError: Tên metric đã được đăng ký
+        """
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} đã được đăng ký")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name : str, documentation : str, labelnames : Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name : str, documentation : str, labelnames : Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name : str,
+        documentation : str,
+        labelnames : Sequence[str] = (),
+        buckets : Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name : str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Toàn bộ metric theo định dạng text của Prometheus"""
+        with self._lock:
+            metrics : List[_Metric] = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY : Metrics_Registry = Metrics_Registry()
+
+STAGE_SECONDS : Histogram = REGISTRY.histogram(
+    "physics_stage_duration_seconds",
+    "Thời gian từng bước của pipeline hỏi đáp",
+    ["stage"]
+)
+ERRORS : Counter = REGISTRY.counter(
+    "physics_errors_total",
+    "Số lần một bước của pipeline bị lỗi",
+    ["stage"]
+)
+CACHE_REQUESTS : Counter = REGISTRY.counter(
+    "physics_cache_requests_total",
+    "Số lần tra cache theo kết quả (hit / miss)",
+    ["cache", "result"]
+)
+DEGRADATIONS : Counter = REGISTRY.counter(
+    "physics_degradations_total",
+    "Số lần hệ thống chạy ở chế độ giảm chất lượng (fallback, từ chối request, dữ liệu cũ)",
+    ["reason"]
+)
+
+
+class _Stage_Timer:
+    """
+    Timer của một bước đã được tạo sẵn child histogram và child ERRORS.
+    """
+
+    __slots__ = ("histogram", "errors")
+
+    def __init__(self, stage : str) -> None:
+        self.histogram : _Histogram_Child = STAGE_SECONDS.labels(stage)
+        self.errors : _Value = ERRORS.labels(stage)
+
+    def __call__(self) -> _Timer:
+        return self.histogram.time(self.errors)
+
+
+_stage_timers : Dict[str, _Stage_Timer] = {}
+
+
+def stage_timer(stage : str) -> _Timer:
+    """
+    Context manager đo thời gian bước stage vào STAGE_SECONDS, lỗi được đếm vào ERRORS.
+
+    Args:
+        stage: Tên bước (classify, embed_query, faiss_search, rerank, dataset_read, gemini, ...)
+    """
+    timer : Optional[_Stage_Timer] = _stage_timers.get(stage)
+    if timer is None:
+        timer = _stage_timers.setdefault(stage, _Stage_Timer(stage))
+    return timer()
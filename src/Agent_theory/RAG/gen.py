@@ -10,12 +10,15 @@ Author: Physics Problem Solving System Team
 Version: 1.0.0
 """
 import google.generativeai as genai
-from typing import List, Dict, Optional
+from typing import List, Dict, Iterator, Optional
 from pathlib import Path
 import yaml
 import os
 from dotenv import load_dotenv
 
+from convert_latex_to_text import convert_stream
+from pipeline_metrics import ERRORS
+
 # Load environment variables
 load_dotenv()
 
@@ -131,6 +134,7 @@ Trả lời:"""
                 return "Xin lỗi, tôi không thể tạo câu trả lời cho câu hỏi này."
                 
         except Exception as e:
+            ERRORS.inc("gemini")
             print(f"Error generating response: {e}")
             return f"Đã xảy ra lỗi khi tạo câu trả lời: {str(e)}"
     
@@ -154,18 +158,37 @@ Trả lời:"""
             # Generate với streaming
             response = self.model.generate_content(prompt, stream=True)
             
-            full_response = ""
-            for chunk in response:
-                if chunk.text:
-                    full_response += chunk.text
-                    # Có thể yield từng chunk nếu cần
+            full_response = "".join(convert_stream(chunk.text for chunk in response if chunk.text))
                     
             return full_response if full_response else "Không thể tạo câu trả lời."
             
         except Exception as e:
+            ERRORS.inc("gemini")
             print(f"Error in streaming response: {e}")
             return f"Đã xảy ra lỗi: {str(e)}"
     
+    def stream(self) -> Iterator[str]:
+        """
+        Tạo câu trả lời và trả về từng đoạn ngay khi model sinh ra.
+        
+        LaTeX mà model vẫn dùng (dù prompt yêu cầu không dùng) được chuyển sang text
+        ngay khi đoạn đó hoàn chỉnh, chỉ phần lệnh / ngoặc dở dang được giữ lại chờ chunk sau.
+        
+        Yields:
+            String chứa từng đoạn câu trả lời đã chuyển đổi
+        """
+        prompt = f"""{system}
+
+Câu hỏi: {self.question}
+
+Nội dung trả lời của câu hỏi:
+{self.context}
+
+Trả lời:"""
+        
+        response = self.model.generate_content(prompt, stream=True)
+        yield from convert_stream(chunk.text for chunk in response if chunk.text)
+    
     def get_token_count(self) -> int:
         """
         Đếm số token trong prompt.
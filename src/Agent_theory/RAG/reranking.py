@@ -16,6 +16,7 @@ from langchain_community.vectorstores import FAISS
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from typing import List, Tuple, Optional
 from langchain.schema import Document
+from pipeline_metrics import stage_timer
 import logging
 from typing import (
     List,
@@ -48,18 +49,29 @@ class Reranking:
         """
         self.__user_query: str = user_query
 
-    def get_initial_results(self, vectordb : FAISS , k: int = 10) -> List[Document]:
+    def get_initial_results(
+        self,
+        vectordb : FAISS,
+        k: int = 10,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[Document]:
         """
         Lấy kết quả ban đầu từ FAISS
         
         Args:
             vectordb: Vector database FAISS
             k: Số lượng documents cần retrieve
+            query_embedding: Embedding của câu hỏi nếu đã tính trước (tránh embedding lại)
             
         Returns:
             List các documents
         """
-        return vectordb.similarity_search(self.__user_query, k=k)
+        if query_embedding is not None:
+            with stage_timer("faiss_search"):
+                return vectordb.similarity_search_by_vector(query_embedding, k=k)
+        # similarity_search tự embed câu hỏi nên đo riêng, không lẫn với faiss_search
+        with stage_timer("embed_and_faiss_search"):
+            return vectordb.similarity_search(self.__user_query, k=k)
     
     def rerank_results(
         self, 
@@ -85,7 +97,8 @@ class Reranking:
         ]
         
         # Compute scores
-        scores = reranker.compute_score(pairs)
+        with stage_timer("rerank"):
+            scores = reranker.compute_score(pairs)
         
         # Sắp xếp theo điểm
         ranked_results = sorted(
@@ -102,7 +115,8 @@ class Reranking:
         reranker : FlagReranker,
         initial_k: int = 10, 
         top_n: int = 3,
-        return_scores: bool = True
+        return_scores: bool = True,
+        query_embedding: Optional[List[float]] = None
     ) -> List[Tuple[Document, float]] | List[Document]:
         """
         Thực hiện search với reranking
@@ -118,12 +132,13 @@ class Reranking:
             initial_k: Số documents ban đầu để retrieve
             top_n: Số documents sau reranking
             return_scores: Có trả về scores hay không
+            query_embedding: Embedding của câu hỏi nếu đã tính trước
             
         Returns:
             List documents hoặc list tuples (document, score)
         """
         # Bước 1: Retrieve
-        initial_results = self.get_initial_results(vectordb=VectorDB,k=initial_k)
+        initial_results = self.get_initial_results(vectordb=VectorDB,k=initial_k,query_embedding=query_embedding)
         
         # Bước 2: Rerank
         ranked_results = self.rerank_results(reranker,initial_results, top_n=top_n)
@@ -134,7 +149,13 @@ class Reranking:
             return [doc for doc, _ in ranked_results]
     
 
-def get_information(user_query : str, VectorDB : FAISS, reranking : FlagReranker, dataset_dict : Dict[str, str]) -> str:
+def get_information(
+    user_query : str,
+    VectorDB : FAISS,
+    reranking : FlagReranker,
+    dataset_dict : Dict[str, str],
+    query_embedding : Optional[List[float]] = None
+) -> str:
     """
     Hàm chính để lấy thông tin liên quan từ vector database.
     
@@ -148,6 +169,7 @@ def get_information(user_query : str, VectorDB : FAISS, reranking : FlagReranker
         VectorDB: Vector database FAISS
         reranking: Model FlagReranker
         dataset_dict: Dictionary chứa mapping từ câu hỏi sang nội dung
+        query_embedding: Embedding của câu hỏi nếu đã tính trước (dùng chung với router)
         
     Returns:
         String chứa nội dung liên quan được kết hợp
@@ -157,7 +179,8 @@ def get_information(user_query : str, VectorDB : FAISS, reranking : FlagReranker
         reranking,
         initial_k=15, 
         top_n=5,
-        return_scores=True
+        return_scores=True,
+        query_embedding=query_embedding
     )
 
     array_text_result : List[str] = [dataset_dict[doc.page_content] for doc, score in array_result]
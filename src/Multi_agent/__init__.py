@@ -1 +1,34 @@
-from .agent_multiple_choice import *
\ No newline at end of file
+"""
+Agent trắc nghiệm (model Qwen + LoRA), inference server và client của nó.
+
+Các tên được import khi dùng tới: client (Multiple_Choice_Client) không cần torch,
+còn agent_multiple_choice tải torch / transformers / peft.
+
+Author: Physics Problem Solving System Team
+Version: 1.0.0
+"""
+
+import importlib
+
+_LAZY_NAMES = {
+    "Multiple_Choice_Client": ".client",
+    "REQUEST_TIMEOUT": ".client",
+    "SERVER_URL": ".client",
+    "ANSWER_LINE_REGEX": ".agent_multiple_choice",
+    "ANSWER_MAX_NEW_TOKENS": ".agent_multiple_choice",
+    "ANSWER_PREFIX": ".agent_multiple_choice",
+    "AnswerLineStoppingCriteria": ".agent_multiple_choice",
+    "PhysicsMultipleChoiceAgent": ".agent_multiple_choice",
+    "QUESTION_HEADER": ".agent_multiple_choice",
+    "TORCH_DTYPES": ".agent_multiple_choice",
+    "answer_line_choice": ".agent_multiple_choice",
+}
+
+__all__ = list(_LAZY_NAMES)
+
+
+def __getattr__(name : str) -> object:
+    module_name = _LAZY_NAMES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module_name, __name__), name)
@@ -1,66 +1,181 @@
 import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM
+from transformers import AutoTokenizer, AutoModelForCausalLM, StoppingCriteria, StoppingCriteriaList
 from peft import PeftModel
+import copy
 import json
+import re
 import time
 import os
 
+from .evaluate_precision import is_precision_allowed
+from .merge_lora import (
+    BASE_MODEL_NAME,
+    get_merged_checkpoint,
+    load_lora_config
+)
+
+TORCH_DTYPES = {
+    "float32": torch.float32,
+    "float16": torch.float16,
+    "bfloat16": torch.bfloat16,
+    # int8: tải float32 rồi quantize động các lớp Linear
+    "int8": torch.float32
+}
+
+# Phần mở đầu chung của mọi câu hỏi (cùng system prompt tạo thành prefix cố định được cache)
+QUESTION_HEADER = "Câu hỏi vật lý:"
+
+# Prompt kết thúc bằng ANSWER_PREFIX, phần sinh ra là phần tiếp theo của dòng này
+ANSWER_PREFIX = "Đáp án:"
+
+# Dòng đáp án hợp lệ ở đầu dòng: "Đáp án: B" (sau chữ cái là dấu câu hoặc khoảng trắng) hoặc chữ
+# cái có dấu ngay sau ("B.", "(B)", "B:"). Chữ cái đứng một mình như "A = F.s", "C là điện dung"
+# trong lời giải không được tính.
+ANSWER_LINE_REGEX = re.compile(
+    r"^[ \t]*(?:Đáp án[ \t]*:?[ \t]*\(?(?=[A-D][.):,\s])|\(?(?=[A-D][.):]))([A-D])", re.MULTILINE
+)
+
+def answer_line_choice(generated_text):
+    """Chữ cái của dòng đáp án đầu tiên trong phần sinh ra (tiếp sau ANSWER_PREFIX), None nếu không có"""
+    # Thêm "\n" để chữ cái đứng cuối (sinh xong ngay sau đáp án) vẫn được tính
+    match = ANSWER_LINE_REGEX.search(ANSWER_PREFIX + generated_text + "\n")
+    return match.group(1) if match else None
+
+# Số token tối đa sinh ra ở chế độ "answer" (chỉ cần dòng đáp án)
+ANSWER_MAX_NEW_TOKENS = 32
+
+# Số token cuối được decode mỗi bước khi tìm dòng đáp án (dòng đáp án chỉ dài vài token)
+ANSWER_WINDOW_TOKENS = 16
+
+class AnswerLineStoppingCriteria(StoppingCriteria):
+    """
+    Dừng sinh cho từng câu ngay khi phần đã sinh chứa một dòng đáp án hợp lệ (A-D)
+    
+    Mỗi bước chỉ decode ANSWER_WINDOW_TOKENS token cuối của các câu chưa có dòng đáp án
+    (dòng đáp án phải bắt đầu trong cửa sổ này), nên chi phí mỗi bước không tăng theo số token đã sinh.
+    """
+    
+    def __init__(self, tokenizer, prompt_length, window=ANSWER_WINDOW_TOKENS):
+        """
+        Args:
+            tokenizer: Tokenizer để decode phần đã sinh
+            prompt_length: Số token của prompt (kể cả pad) trong input_ids
+            window: Số token cuối được decode mỗi bước
+        """
+        self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+        self.window = window
+        # Số token đã sinh khi dòng đáp án xuất hiện, None nếu chưa có
+        self.used_tokens = None
+    
+    def __call__(self, input_ids, scores, **kwargs):
+        if self.used_tokens is None:
+            self.used_tokens = [None] * input_ids.shape[0]
+        
+        generated = input_ids.shape[1] - self.prompt_length
+        start = max(self.prompt_length, input_ids.shape[1] - self.window)
+        for row in range(input_ids.shape[0]):
+            if self.used_tokens[row] is None:
+                text = self.tokenizer.decode(input_ids[row, start:], skip_special_tokens=True)
+                if start == self.prompt_length:
+                    # Cửa sổ bắt đầu từ đầu phần sinh ra: tiếp theo dòng "Đáp án:" của prompt
+                    text = ANSWER_PREFIX + text
+                else:
+                    # Cửa sổ bắt đầu giữa dòng: chỉ xét từ dòng mới đầu tiên trong cửa sổ
+                    text = text[text.find("\n") + 1:] if "\n" in text else ""
+                if ANSWER_LINE_REGEX.search(text):
+                    self.used_tokens[row] = generated
+        
+        done = [used is not None for used in self.used_tokens]
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
 class PhysicsMultipleChoiceAgent:
-    def __init__(self, model_path, device="cuda" if torch.cuda.is_available() else "cpu"):
+    def __init__(self, model_path, device="cuda" if torch.cuda.is_available() else "cpu",
+                 use_merged=True, base_model_name=BASE_MODEL_NAME, merged_cache_dir=None,
+                 system_prompt=None, use_prefix_cache=True, precision=None, check_precision=True):
         """
         Khởi tạo agent cho bài toán trắc nghiệm vật lý
         
         Args:
-            model_path: Đường dẫn đến model đã fine-tune
+            model_path: Đường dẫn đến LoRA adapter đã fine-tune
             device: Thiết bị chạy model (cuda/cpu)
+            use_merged: Dùng checkpoint đã merge LoRA vào base model (merge một lần, cache theo
+                hash của adapter) thay vì bọc PeftModel mỗi lần khởi động
+            base_model_name: Base model của adapter
+            merged_cache_dir: Thư mục cache checkpoint đã merge (mặc định path_merged_lora_cache trong config)
+            system_prompt: System prompt đặt trước mọi câu hỏi (nếu có)
+            use_prefix_cache: Tính sẵn past key/values của phần prompt cố định (system prompt +
+                "Câu hỏi vật lý:") một lần và dùng lại cho mọi câu hỏi, mọi batch
+            precision: float32, float16, bfloat16 hoặc int8 (quantize động, chỉ CPU). Mặc định
+                float16 trên cuda, float32 trên CPU. bfloat16 / int8 chỉ dùng cho checkpoint đã merge
+            check_precision: Chỉ dùng bfloat16 / int8 nếu evaluate_precision đã xác nhận độ chính
+                xác giảm trong mức cho phép, nếu không thì quay về float32
         """
         self.device = device
         self.model_path = model_path
+        self.merged_path = None
+        self.system_prompt = system_prompt
+        self.use_prefix_cache = use_prefix_cache
+        self._prefix_past = None
+        self._batch_prefill_seconds = {}
+        self.prefix_cache_stats = None
+        
+        if precision is None:
+            precision = "float16" if device == "cuda" else "float32"
+        if precision not in TORCH_DTYPES:
+            raise ValueError(f"precision không hợp lệ: {precision}")
+        if precision == "int8" and device == "cuda":
+            raise ValueError("int8 (quantize động) chỉ hỗ trợ trên CPU")
+        if precision in ("bfloat16", "int8") and not use_merged:
+            raise ValueError(f"precision {precision} chỉ dùng được với checkpoint đã merge (use_merged=True)")
         
         print(f"Đang tải model từ: {model_path}")
         print(f"Sử dụng thiết bị: {device}")
         
-        # Tải tokenizer
-        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
-        
-        # Tải base model
-        self.base_model = AutoModelForCausalLM.from_pretrained(
-            "Qwen/Qwen3-0.6B",
-            torch_dtype=torch.float16 if device == "cuda" else torch.float32,
-            device_map="auto" if device == "cuda" else None,
-            trust_remote_code=True
-        )
-        
-        # Sửa cấu hình LoRA để tương thích
-        self._fix_lora_config()
-        
-        # Tải LoRA adapter
-        self.model = PeftModel.from_pretrained(self.base_model, model_path)
+        if use_merged:
+            # Checkpoint safetensors độc lập, đọc bằng mmap
+            merged_path = get_merged_checkpoint(model_path, base_model_name, merged_cache_dir)
+            self.merged_path = merged_path
+            print(f"Dùng checkpoint đã merge LoRA: {merged_path}")
+            
+            if check_precision and precision in ("bfloat16", "int8") and not is_precision_allowed(merged_path, precision):
+                print(f"⚠️  Precision {precision} chưa được đánh giá hoặc giảm độ chính xác quá mức cho phép "
+                      f"(python -m src.Multi_agent.evaluate_precision), dùng float32")
+                precision = "float32"
+            
+            self.tokenizer = AutoTokenizer.from_pretrained(merged_path)
+            self.model = AutoModelForCausalLM.from_pretrained(
+                merged_path,
+                torch_dtype=TORCH_DTYPES[precision],
+                device_map="auto" if device == "cuda" else None,
+                low_cpu_mem_usage=True
+            )
+            
+            if precision == "int8":
+                # Trọng số Linear lưu int8, activation được quantize động khi chạy
+                self.model = torch.ao.quantization.quantize_dynamic(
+                    self.model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+        else:
+            # Tải tokenizer
+            self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+            
+            # Tải base model
+            self.base_model = AutoModelForCausalLM.from_pretrained(
+                base_model_name,
+                torch_dtype=TORCH_DTYPES[precision],
+                device_map="auto" if device == "cuda" else None,
+                trust_remote_code=True
+            )
+            
+            # Tải LoRA adapter (cấu hình được sửa trong bộ nhớ để tương thích với PEFT hiện tại)
+            self.model = PeftModel.from_pretrained(self.base_model, model_path, config=load_lora_config(model_path))
         
         # Đặt model ở chế độ evaluation
         self.model.eval()
+        self.precision = precision
         
-        print("Model đã được tải thành công!")
-    
-    def _fix_lora_config(self):
-        """Sửa cấu hình LoRA để tương thích với phiên bản PEFT hiện tại"""
-        config_path = os.path.join(self.model_path, "adapter_config.json")
-        if os.path.exists(config_path):
-            import json
-            with open(config_path, 'r') as f:
-                config = json.load(f)
-            
-            # Loại bỏ các tham số không tương thích
-            incompatible_keys = ['corda_config', 'eva_config', 'megatron_config', 'megatron_core']
-            for key in incompatible_keys:
-                if key in config:
-                    del config[key]
-            
-            # Lưu lại cấu hình đã sửa
-            with open(config_path, 'w') as f:
-                json.dump(config, f, indent=2)
-            
-            print("Đã sửa cấu hình LoRA để tương thích")
+        print(f"Model đã được tải thành công! (precision {precision})")
     
     def format_physics_question(self, question, options, correct_answer=None):
         """
@@ -75,16 +190,17 @@ class PhysicsMultipleChoiceAgent:
         for i, option in enumerate(options):
             formatted_options += f"{chr(65+i)}. {option}\n"
         
-        prompt = f"""Câu hỏi vật lý: {question}
+        prompt = f"""{QUESTION_HEADER} {question}
 
 Các lựa chọn:
 {formatted_options.strip()}
 
-Đáp án:"""
+{ANSWER_PREFIX}"""
         
         return prompt
     
-    def generate_answer(self, question, options, max_length=512, temperature=0.7, top_p=0.9):
+    def generate_answer(self, question, options, max_length=512, temperature=0.7, top_p=0.9,
+                        max_new_tokens=None, stop_at_answer=False, greedy=False):
         """
         Sinh đáp án cho câu hỏi trắc nghiệm vật lý
         
@@ -94,44 +210,352 @@ Các lựa chọn:
             max_length: Độ dài tối đa của output
             temperature: Nhiệt độ sampling
             top_p: Top-p sampling
+            max_new_tokens: Số token tối đa sinh thêm (không tính prompt)
+            stop_at_answer: Dừng ngay khi đã có dòng đáp án hợp lệ (A-D)
+            greedy: Greedy decoding
         """
-        prompt = self.format_physics_question(question, options)
+        generation = self.generate_answers(
+            [{'question': question, 'options': options}],
+            batch_size=1, max_length=max_length, temperature=temperature, top_p=top_p,
+            max_new_tokens=max_new_tokens, stop_at_answer=stop_at_answer, greedy=greedy
+        )[0]
         
-        # Tokenize input
-        inputs = self.tokenizer(prompt, return_tensors="pt").to(self.device)
-        
-        # Generate
+        return generation['answer'], generation['full_response']
+    
+    def prompt_prefix(self):
+        """Phần prompt giống nhau ở mọi câu hỏi"""
+        if self.system_prompt:
+            return f"{self.system_prompt}\n\n{QUESTION_HEADER}"
+        return QUESTION_HEADER
+    
+    def _prefix_cache(self):
+        """
+        Token và past key/values của prompt_prefix, tính một lần (prefill) rồi dùng lại
+        """
+        if self._prefix_past is None:
+            prefix_ids = self.tokenizer(self.prompt_prefix(), return_tensors="pt")['input_ids'].to(self.device)
+            
+            self._prefix_past, prefill_time = self._timed_prefill(prefix_ids)
+            
+            self._prefix_ids = prefix_ids
+            self._batch_prefill_seconds = {1: prefill_time}
+            self.prefix_cache_stats = {
+                'prefix_tokens': prefix_ids.shape[1],
+                'prefill_seconds': prefill_time,
+                'batch_prefill_seconds': dict(self._batch_prefill_seconds),
+                'reused_rows': 0,
+                'reused_batches': 0,
+                'estimated_seconds_saved': 0.0
+            }
+        return self._prefix_ids, self._prefix_past
+    
+    def _timed_prefill(self, input_ids):
+        """Một lượt forward (prefill) trên input_ids, trả về (past_key_values, số giây)"""
+        if self.device == "cuda":
+            torch.cuda.synchronize()
+        start_time = time.time()
         with torch.no_grad():
-            outputs = self.model.generate(
-                **inputs,
-                max_length=max_length,
-                temperature=temperature,
-                top_p=top_p,
-                do_sample=True,
-                pad_token_id=self.tokenizer.eos_token_id,
-                eos_token_id=self.tokenizer.eos_token_id
-            )
+            past = self.model(input_ids=input_ids, use_cache=True).past_key_values
+        if self.device == "cuda":
+            torch.cuda.synchronize()
+        return past, time.time() - start_time
+    
+    def _batch_prefill_time(self, prefix_ids, rows):
+        """
+        Thời gian prefill prefix cho cả batch `rows` câu, đo một lần cho mỗi kích thước batch
+        
+        Prefill batch không tốn gấp `rows` lần prefill một câu (GPU xử lý song song các dòng),
+        nên thời gian tiết kiệm được ước tính theo lần đo thật này.
+        """
+        if rows not in self._batch_prefill_seconds:
+            _, seconds = self._timed_prefill(prefix_ids.expand(rows, -1))
+            self._batch_prefill_seconds[rows] = seconds
+            self.prefix_cache_stats['batch_prefill_seconds'][rows] = seconds
+        return self._batch_prefill_seconds[rows]
+    
+    def _batch_inputs(self, cases):
+        """
+        Input của một batch: token của prefix + phần riêng của từng câu (pad bên trái phần riêng)
+        
+        Prefix và phần riêng luôn được tokenize riêng để kết quả giống nhau dù có dùng
+        prefix cache hay không. Khi dùng cache, trả thêm past_key_values (bản sao của cache
+        prefix, nhân theo số câu trong batch) để model không phải encode lại prefix.
+        """
+        suffixes = [
+            self.format_physics_question(case['question'], case['options'])[len(QUESTION_HEADER):]
+            for case in cases
+        ]
+        suffix = self.tokenizer(
+            suffixes, return_tensors="pt", padding=True, padding_side="left", add_special_tokens=False
+        ).to(self.device)
         
-        # Decode output
-        generated_text = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+        if self.use_prefix_cache:
+            prefix_ids, prefix_past = self._prefix_cache()
+        else:
+            prefix_ids = self.tokenizer(self.prompt_prefix(), return_tensors="pt")['input_ids'].to(self.device)
         
-        # Lấy phần đáp án (sau "Đáp án:")
-        answer_part = generated_text.split("Đáp án:")[-1].strip()
+        rows = len(cases)
+        inputs = {
+            'input_ids': torch.cat([prefix_ids.expand(rows, -1), suffix['input_ids']], dim=1),
+            'attention_mask': torch.cat([
+                torch.ones((rows, prefix_ids.shape[1]), dtype=suffix['attention_mask'].dtype, device=self.device),
+                suffix['attention_mask']
+            ], dim=1)
+        }
         
-        return answer_part, generated_text
+        if self.use_prefix_cache:
+            # generate / forward ghi thêm vào cache nên phải dùng bản sao
+            past = copy.deepcopy(prefix_past)
+            if rows > 1:
+                past.batch_repeat_interleave(rows)
+            inputs['past_key_values'] = past
+            
+            seconds = self._batch_prefill_time(prefix_ids, rows)
+            stats = self.prefix_cache_stats
+            stats['reused_rows'] += rows
+            stats['reused_batches'] += 1
+            stats['estimated_seconds_saved'] += seconds
+        
+        return inputs
+    
+    def _length_order(self, test_questions):
+        """Thứ tự câu hỏi theo số token của phần riêng (để các câu dài gần bằng nhau chung batch)"""
+        suffixes = [
+            self.format_physics_question(case['question'], case['options'])[len(QUESTION_HEADER):]
+            for case in test_questions
+        ]
+        lengths = [len(ids) for ids in self.tokenizer(suffixes, add_special_tokens=False)['input_ids']]
+        return sorted(range(len(test_questions)), key=lambda i: lengths[i])
+    
+    def _pad_token_id(self):
+        """pad_token_id của tokenizer (dùng eos nếu tokenizer không có pad token)"""
+        if self.tokenizer.pad_token_id is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        return self.tokenizer.pad_token_id
+    
+    def generate_answers(self, test_questions, batch_size=8, max_length=512, temperature=0.7, top_p=0.9,
+                         max_new_tokens=None, stop_at_answer=False, greedy=False):
+        """
+        Sinh đáp án cho nhiều câu hỏi theo batch
+        
+        Các prompt được sắp xếp theo số token rồi chia thành batch (các câu dài gần bằng nhau
+        nằm chung batch nên ít phải pad), pad bên trái để mọi câu cùng sinh tiếp từ cuối prompt.
+        
+        Args:
+            test_questions: List các dict chứa question, options
+            batch_size: Số câu hỏi mỗi lần generate
+            max_length: Độ dài tối đa của output (tính cả prompt), bỏ qua nếu có max_new_tokens
+            temperature: Nhiệt độ sampling
+            top_p: Top-p sampling
+            max_new_tokens: Số token tối đa sinh thêm (không tính prompt)
+            stop_at_answer: Dừng từng câu ngay khi đã sinh ra dòng đáp án hợp lệ (A-D)
+            greedy: Greedy decoding (bỏ qua temperature, top_p)
+        
+        Returns:
+            List các dict (answer, choice, full_response, generated_tokens, used_tokens, time_taken) theo
+            đúng thứ tự đầu vào. choice là chữ cái của dòng đáp án (None nếu không có), used_tokens
+            là số token cần để có dòng đáp án (0 nếu không có),
+            time_taken là thời gian chờ của câu hỏi (thời gian của cả batch chứa nó)
+        """
+        order = self._length_order(test_questions)
+        
+        pad_token_id = self._pad_token_id()
+        eos_token_id = self.tokenizer.eos_token_id
+        
+        generation_kwargs = {'pad_token_id': pad_token_id, 'eos_token_id': eos_token_id}
+        if max_new_tokens is not None:
+            generation_kwargs['max_new_tokens'] = max_new_tokens
+        else:
+            generation_kwargs['max_length'] = max_length
+        if greedy:
+            generation_kwargs['do_sample'] = False
+        else:
+            generation_kwargs.update(do_sample=True, temperature=temperature, top_p=top_p)
+        
+        outputs_by_index = [None] * len(test_questions)
+        for start in range(0, len(order), batch_size):
+            indices = order[start:start + batch_size]
+            
+            start_time = time.time()
+            inputs = self._batch_inputs([test_questions[i] for i in indices])
+            # Chỉ gắn stopping criterion khi cần dừng sớm, không tốn decode mỗi bước ở chế độ sinh lời giải
+            answer_line = AnswerLineStoppingCriteria(self.tokenizer, inputs['input_ids'].shape[1]) if stop_at_answer else None
+            with torch.no_grad():
+                outputs = self.model.generate(
+                    **inputs,
+                    **generation_kwargs,
+                    stopping_criteria=StoppingCriteriaList([answer_line] if answer_line else [])
+                )
+            batch_time = time.time() - start_time
+            
+            new_tokens = outputs[:, inputs['input_ids'].shape[1]:]
+            used_tokens = (answer_line and answer_line.used_tokens) or [None] * len(indices)
+            for row, i in enumerate(indices):
+                # Số token sinh ra: tới hết eos đầu tiên, bỏ phần pad phía sau (câu dừng sớm được pad)
+                tokens = new_tokens[row].tolist()
+                generated_tokens = len(tokens)
+                for position, token in enumerate(tokens):
+                    if token == eos_token_id:
+                        generated_tokens = position + 1
+                        break
+                    if token == pad_token_id:
+                        generated_tokens = position
+                        break
+                if stop_at_answer and used_tokens[row] is not None:
+                    # Dừng ngay tại dòng đáp án (pad có thể trùng eos nên không đếm được từ pad)
+                    generated_tokens = min(generated_tokens, used_tokens[row])
+                
+                generated_text = self.tokenizer.decode(outputs[row], skip_special_tokens=True)
+                new_text = self.tokenizer.decode(new_tokens[row, :generated_tokens], skip_special_tokens=True)
+                if answer_line is None:
+                    # Không có criterion: đếm token cần để có dòng đáp án một lần sau khi sinh xong
+                    used_tokens[row] = self._answer_line_tokens(tokens[:generated_tokens], new_text)
+                outputs_by_index[i] = {
+                    'answer': generated_text.split(ANSWER_PREFIX)[-1].strip(),
+                    'choice': answer_line_choice(new_text),
+                    'full_response': generated_text,
+                    'generated_tokens': generated_tokens,
+                    'used_tokens': min(used_tokens[row] or 0, generated_tokens),
+                    'time_taken': batch_time
+                }
+        
+        return outputs_by_index
+    
+    def _answer_line_tokens(self, tokens, text):
+        """
+        Số token đầu tiên của tokens đã chứa dòng đáp án (text là decode của tokens), None nếu không có.
+        Tìm nhị phân nên chỉ decode khoảng log2(len(tokens)) lần.
+        """
+        if not ANSWER_LINE_REGEX.search(ANSWER_PREFIX + text):
+            return None
+        low, high = 1, len(tokens)
+        while low < high:
+            middle = (low + high) // 2
+            prefix = self.tokenizer.decode(tokens[:middle], skip_special_tokens=True)
+            if ANSWER_LINE_REGEX.search(ANSWER_PREFIX + prefix):
+                high = middle
+            else:
+                low = middle + 1
+        return low
+    
+    def _choice_token_ids(self, letter):
+        """Các token id có thể đứng sau "Đáp án:" cho một lựa chọn ("A" và " A")"""
+        cache = self.__dict__.setdefault('_choice_ids', {})
+        if letter not in cache:
+            token_ids = set()
+            for text in (letter, " " + letter):
+                ids = self.tokenizer.encode(text, add_special_tokens=False)
+                if len(ids) == 1:
+                    token_ids.add(ids[0])
+            cache[letter] = sorted(token_ids)
+        return cache[letter]
+    
+    def score_answers(self, test_questions, batch_size=8):
+        """
+        Chọn đáp án bằng một lần forward trên prompt (kết thúc bằng "Đáp án:"), không sinh text
+        
+        Đọc logits của token tiếp theo cho từng chữ cái lựa chọn (A, B, C, D...), chuẩn hóa
+        softmax trên các lựa chọn. Kết quả tất định (không sampling).
+        
+        Args:
+            test_questions: List các dict chứa question, options
+            batch_size: Số câu hỏi mỗi lần forward
+        
+        Returns:
+            List các dict (predicted_answer, probabilities, time_taken) theo đúng thứ tự đầu vào
+        """
+        order = self._length_order(test_questions)
+        self._pad_token_id()
+        
+        scores_by_index = [None] * len(test_questions)
+        for start in range(0, len(order), batch_size):
+            indices = order[start:start + batch_size]
+            
+            start_time = time.time()
+            inputs = self._batch_inputs([test_questions[i] for i in indices])
+            # Vị trí tính theo token thật (phần pad giữa prefix và phần riêng không được tính)
+            position_ids = (inputs['attention_mask'].cumsum(-1) - 1).clamp(min=0)
+            if 'past_key_values' in inputs:
+                # Prefix đã có trong cache, chỉ forward phần riêng của từng câu
+                prefix_length = inputs['past_key_values'].get_seq_length()
+                inputs['input_ids'] = inputs['input_ids'][:, prefix_length:]
+                position_ids = position_ids[:, prefix_length:]
+            with torch.no_grad():
+                logits = self.model(**inputs, position_ids=position_ids).logits[:, -1, :].float()
+            batch_time = time.time() - start_time
+            
+            for row, i in enumerate(indices):
+                letters = [chr(65 + k) for k in range(len(test_questions[i]['options']))]
+                # Mỗi lựa chọn lấy logsumexp trên các biến thể token ("A", " A")
+                letter_logits = torch.stack([
+                    torch.logsumexp(logits[row, self._choice_token_ids(letter)], dim=0)
+                    for letter in letters
+                ])
+                probabilities = torch.softmax(letter_logits, dim=0).tolist()
+                scores_by_index[i] = {
+                    'predicted_answer': letters[int(letter_logits.argmax())],
+                    'probabilities': dict(zip(letters, probabilities)),
+                    'time_taken': batch_time
+                }
+        
+        return scores_by_index
     
-    def batch_test(self, test_questions, verbose=True):
+    def score_answer(self, question, options, explain=False, **generate_kwargs):
+        """
+        Chọn đáp án cho một câu hỏi bằng chế độ scoring
+        
+        Args:
+            question: Câu hỏi vật lý
+            options: Danh sách các lựa chọn
+            explain: Sinh thêm lời giải đầy đủ (chậm, dùng generate_answer)
+        
+        Returns:
+            Dict (predicted_answer, probabilities, time_taken) và full_response nếu explain=True
+        """
+        result = self.score_answers([{'question': question, 'options': options}], batch_size=1)[0]
+        if explain:
+            _, result['full_response'] = self.generate_answer(question, options, **generate_kwargs)
+        return result
+    
+    @staticmethod
+    def extract_choice(answer):
+        """Lấy đáp án (A, B, C, D) đầu tiên xuất hiện trong câu trả lời"""
+        for char in answer.upper():
+            if char in ['A', 'B', 'C', 'D']:
+                return char
+        return None
+    
+    def batch_test(self, test_questions, verbose=True, batch_size=8, mode="score"):
         """
         Test model với nhiều câu hỏi vật lý
         
         Args:
             test_questions: List các dict chứa question, options, correct_answer
             verbose: In kết quả chi tiết
+            batch_size: Số câu hỏi mỗi lần generate / forward
+            mode: "score" (một lần forward, đọc logits A-D, tất định), "answer" (greedy, dừng ngay
+                sau dòng đáp án, tối đa ANSWER_MAX_NEW_TOKENS token) hoặc "generate" (sinh lời giải)
         """
         results = []
         correct_count = 0
         
-        for i, test_case in enumerate(test_questions):
+        start_time = time.time()
+        if mode == "score":
+            generations = [
+                dict(score, answer=score['predicted_answer'], choice=score['predicted_answer'],
+                     full_response=None, generated_tokens=0, used_tokens=0)
+                for score in self.score_answers(test_questions, batch_size=batch_size)
+            ]
+        elif mode == "answer":
+            generations = self.generate_answers(
+                test_questions, batch_size=batch_size,
+                max_new_tokens=ANSWER_MAX_NEW_TOKENS, stop_at_answer=True, greedy=True
+            )
+        else:
+            generations = self.generate_answers(test_questions, batch_size=batch_size)
+        total_time = time.time() - start_time
+        
+        for i, (test_case, generation) in enumerate(zip(test_questions, generations)):
             if verbose:
                 print(f"\n{'='*60}")
                 print(f"Câu hỏi vật lý {i+1}:")
@@ -141,17 +565,13 @@ Các lựa chọn:
             options = test_case['options']
             correct_answer = test_case.get('correct_answer', None)
             
-            # Generate answer
-            start_time = time.time()
-            answer, full_response = self.generate_answer(question, options)
-            end_time = time.time()
+            answer = generation['answer']
+            full_response = generation['full_response']
             
-            # Extract predicted answer (A, B, C, D)
-            predicted_answer = None
-            for char in answer.upper():
-                if char in ['A', 'B', 'C', 'D']:
-                    predicted_answer = char
-                    break
+            # Đáp án lấy từ dòng đáp án; extract_choice (chữ cái A-D đầu tiên, có thể nằm trong
+            # chữ như "CÂU") chỉ dùng khi không có dòng đáp án
+            predicted_answer = generation.get('choice') or self.extract_choice(answer)
+            probabilities = generation.get('probabilities')
             
             # Check if correct
             is_correct = False
@@ -167,7 +587,10 @@ Các lựa chọn:
                 'predicted_answer': predicted_answer,
                 'full_response': full_response,
                 'is_correct': is_correct,
-                'time_taken': end_time - start_time
+                'probabilities': probabilities,
+                'generated_tokens': generation['generated_tokens'],
+                'used_tokens': generation['used_tokens'],
+                'time_taken': generation['time_taken']
             }
             
             results.append(result)
@@ -178,12 +601,34 @@ Các lựa chọn:
                 print(f"Đáp án đúng: {correct_answer}")
                 print(f"Đáp án dự đoán: {predicted_answer}")
                 print(f"Kết quả: {'✅ ĐÚNG' if is_correct else '❌ SAI'}")
-                print(f"Thời gian: {end_time - start_time:.2f}s")
-                print(f"Phản hồi đầy đủ:\n{full_response}")
+                print(f"Thời gian: {generation['time_taken']:.2f}s")
+                if probabilities:
+                    print(f"Xác suất: {', '.join(f'{k}={v:.2%}' for k, v in probabilities.items())}")
+                if full_response:
+                    print(f"Phản hồi đầy đủ:\n{full_response}")
         
         # Calculate accuracy
         accuracy = correct_count / len(test_questions) if test_questions else 0
         
+        # Throughput của cả lần chạy
+        total_tokens = sum(result['generated_tokens'] for result in results)
+        used_tokens = sum(result['used_tokens'] for result in results)
+        latencies = sorted(result['time_taken'] for result in results)
+        self.batch_stats = {
+            'num_questions': len(test_questions),
+            'batch_size': batch_size,
+            'mode': mode,
+            'precision': self.precision,
+            'total_time': total_time,
+            'generated_tokens': total_tokens,
+            'used_tokens': used_tokens,
+            'tokens_per_second': total_tokens / total_time if total_time else 0,
+            'questions_per_second': len(test_questions) / total_time if total_time else 0,
+            'latency_mean': sum(latencies) / len(latencies) if latencies else 0,
+            'latency_max': latencies[-1] if latencies else 0,
+            'prefix_cache': copy.deepcopy(self.prefix_cache_stats) if self.prefix_cache_stats else None
+        }
+        
         if verbose:
             print(f"\n{'='*60}")
             print(f"KẾT QUẢ TỔNG KẾT")
@@ -191,6 +636,19 @@ Các lựa chọn:
             print(f"Tổng số câu hỏi: {len(test_questions)}")
             print(f"Số câu đúng: {correct_count}")
             print(f"Độ chính xác: {accuracy:.2%}")
+            print(f"Tổng thời gian: {total_time:.2f}s (batch size {batch_size})")
+            print(f"Throughput: {self.batch_stats['tokens_per_second']:.1f} tokens/s, "
+                  f"{self.batch_stats['questions_per_second']:.2f} câu/s")
+            if total_tokens:
+                print(f"Token: sinh ra {total_tokens}, dùng cho đáp án {used_tokens} "
+                      f"({used_tokens / total_tokens:.1%})")
+            print(f"Độ trễ mỗi câu: trung bình {self.batch_stats['latency_mean']:.2f}s, "
+                  f"tối đa {self.batch_stats['latency_max']:.2f}s")
+            if self.prefix_cache_stats:
+                print(f"Prefix cache: {self.prefix_cache_stats['prefix_tokens']} token, "
+                      f"prefill {self.prefix_cache_stats['prefill_seconds']:.3f}s, "
+                      f"tiết kiệm ước tính {self.prefix_cache_stats['estimated_seconds_saved']:.2f}s "
+                      f"({self.prefix_cache_stats['reused_rows']} câu, "
+                      f"{self.prefix_cache_stats['reused_batches']} batch dùng lại)")
         
         return results, accuracy
-
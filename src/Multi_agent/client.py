@@ -0,0 +1,68 @@
+"""
+Client HTTP cho inference server của model trắc nghiệm.
+
+Chỉ cần requests và yaml (không import torch / transformers / peft) nên web worker
+gọi inference server không phải tải model. Server: src.Multi_agent.inference_server.
+
+Cách dùng:
+    client = Multiple_Choice_Client()
+    client.score("Đơn vị của lực là gì?", ["Newton", "Joule", "Watt", "Pascal"])
+
+Author: Physics Problem Solving System Team
+Version: 1.0.0
+"""
+
+from pathlib import Path
+from typing import (
+    Dict,
+    List
+)
+
+import yaml
+
+path_config_information_model_llm : Path = Path(__file__).parent.parent.parent / "config_information_model_llm.yaml"
+
+with open(path_config_information_model_llm, "r") as file:
+    information_rag : Dict[str, str] = yaml.safe_load(file)
+
+SERVER_URL : str = information_rag.get("multiple_choice_server_url", "http://127.0.0.1:8765")
+
+# Thời gian tối đa một request chờ kết quả
+REQUEST_TIMEOUT : float = 120.0
+
+
+class Multiple_Choice_Client:
+    """
+    Client cho inference server, dùng chung một kết nối (requests.Session) cho các lần gọi.
+    """
+
+    def __init__(self, url : str = SERVER_URL, timeout : float = REQUEST_TIMEOUT) -> None:
+        import requests
+
+        self.url : str = url.rstrip("/")
+        self.timeout : float = timeout
+        self.session = requests.Session()
+
+    def __post(self, kind : str, question : str, options : List[str]) -> Dict:
+        response = self.session.post(
+            f"{self.url}/{kind}", json={"question": question, "options": options}, timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def score(self, question : str, options : List[str]) -> Dict:
+        """Đáp án (predicted_answer) và xác suất từng lựa chọn"""
+        return self.__post("score", question, options)
+
+    def answer(self, question : str, options : List[str]) -> Dict:
+        """Đáp án sinh greedy, dừng ngay sau dòng đáp án (answer, generated_tokens, used_tokens)"""
+        return self.__post("answer", question, options)
+
+    def generate(self, question : str, options : List[str]) -> Dict:
+        """Lời giải đầy đủ (answer, full_response)"""
+        return self.__post("generate", question, options)
+
+    def metrics(self) -> Dict:
+        response = self.session.get(f"{self.url}/metrics", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
@@ -0,0 +1,175 @@
+"""
+Đánh giá các chế độ precision (float32, bfloat16, int8) của model trắc nghiệm trên CPU.
+
+Mỗi precision chạy batch_test trên một fold giữ lại (held-out) trong một process
+riêng (để đo peak RSS chính xác) và ghi lại độ chính xác, tokens/s, câu/s, RSS.
+Mặc định chạy mode answer (sinh token tới dòng đáp án) để tokens/s có ý nghĩa,
+mode score không sinh token nên cột tokens/s bỏ trống. Precision chỉ được đánh
+dấu usable nếu độ chính xác giảm so với float32 không quá tolerance. Report được lưu cạnh checkpoint đã merge (precision_report.json),
+PhysicsMultipleChoiceAgent chỉ dùng bfloat16 / int8 khi report cho phép.
+
+Cách chạy:
+    python -m src.Multi_agent.evaluate_precision path/to/adapter fold_0_test.json
+    python -m src.Multi_agent.evaluate_precision path/to/adapter fold_0_test.jsonl --precisions float32 int8 --tolerance 0.02
+
+Author: Physics Problem Solving System Team
+Version: 1.0.0
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import (
+    Dict,
+    List,
+    Optional
+)
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+import yaml
+
+path_config_information_model_llm : Path = Path(__file__).parent.parent.parent / "config_information_model_llm.yaml"
+
+with open(path_config_information_model_llm, "r") as file:
+    information_rag : Dict[str, str] = yaml.safe_load(file)
+
+PRECISIONS : List[str] = ["float32", "bfloat16", "int8"]
+PRECISION_TOLERANCE : float = information_rag.get("multiple_choice_precision_tolerance", 0.01)
+PRECISION_REPORT_NAME : str = "precision_report.json"
+
+
+def load_questions(path : str) -> List[Dict]:
+    """Đọc câu hỏi (question, options, correct_answer) từ file .json (list) hoặc .jsonl"""
+    with open(path, "r", encoding="utf-8") as file:
+        if path.endswith(".jsonl"):
+            return [json.loads(line) for line in file if line.strip()]
+        return json.load(file)
+
+
+def is_precision_allowed(merged_path : str, precision : str) -> bool:
+    """
+    True nếu precision đã được đánh giá trên checkpoint này và độ chính xác giảm trong mức cho phép.
+    """
+    path_report : str = os.path.join(merged_path, PRECISION_REPORT_NAME)
+    if not os.path.exists(path_report):
+        return False
+    with open(path_report, "r", encoding="utf-8") as file:
+        report : Dict = json.load(file)
+    return bool(report["runs"].get(precision, {}).get("usable", False))
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss tính bằng KB trên Linux và byte trên macOS
+    scale : float = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def run_precision(
+    adapter_path : str,
+    questions : List[Dict],
+    precision : str,
+    batch_size : int,
+    mode : str,
+    merged_cache_dir : Optional[str]
+) -> Dict:
+    """Tải model với một precision và chạy batch_test (trong process riêng)"""
+    from .agent_multiple_choice import PhysicsMultipleChoiceAgent
+
+    start : float = time.perf_counter()
+    agent = PhysicsMultipleChoiceAgent(
+        adapter_path,
+        device="cpu",
+        merged_cache_dir=merged_cache_dir,
+        precision=precision,
+        check_precision=False
+    )
+    load_seconds : float = time.perf_counter() - start
+
+    _, accuracy = agent.batch_test(questions, verbose=False, batch_size=batch_size, mode=mode)
+    stats : Dict = agent.batch_stats
+
+    return {
+        "precision": precision,
+        "merged_path": agent.merged_path,
+        "accuracy": accuracy,
+        "load_seconds": load_seconds,
+        "total_seconds": stats["total_time"],
+        "tokens_per_second": stats["tokens_per_second"],
+        "generated_tokens": stats["generated_tokens"],
+        "used_tokens": stats["used_tokens"],
+        "questions_per_second": stats["questions_per_second"],
+        "latency_mean": stats["latency_mean"],
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Đánh giá precision float32 / bfloat16 / int8 trên CPU")
+    parser.add_argument("adapter_path")
+    parser.add_argument("questions", help="File .json / .jsonl câu hỏi của fold giữ lại")
+    parser.add_argument("--precisions", nargs="+", default=PRECISIONS, choices=PRECISIONS)
+    parser.add_argument("--tolerance", type=float, default=PRECISION_TOLERANCE, help="Mức giảm độ chính xác tối đa so với float32")
+    parser.add_argument("--batch_size", type=int, default=8)
+    # score không sinh token nên không đo được tokens/s, mặc định dùng answer (sinh tới dòng đáp án)
+    parser.add_argument("--mode", default="answer", choices=["score", "answer", "generate"])
+    parser.add_argument("--merged_cache_dir", default=None)
+    parser.add_argument("--output", default=None, help="Ghi thêm report ra file này")
+    args = parser.parse_args()
+
+    questions : List[Dict] = load_questions(args.questions)
+    # float32 luôn được chạy làm mốc so sánh
+    precisions : List[str] = ["float32"] + [precision for precision in args.precisions if precision != "float32"]
+
+    # Merge trước trong process chính để RSS của các lần đo không tính bước merge
+    from .merge_lora import get_merged_checkpoint
+    get_merged_checkpoint(args.adapter_path, cache_dir=args.merged_cache_dir)
+
+    runs : Dict[str, Dict] = {}
+    context = multiprocessing.get_context("spawn")
+    for precision in precisions:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            runs[precision] = executor.submit(
+                run_precision, args.adapter_path, questions, precision, args.batch_size, args.mode, args.merged_cache_dir
+            ).result()
+
+    baseline_accuracy : float = runs["float32"]["accuracy"]
+    for run in runs.values():
+        run["accuracy_drop"] = baseline_accuracy - run["accuracy"]
+        run["usable"] = run["accuracy_drop"] <= args.tolerance
+
+    report : Dict = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "adapter_path": os.path.abspath(args.adapter_path),
+        "questions": os.path.abspath(args.questions),
+        "num_questions": len(questions),
+        "mode": args.mode,
+        "tolerance": args.tolerance,
+        "baseline_accuracy": baseline_accuracy,
+        "runs": runs,
+    }
+
+    merged_path : str = runs["float32"]["merged_path"]
+    for path in filter(None, [os.path.join(merged_path, PRECISION_REPORT_NAME), args.output]):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        print(f"Đã ghi report: {path}")
+
+    print(f"{'precision':>10} {'accuracy':>9} {'drop':>7} {'tokens/s':>9} {'câu/s':>7} {'RSS MB':>8}  usable")
+    for precision, run in runs.items():
+        # mode score chỉ chấm điểm các lựa chọn, không có token sinh ra
+        tokens_per_second : str = f"{run['tokens_per_second']:>9.1f}" if args.mode != "score" else f"{'-':>9}"
+        print(
+            f"{precision:>10} {run['accuracy']:>9.2%} {run['accuracy_drop']:>7.2%} "
+            f"{tokens_per_second} {run['questions_per_second']:>7.2f} {run['peak_rss_mb']:>8.0f}  "
+            f"{'✅' if run['usable'] else '❌'}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""
+Đánh giá model trắc nghiệm song song trên nhiều process (sharded).
+
+File câu hỏi được chia thành N shard, mỗi worker (một process, một bản model)
+xử lý một shard với số thread torch cố định (số core / N) để các worker không
+tranh CPU với nhau. Kết quả từng câu được ghi ngay vào shard_XXX-of-YYY.jsonl
+(không giữ full_response trong bộ nhớ, trừ khi --keep_responses). Chạy lại cùng
+output_dir sẽ bỏ qua shard đã xong và các câu đã có kết quả trong shard dở.
+Bước merge cuối tính độ chính xác và các phân vị độ trễ mỗi câu (thời gian batch
+chia cho số câu trong batch), ghi summary.json.
+
+Cách chạy:
+    python -m src.Multi_agent.evaluate_sharded path/to/adapter fold_0_test.jsonl --output_dir eval/fold_0 --workers 8
+    python -m src.Multi_agent.evaluate_sharded path/to/adapter fold_0_test.jsonl --output_dir eval/fold_0 --merge_only
+
+Author: Physics Problem Solving System Team
+Version: 1.0.0
+"""
+
+from concurrent.futures import (
+    ProcessPoolExecutor,
+    as_completed
+)
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Set
+)
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from .evaluate_precision import load_questions
+
+SUMMARY_NAME : str = "summary.json"
+PERCENTILES : List[int] = [50, 90, 95, 99]
+
+
+def shard_path(output_dir : str, shard : int, num_shards : int) -> str:
+    return os.path.join(output_dir, f"shard_{shard:03d}-of-{num_shards:03d}.jsonl")
+
+
+def shard_indices(num_questions : int, shard : int, num_shards : int) -> List[int]:
+    """Chỉ số câu hỏi của một shard (các đoạn liên tiếp, chênh lệch tối đa một câu)"""
+    start : int = num_questions * shard // num_shards
+    end : int = num_questions * (shard + 1) // num_shards
+    return list(range(start, end))
+
+
+def read_results(path : str) -> List[Dict]:
+    """Đọc kết quả của một shard, bỏ qua dòng cuối ghi dở (worker bị dừng giữa chừng)"""
+    results : List[Dict] = []
+    if not os.path.exists(path):
+        return results
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            try:
+                results.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+    return results
+
+
+def percentile(values : List[float], q : float) -> float:
+    """Phân vị theo nearest-rank của values (đã sắp xếp)"""
+    if not values:
+        return 0.0
+    rank : int = max(1, -(-len(values) * q // 100))
+    return values[int(rank) - 1]
+
+
+def run_shard(
+    adapter_path : str,
+    questions_path : str,
+    shard : int,
+    num_shards : int,
+    output_dir : str,
+    threads : int,
+    batch_size : int,
+    mode : str,
+    precision : Optional[str],
+    merged_cache_dir : Optional[str],
+    keep_responses : bool
+) -> Dict:
+    """
+    Chạy một shard trong process riêng, ghi kết quả từng câu vào JSONL ngay khi có.
+
+    OMP_NUM_THREADS / MKL_NUM_THREADS được đặt ở process cha trước khi tạo pool: khi
+    process spawn unpickle hàm này, torch đã được import nên đặt ở đây không còn tác dụng.
+    """
+    import torch
+
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+
+    questions : List[Dict] = load_questions(questions_path)
+    path : str = shard_path(output_dir, shard, num_shards)
+
+    # Tiếp tục shard dở: bỏ qua các câu đã có kết quả, ghi lại file không còn dòng hỏng
+    finished : List[Dict] = read_results(path)
+    done : Set[int] = {result["index"] for result in finished}
+    with open(path, "w", encoding="utf-8") as file:
+        for result in finished:
+            file.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    remaining : List[int] = [index for index in shard_indices(len(questions), shard, num_shards) if index not in done]
+    if not remaining:
+        return {"shard": shard, "evaluated": 0, "seconds": 0.0}
+
+    from .agent_multiple_choice import PhysicsMultipleChoiceAgent
+
+    agent = PhysicsMultipleChoiceAgent(
+        adapter_path,
+        device="cpu",
+        merged_cache_dir=merged_cache_dir,
+        precision=precision
+    )
+
+    start : float = time.perf_counter()
+    with open(path, "a", encoding="utf-8") as file:
+        for offset in range(0, len(remaining), batch_size):
+            indices : List[int] = remaining[offset:offset + batch_size]
+            batch_start : float = time.perf_counter()
+            results, _ = agent.batch_test(
+                [questions[index] for index in indices], verbose=False, batch_size=batch_size, mode=mode
+            )
+            # time_taken của các chế độ batch là thời gian cả batch: độ trễ mỗi câu = thời gian batch / số câu
+            batch_seconds : float = time.perf_counter() - batch_start
+            for index, result in zip(indices, results):
+                if not keep_responses:
+                    result.pop("full_response", None)
+                file.write(json.dumps(
+                    dict(result, index=index, shard=shard, batch_seconds=batch_seconds,
+                         question_seconds=batch_seconds / len(indices)),
+                    ensure_ascii=False
+                ) + "\n")
+            file.flush()
+
+    return {"shard": shard, "evaluated": len(remaining), "seconds": time.perf_counter() - start}
+
+
+def merge_shards(output_dir : str, num_shards : int, num_questions : int) -> Dict:
+    """Gộp kết quả các shard: độ chính xác, phân vị độ trễ mỗi câu (question_seconds), số token"""
+    results : List[Dict] = []
+    for shard in range(num_shards):
+        results.extend(read_results(shard_path(output_dir, shard, num_shards)))
+
+    latencies : List[float] = sorted(result.get("question_seconds", result["time_taken"]) for result in results)
+    correct : int = sum(1 for result in results if result["is_correct"])
+    generated_tokens : int = sum(result.get("generated_tokens", 0) for result in results)
+
+    summary : Dict = {
+        "num_questions": num_questions,
+        "num_results": len(results),
+        "complete": len({result["index"] for result in results}) == num_questions,
+        "correct": correct,
+        "accuracy": correct / len(results) if results else 0.0,
+        "generated_tokens": generated_tokens,
+        "used_tokens": sum(result.get("used_tokens", 0) for result in results),
+        "latency_mean": sum(latencies) / len(latencies) if latencies else 0.0,
+        "latency_max": latencies[-1] if latencies else 0.0,
+    }
+    for q in PERCENTILES:
+        summary[f"latency_p{q}"] = percentile(latencies, q)
+    return summary
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Đánh giá model trắc nghiệm trên nhiều process")
+    parser.add_argument("adapter_path")
+    parser.add_argument("questions", help="File .json / .jsonl câu hỏi (question, options, correct_answer)")
+    parser.add_argument("--output_dir", required=True, help="Thư mục chứa kết quả các shard và summary.json")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1) // 4))
+    parser.add_argument("--threads", type=int, default=None, help="Số thread torch mỗi worker (mặc định: số core / workers)")
+    parser.add_argument("--batch_size", type=int, default=8)
+    parser.add_argument("--mode", default="score", choices=["score", "answer", "generate"])
+    parser.add_argument("--precision", default=None, choices=["float32", "float16", "bfloat16", "int8"])
+    parser.add_argument("--merged_cache_dir", default=None)
+    parser.add_argument("--keep_responses", action="store_true", help="Ghi cả full_response vào kết quả")
+    parser.add_argument("--merge_only", action="store_true", help="Chỉ gộp kết quả đã có (dùng cùng --workers với lần chạy)")
+    args = parser.parse_args()
+
+    num_questions : int = len(load_questions(args.questions))
+    num_shards : int = max(1, min(args.workers, num_questions))
+    threads : int = args.threads or max(1, (os.cpu_count() or 1) // num_shards)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    if not args.merge_only:
+        pending : List[int] = [
+            shard for shard in range(num_shards)
+            if len(read_results(shard_path(args.output_dir, shard, num_shards)))
+            < len(shard_indices(num_questions, shard, num_shards))
+        ]
+        print(f"{num_questions} câu hỏi, {num_shards} shard ({len(pending)} chưa xong), {threads} thread mỗi worker")
+
+        if pending:
+            # Merge trước trong process chính để các worker không cùng merge một adapter
+            from .merge_lora import get_merged_checkpoint
+            get_merged_checkpoint(args.adapter_path, cache_dir=args.merged_cache_dir)
+
+            # Process spawn kế thừa biến môi trường: phải đặt trước khi worker import torch
+            os.environ["OMP_NUM_THREADS"] = str(threads)
+            os.environ["MKL_NUM_THREADS"] = str(threads)
+
+            start : float = time.perf_counter()
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=len(pending), mp_context=context) as executor:
+                futures = [
+                    executor.submit(
+                        run_shard, args.adapter_path, args.questions, shard, num_shards, args.output_dir,
+                        threads, args.batch_size, args.mode, args.precision, args.merged_cache_dir,
+                        args.keep_responses
+                    )
+                    for shard in pending
+                ]
+                for future in as_completed(futures):
+                    report : Dict = future.result()
+                    print(f"Shard {report['shard']}: {report['evaluated']} câu, {report['seconds']:.1f}s")
+            print(f"Thời gian chạy: {time.perf_counter() - start:.1f}s")
+
+    summary : Dict = merge_shards(args.output_dir, num_shards, num_questions)
+    summary.update(adapter_path=os.path.abspath(args.adapter_path), questions=os.path.abspath(args.questions), mode=args.mode)
+
+    path_summary : str = os.path.join(args.output_dir, SUMMARY_NAME)
+    with open(path_summary, "w", encoding="utf-8") as file:
+        json.dump(summary, file, ensure_ascii=False, indent=2)
+
+    print(f"Độ chính xác: {summary['accuracy']:.2%} ({summary['correct']}/{summary['num_results']})")
+    print("Độ trễ mỗi câu: " + ", ".join(f"p{q}={summary[f'latency_p{q}']:.2f}s" for q in PERCENTILES))
+    if not summary["complete"]:
+        print("⚠️ Chưa đủ kết quả cho mọi câu hỏi, chạy lại để tiếp tục")
+    print(f"Đã ghi: {path_summary}")
+    return 0 if summary["complete"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,326 @@
+"""
+Inference server cho model trắc nghiệm với micro-batching động.
+
+Một process giữ duy nhất một PhysicsMultipleChoiceAgent, các web worker gọi qua
+HTTP (Multiple_Choice_Client trong client.py, không cần torch) thay vì mỗi worker tự tải một bản model. Request
+đến đồng thời được gom thành micro-batch: batch được chạy khi đủ max_batch_size
+câu hoặc khi request đầu tiên trong batch đã chờ max_wait_ms. Bộ nhớ không tăng
+theo số worker, throughput khi tải cao tăng nhờ chạy theo batch.
+
+Endpoint:
+    POST /score     {"question": ..., "options": [...]}  -> đáp án + xác suất (một lần forward)
+    POST /answer    {"question": ..., "options": [...]}  -> sinh greedy, dừng ngay sau dòng đáp án
+    POST /generate  {"question": ..., "options": [...]}  -> sinh lời giải
+    GET  /metrics   độ dài hàng đợi, histogram kích thước batch / độ dài hàng đợi
+    GET  /health
+
+Cách chạy:
+    python -m src.Multi_agent.inference_server path/to/adapter --port 8765 --max_batch_size 16 --max_wait_ms 10
+
+Author: Physics Problem Solving System Team
+Version: 1.0.0
+"""
+
+from collections import deque
+from concurrent.futures import (
+    Future,
+    TimeoutError as FutureTimeoutError
+)
+from http.server import (
+    BaseHTTPRequestHandler,
+    ThreadingHTTPServer
+)
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Tuple
+)
+import argparse
+import json
+import threading
+import time
+
+# Multiple_Choice_Client vẫn import được từ đây như trước
+from .client import (
+    REQUEST_TIMEOUT,
+    SERVER_URL,
+    Multiple_Choice_Client,
+    information_rag
+)
+
+MAX_BATCH_SIZE : int = information_rag.get("multiple_choice_max_batch_size", 16)
+MAX_WAIT_MS : float = information_rag.get("multiple_choice_max_wait_ms", 10)
+# Số lựa chọn hợp lệ của một câu hỏi (A-Z)
+MIN_OPTIONS : int = 2
+MAX_OPTIONS : int = 26
+
+
+def parse_item(payload : Any) -> Dict:
+    """
+    Kiểm tra body của request: question là chuỗi khác rỗng, options là list 2-26 chuỗi khác rỗng.
+
+    Raises:
+        ValueError: Body không hợp lệ
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("Body phải là JSON object")
+    question = payload.get("question")
+    options = payload.get("options")
+    if not isinstance(question, str) or not question.strip():
+        raise ValueError("question phải là chuỗi khác rỗng")
+    if not isinstance(options, list) or not MIN_OPTIONS <= len(options) <= MAX_OPTIONS:
+        raise ValueError(f"options phải là list từ {MIN_OPTIONS} tới {MAX_OPTIONS} lựa chọn")
+    if not all(isinstance(option, str) and option.strip() for option in options):
+        raise ValueError("Mỗi lựa chọn phải là chuỗi khác rỗng")
+    return {"question": question, "options": options}
+
+
+def _bucket(value : int) -> str:
+    """Nhóm độ dài hàng đợi theo lũy thừa của 2: 0, 1, 2-3, 4-7, ..."""
+    if value < 2:
+        return str(value)
+    low : int = 1 << (value.bit_length() - 1)
+    return f"{low}-{2 * low - 1}"
+
+
+class Micro_Batcher:
+    """
+    Gom các request cùng loại đang chờ thành batch và chạy tuần tự trên một thread.
+    """
+
+    def __init__(
+        self,
+        handlers : Dict[str, Callable[[List[Any]], List[Any]]],
+        max_batch_size : int = MAX_BATCH_SIZE,
+        max_wait_ms : float = MAX_WAIT_MS
+    ) -> None:
+        """
+        Args:
+            handlers: Hàm xử lý cả batch theo loại request (score, generate), trả về kết quả theo thứ tự
+            max_batch_size: Số request tối đa mỗi batch
+            max_wait_ms: Thời gian tối đa request đầu tiên của batch chờ thêm request khác
+        """
+        self.handlers : Dict[str, Callable[[List[Any]], List[Any]]] = handlers
+        self.max_batch_size : int = max_batch_size
+        self.max_wait : float = max_wait_ms / 1000
+
+        self.__pending : Deque[Tuple[str, Any, Future, float]] = deque()
+        self.__condition : threading.Condition = threading.Condition()
+
+        self.__lock : threading.Lock = threading.Lock()
+        self.batch_size_histogram : Dict[int, int] = {}
+        self.queue_depth_histogram : Dict[str, int] = {}
+        self.requests_total : int = 0
+        self.batches_total : int = 0
+        self.queue_wait_seconds_total : float = 0.0
+        self.batch_seconds_total : float = 0.0
+        # Số batch bị lỗi phải chạy lại từng request
+        self.isolated_batches_total : int = 0
+        # Số request bị hủy (hết thời gian chờ) trước khi được chạy
+        self.cancelled_total : int = 0
+
+        self.__thread : threading.Thread = threading.Thread(target=self.__loop, name="micro-batcher", daemon=True)
+        self.__thread.start()
+
+    def submit(self, kind : str, item : Any) -> Future:
+        """Thêm một request vào hàng đợi, trả về Future chứa kết quả"""
+        if kind not in self.handlers:
+            raise ValueError(f"Loại request không hỗ trợ: {kind}")
+        future : Future = Future()
+        with self.__condition:
+            self.__pending.append((kind, item, future, time.perf_counter()))
+            self.__condition.notify()
+        return future
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self.__pending)
+
+    def __next_batch(self) -> Tuple[str, List[Tuple[str, Any, Future, float]]]:
+        with self.__condition:
+            while not self.__pending:
+                self.__condition.wait()
+
+            # Batch gồm các request cùng loại với request chờ lâu nhất
+            kind, _, _, first_arrival = self.__pending[0]
+            deadline : float = first_arrival + self.max_wait
+            while True:
+                same_kind : int = sum(1 for pending in self.__pending if pending[0] == kind)
+                remaining : float = deadline - time.perf_counter()
+                if same_kind >= self.max_batch_size or remaining <= 0:
+                    break
+                self.__condition.wait(remaining)
+
+            depth : int = len(self.__pending)
+            batch : List[Tuple[str, Any, Future, float]] = []
+            others : Deque[Tuple[str, Any, Future, float]] = deque()
+            while self.__pending:
+                pending = self.__pending.popleft()
+                if pending[0] == kind and len(batch) < self.max_batch_size:
+                    # Request đã hết thời gian chờ và bị hủy thì bỏ qua, không tốn thời gian model
+                    if pending[2].set_running_or_notify_cancel():
+                        batch.append(pending)
+                    else:
+                        self.cancelled_total += 1
+                else:
+                    others.append(pending)
+            self.__pending.extend(others)
+
+        with self.__lock:
+            self.queue_depth_histogram[_bucket(depth)] = self.queue_depth_histogram.get(_bucket(depth), 0) + 1
+        return kind, batch
+
+    def __loop(self) -> None:
+        while True:
+            kind, batch = self.__next_batch()
+            if not batch:
+                continue
+            start : float = time.perf_counter()
+            try:
+                results : List[Any] = self.handlers[kind]([item for _, item, _, _ in batch])
+                for (_, _, future, _), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as error:
+                if len(batch) == 1:
+                    batch[0][2].set_exception(error)
+                else:
+                    # Một request lỗi không được làm hỏng cả batch: chạy lại từng request,
+                    # chỉ request gây lỗi nhận exception
+                    self.__run_one_by_one(kind, batch)
+            end : float = time.perf_counter()
+
+            with self.__lock:
+                self.batch_size_histogram[len(batch)] = self.batch_size_histogram.get(len(batch), 0) + 1
+                self.requests_total += len(batch)
+                self.batches_total += 1
+                self.queue_wait_seconds_total += sum(start - arrival for _, _, _, arrival in batch)
+                self.batch_seconds_total += end - start
+
+    def __run_one_by_one(self, kind : str, batch : List[Tuple[str, Any, Future, float]]) -> None:
+        for _, item, future, _ in batch:
+            if future.done():
+                continue
+            try:
+                future.set_result(self.handlers[kind]([item])[0])
+            except Exception as error:
+                future.set_exception(error)
+        with self.__lock:
+            self.isolated_batches_total += 1
+
+    def metrics(self) -> Dict:
+        with self.__lock:
+            return {
+                "queue_depth": self.queue_depth,
+                "requests_total": self.requests_total,
+                "batches_total": self.batches_total,
+                "isolated_batches_total": self.isolated_batches_total,
+                "cancelled_total": self.cancelled_total,
+                "mean_batch_size": self.requests_total / self.batches_total if self.batches_total else 0.0,
+                "mean_queue_wait_seconds": self.queue_wait_seconds_total / self.requests_total if self.requests_total else 0.0,
+                "mean_batch_seconds": self.batch_seconds_total / self.batches_total if self.batches_total else 0.0,
+                "batch_size_histogram": {str(size): count for size, count in sorted(self.batch_size_histogram.items())},
+                "queue_depth_histogram": dict(self.queue_depth_histogram),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+            }
+
+
+def create_server(batcher : Micro_Batcher, host : str, port : int) -> ThreadingHTTPServer:
+    """HTTP server, mỗi request một thread chờ kết quả từ batcher"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def send_json(self, status : int, data : Dict) -> None:
+            body : bytes = json.dumps(data, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self) -> None:
+            if self.path == "/metrics":
+                self.send_json(200, batcher.metrics())
+            elif self.path == "/health":
+                self.send_json(200, {"status": "ok"})
+            else:
+                self.send_json(404, {"error": "not found"})
+
+        def do_POST(self) -> None:
+            kind : str = self.path.strip("/")
+            if kind not in batcher.handlers:
+                self.send_json(404, {"error": "not found"})
+                return
+            try:
+                item : Dict = parse_item(json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0)))))
+            except ValueError as error:
+                # json.JSONDecodeError cũng là ValueError
+                self.send_json(400, {"error": str(error)})
+                return
+            future : Future = batcher.submit(kind, item)
+            try:
+                result : Dict = future.result(timeout=REQUEST_TIMEOUT)
+            # Future.result ném concurrent.futures.TimeoutError, chỉ trùng với TimeoutError builtin từ Python 3.11
+            except FutureTimeoutError:
+                # Còn trong hàng đợi thì hủy để batcher không chạy request không còn ai chờ
+                future.cancel()
+                self.send_json(503, {"error": "Hết thời gian chờ"})
+                return
+            except Exception as error:
+                self.send_json(500, {"error": str(error)})
+                return
+            self.send_json(200, result)
+
+        def log_message(self, format : str, *args) -> None:
+            # Không in log mỗi request
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Inference server cho model trắc nghiệm")
+    parser.add_argument("adapter_path")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(SERVER_URL.rsplit(":", 1)[-1]))
+    parser.add_argument("--max_batch_size", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--max_wait_ms", type=float, default=MAX_WAIT_MS)
+    parser.add_argument("--precision", default=None, choices=["float32", "float16", "bfloat16", "int8"])
+    parser.add_argument("--system_prompt", default=None)
+    args = parser.parse_args()
+
+    from .agent_multiple_choice import (
+        ANSWER_MAX_NEW_TOKENS,
+        PhysicsMultipleChoiceAgent
+    )
+
+    agent = PhysicsMultipleChoiceAgent(args.adapter_path, precision=args.precision, system_prompt=args.system_prompt)
+
+    def score(items : List[Dict]) -> List[Dict]:
+        return agent.score_answers(items, batch_size=len(items))
+
+    def answer(items : List[Dict]) -> List[Dict]:
+        return agent.generate_answers(
+            items, batch_size=len(items), max_new_tokens=ANSWER_MAX_NEW_TOKENS, stop_at_answer=True, greedy=True
+        )
+
+    def generate(items : List[Dict]) -> List[Dict]:
+        return agent.generate_answers(items, batch_size=len(items))
+
+    batcher : Micro_Batcher = Micro_Batcher(
+        {"score": score, "answer": answer, "generate": generate},
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms
+    )
+    server : ThreadingHTTPServer = create_server(batcher, args.host, args.port)
+    print(f"Inference server: http://{args.host}:{args.port} (max_batch_size={args.max_batch_size}, max_wait_ms={args.max_wait_ms})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
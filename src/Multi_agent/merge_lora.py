@@ -0,0 +1,213 @@
+"""
+Merge LoRA adapter vào trọng số của base model và cache checkpoint đã merge.
+
+PeftModel cộng thêm nhánh LoRA (B @ A) vào từng lớp ở mỗi forward pass. Merge
+một lần (W + B @ A) rồi lưu thành checkpoint safetensors độc lập thì mô hình
+khi chạy chỉ còn là Qwen thuần: khởi động nhanh hơn (đọc một checkpoint bằng
+mmap, không cần tải base model rồi bọc PeftModel) và mỗi token rẻ hơn.
+
+Checkpoint được đặt trong thư mục con theo hash của adapter (trọng số +
+adapter_config.json + base model + dtype), nên adapter thay đổi thì tự merge
+lại, còn không thì dùng lại. adapter_config.json chỉ được đọc, không ghi lại.
+
+Cách chạy:
+    python -m src.Multi_agent.merge_lora path/to/adapter
+    python -m src.Multi_agent.merge_lora path/to/adapter --benchmark
+
+Author: Physics Problem Solving System Team
+Version: 1.0.0
+"""
+
+from pathlib import Path
+from typing import (
+    Dict,
+    Optional
+)
+import argparse
+import dataclasses
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import torch
+import yaml
+from peft import (
+    LoraConfig,
+    PeftModel
+)
+from transformers import (
+    AutoModelForCausalLM,
+    AutoTokenizer
+)
+
+path_config_information_model_llm : Path = Path(__file__).parent.parent.parent / "config_information_model_llm.yaml"
+
+with open(path_config_information_model_llm, "r") as file:
+    information_rag : Dict[str, str] = yaml.safe_load(file)
+
+BASE_MODEL_NAME : str = information_rag.get("name_model_LLM_base", "Qwen/Qwen3-0.6B")
+PATH_MERGED_CACHE : Path = Path(__file__).parent.parent.parent / information_rag.get(
+    "path_merged_lora_cache", "fine-turning/merged_lora"
+)
+
+ADAPTER_CONFIG_NAME : str = "adapter_config.json"
+ADAPTER_WEIGHT_NAMES = ("adapter_model.safetensors", "adapter_model.bin")
+MERGE_INFO_NAME : str = "merge_info.json"
+
+
+def load_lora_config(adapter_path : str) -> LoraConfig:
+    """
+    Đọc adapter_config.json và bỏ các khóa mà phiên bản PEFT đang cài không hỗ trợ
+    (corda_config, eva_config, ...). Chỉ sửa trong bộ nhớ, file trên đĩa giữ nguyên.
+    """
+    with open(os.path.join(adapter_path, ADAPTER_CONFIG_NAME), "r") as file:
+        config : Dict = json.load(file)
+    supported = {field.name for field in dataclasses.fields(LoraConfig) if field.init}
+    return LoraConfig(**{key: value for key, value in config.items() if key in supported})
+
+
+def adapter_hash(adapter_path : str, base_model_name : str = BASE_MODEL_NAME, dtype : str = "float32") -> str:
+    """
+    Hash của adapter (trọng số + cấu hình) cùng base model và dtype của checkpoint merge.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{base_model_name}|{dtype}|".encode("utf-8"))
+
+    with open(os.path.join(adapter_path, ADAPTER_CONFIG_NAME), "rb") as file:
+        digest.update(file.read())
+
+    weight_path : Optional[str] = next(
+        (os.path.join(adapter_path, name) for name in ADAPTER_WEIGHT_NAMES
+         if os.path.exists(os.path.join(adapter_path, name))),
+        None
+    )
+    if weight_path is None:
+        raise FileNotFoundError(f"Không tìm thấy trọng số adapter trong {adapter_path}")
+    with open(weight_path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+
+    return digest.hexdigest()[:16]
+
+
+def merge_lora(adapter_path : str, output_dir : str, base_model_name : str = BASE_MODEL_NAME, dtype : str = "float32") -> str:
+    """
+    Merge adapter vào base model và lưu checkpoint safetensors (kèm tokenizer) vào output_dir.
+
+    Checkpoint được ghi vào thư mục tạm rồi đổi tên, nên không bao giờ có checkpoint ghi dở.
+    """
+    print(f"Đang merge LoRA {adapter_path} vào {base_model_name}...")
+    start : float = time.perf_counter()
+
+    base_model = AutoModelForCausalLM.from_pretrained(
+        base_model_name,
+        torch_dtype=getattr(torch, dtype),
+        trust_remote_code=True
+    )
+    model = PeftModel.from_pretrained(base_model, adapter_path, config=load_lora_config(adapter_path))
+    merged = model.merge_and_unload()
+
+    temporary_dir : str = f"{output_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(temporary_dir, ignore_errors=True)
+    merged.save_pretrained(temporary_dir, safe_serialization=True)
+    AutoTokenizer.from_pretrained(adapter_path).save_pretrained(temporary_dir)
+
+    with open(os.path.join(temporary_dir, MERGE_INFO_NAME), "w") as file:
+        json.dump({
+            "adapter_path": os.path.abspath(adapter_path),
+            "adapter_hash": os.path.basename(output_dir),
+            "base_model": base_model_name,
+            "dtype": dtype,
+        }, file, indent=2)
+
+    try:
+        os.replace(temporary_dir, output_dir)
+    except OSError:
+        shutil.rmtree(temporary_dir, ignore_errors=True)
+        # Chỉ bỏ qua khi process khác đã merge xong cùng adapter; đĩa đầy, EXDEV, thư mục
+        # cũ không có merge_info.json, ... vẫn là lỗi
+        if not os.path.exists(os.path.join(output_dir, MERGE_INFO_NAME)):
+            raise
+
+    print(f"Đã lưu checkpoint merge: {output_dir} ({time.perf_counter() - start:.1f}s)")
+    return output_dir
+
+
+def get_merged_checkpoint(
+    adapter_path : str,
+    base_model_name : str = BASE_MODEL_NAME,
+    cache_dir : Optional[str] = None,
+    dtype : str = "float32"
+) -> str:
+    """
+    Đường dẫn checkpoint đã merge của adapter, merge nếu chưa có trong cache.
+    """
+    cache_dir = str(cache_dir or PATH_MERGED_CACHE)
+    output_dir : str = os.path.join(cache_dir, adapter_hash(adapter_path, base_model_name, dtype))
+    if not os.path.exists(os.path.join(output_dir, MERGE_INFO_NAME)):
+        os.makedirs(cache_dir, exist_ok=True)
+        merge_lora(adapter_path, output_dir, base_model_name, dtype)
+    return output_dir
+
+
+def _time_generation(model, tokenizer, new_tokens : int) -> float:
+    """Thời gian trung bình mỗi token (ms) khi sinh greedy new_tokens token"""
+    inputs = tokenizer("Câu hỏi vật lý: Đơn vị của lực là gì?\n\nĐáp án:", return_tensors="pt")
+    with torch.no_grad():
+        model.generate(**inputs, max_new_tokens=2, do_sample=False, pad_token_id=tokenizer.eos_token_id)
+        start : float = time.perf_counter()
+        outputs = model.generate(
+            **inputs,
+            max_new_tokens=new_tokens,
+            min_new_tokens=new_tokens,
+            do_sample=False,
+            pad_token_id=tokenizer.eos_token_id
+        )
+    generated : int = outputs.shape[1] - inputs["input_ids"].shape[1]
+    return (time.perf_counter() - start) / max(generated, 1) * 1000
+
+
+def benchmark(adapter_path : str, merged_path : str, base_model_name : str = BASE_MODEL_NAME, new_tokens : int = 32) -> Dict[str, float]:
+    """
+    So sánh thời gian khởi động và thời gian mỗi token trên CPU giữa PeftModel và checkpoint đã merge.
+    """
+    report : Dict[str, float] = {}
+
+    start : float = time.perf_counter()
+    tokenizer = AutoTokenizer.from_pretrained(adapter_path)
+    base_model = AutoModelForCausalLM.from_pretrained(base_model_name, torch_dtype=torch.float32, trust_remote_code=True)
+    model = PeftModel.from_pretrained(base_model, adapter_path, config=load_lora_config(adapter_path)).eval()
+    report["cold_start_seconds_adapter"] = time.perf_counter() - start
+    report["ms_per_token_adapter"] = _time_generation(model, tokenizer, new_tokens)
+    del model, base_model
+
+    start = time.perf_counter()
+    tokenizer = AutoTokenizer.from_pretrained(merged_path)
+    model = AutoModelForCausalLM.from_pretrained(merged_path, torch_dtype=torch.float32, low_cpu_mem_usage=True).eval()
+    report["cold_start_seconds_merged"] = time.perf_counter() - start
+    report["ms_per_token_merged"] = _time_generation(model, tokenizer, new_tokens)
+
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Merge LoRA adapter vào base model")
+    parser.add_argument("adapter_path", help="Thư mục chứa adapter_config.json và adapter_model.safetensors")
+    parser.add_argument("--base_model", default=BASE_MODEL_NAME)
+    parser.add_argument("--cache_dir", default=str(PATH_MERGED_CACHE))
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16", "bfloat16"])
+    parser.add_argument("--benchmark", action="store_true", help="So sánh thời gian khởi động / mỗi token trên CPU")
+    args = parser.parse_args()
+
+    merged_path : str = get_merged_checkpoint(args.adapter_path, args.base_model, args.cache_dir, args.dtype)
+    print(f"Checkpoint: {merged_path}")
+
+    if args.benchmark:
+        report : Dict[str, float] = benchmark(args.adapter_path, merged_path, args.base_model)
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -13,5 +13,24 @@ Version: 1.0.0
 """
 
 # from .Flow_splitter_agent import *
-from .router_theory import *
-from .router_multiple_choice import *
+import importlib
+import importlib.util
+
+# router_theory tải model embedding, reranking, FAISS và cần GOOGLE_API_KEY ngay khi import.
+# Chỉ import khi thật sự dùng tới (from src import Respone) để các module con như
+# src.Multi_agent (evaluate_precision, evaluate_sharded chạy trong process spawn) không
+# phải tải cả hệ thống RAG.
+_LAZY_MODULES = (".router_theory", ".router_multiple_choice")
+
+
+def __getattr__(name : str) -> object:
+    if name.startswith("__"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # from src import Multi_agent: module con, không cần tải router_theory
+    if importlib.util.find_spec(f"{__name__}.{name}") is not None:
+        return importlib.import_module(f".{name}", __name__)
+    for module_name in _LAZY_MODULES:
+        module = importlib.import_module(module_name, __name__)
+        if hasattr(module, name):
+            return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -4,7 +4,7 @@ Module định tuyến câu hỏi và xử lý phản hồi cho hệ thống v
 Module này chịu trách nhiệm:
 - Khởi tạo các model embedding và reranking
 - Tải vector database đã được lưu trước
-- Xử lý câu hỏi của người dùng và trả về câu trả lời
+- Định tuyến câu hỏi (THEORY, PRACTICE, MULTIPLE_CHOICE) và trả về câu trả lời
 - Quản lý cấu hình từ file YAML
 
 Author: Physics Problem Solving System Team
@@ -12,18 +12,26 @@ Version: 1.0.0
 """
 
 from dataclasses import dataclass, field
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from functools import cached_property
+from langchain_core.embeddings import Embeddings
 from langchain_community.vectorstores import FAISS
-from FlagEmbedding import FlagReranker
 import json
+import logging
+import re
 
 from typing import (
     List,
-    Dict
+    Dict,
+    Optional,
+    Tuple
 )
 
 from src.Agent_theory.RAG.reranking import get_information
-from src.Agent_theory.RAG.gen import Answer_Question_From_Documents
+from src.Agent_theory.RAG.gen import AnswerQuestionFromDocuments
+from src.Multi_agent.client import Multiple_Choice_Client
+from Flow_splitter_agent import ROUTING_MODE, route_question
+from onnx_backend import load_embedding_model, load_reranker
+from pipeline_metrics import CACHE_REQUESTS, DEGRADATIONS, stage_timer
 import yaml
 from pathlib import Path
 
@@ -34,42 +42,87 @@ with open(path_config_information_model_llm, "r") as file:
     information_rag : Dict[str, str] = yaml.safe_load(file) 
 
 
-MODEL_NAME_EMBEDDING : str = information_rag["model_embedding"]  
-MODEL_NAME_RERANKING : str = information_rag["model_reranking"] 
-
-device : str = information_rag["device"]  
 encode_kwargs : str = information_rag["encode_kwargs"]  
 path_save_VectorDB : str = information_rag["path_save_VectorDB"] 
 path_dataset_file_json : str = information_rag["path_dataset_file_json"] 
 
+logger = logging.getLogger(__name__)
+
+# Lựa chọn trắc nghiệm: "A. ...", "B) ...", "C: ..." ở đầu dòng hoặc sau khoảng trắng
+_OPTION_REGEX = re.compile(r"(?:^|\s)([A-D])[.):]\s+")
+
+_multiple_choice_client : Optional[Multiple_Choice_Client] = None
+
+_dataset_cache : Dict[str, object] = {"mtime": None, "data": None}
+_dataset_hits = CACHE_REQUESTS.labels("dataset_json", "hit")
+_dataset_misses = CACHE_REQUESTS.labels("dataset_json", "miss")
+
+
+def load_dataset_json() -> Dict[str, str]:
+    """
+    Đọc file JSON dataset, chỉ đọc lại khi file thay đổi (theo mtime).
+    
+    Returns:
+        Dict mapping từ câu hỏi sang nội dung
+    """
+    mtime : float = Path(path_dataset_file_json).stat().st_mtime
+    if _dataset_cache["mtime"] == mtime:
+        _dataset_hits.inc()
+        return _dataset_cache["data"]
+    _dataset_misses.inc()
+    with stage_timer("dataset_read"):
+        with open(path_dataset_file_json, "r", encoding="utf-8") as file:
+            data : Dict[str, str] = json.load(file)
+    _dataset_cache["data"], _dataset_cache["mtime"] = data, mtime
+    return data
+
+
+def split_multiple_choice(text : str) -> Optional[Tuple[str, List[str]]]:
+    """
+    Tách câu hỏi trắc nghiệm dạng text thành (câu hỏi, các lựa chọn).
+
+    Returns:
+        (question, options), hoặc None nếu không tìm được các lựa chọn A, B, ... liên tiếp
+    """
+    matches : List[re.Match] = []
+    for match in _OPTION_REGEX.finditer(text):
+        if match.group(1) == chr(ord("A") + len(matches)):
+            matches.append(match)
+    if len(matches) < 2 or not text[:matches[0].start()].strip():
+        return None
+    options : List[str] = [
+        text[match.end():(matches[i + 1].start() if i + 1 < len(matches) else len(text))].strip()
+        for i, match in enumerate(matches)
+    ]
+    if not all(options):
+        return None
+    return text[:matches[0].start()].strip(), options
+
 
 @dataclass
 class Call_Model:
     """
     Dataclass chứa các model cần thiết cho hệ thống RAG.
     
+    Model embedding và reranking chạy bằng PyTorch hoặc ONNX Runtime tùy theo
+    inference_backend trong config.
+    
     Attributes:
-        model_embedding: Model HuggingFace để tạo embedding
+        model_embedding: Model tạo embedding (HuggingFaceEmbeddings hoặc ONNX_Embeddings)
         vectorDB: Vector database FAISS đã được lưu trước
-        reranking: Model FlagReranker để sắp xếp lại kết quả
+        reranking: Model reranking (FlagReranker hoặc ONNX_Reranker)
     """
-    model_embedding : HuggingFaceEmbeddings = field(default_factory=lambda: HuggingFaceEmbeddings(
-        model_name=MODEL_NAME_EMBEDDING,
-        model_kwargs={'device': device}
-    ))
-
-    vectorDB : FAISS = field(default_factory=lambda: FAISS.load_local(
-        path_save_VectorDB, 
-        HuggingFaceEmbeddings(
-            model_name=MODEL_NAME_EMBEDDING,
-            model_kwargs={'device': device}
-        ),  
-        allow_dangerous_deserialization=True
-    ))
-    reranking : FlagReranker = field(default_factory=lambda: FlagReranker(
-        MODEL_NAME_RERANKING, 
-        use_fp16=True
-    ))
+    model_embedding : Embeddings = field(default_factory=load_embedding_model)
+    reranking : object = field(default_factory=load_reranker)
+    vectorDB : FAISS = field(init=False)
+
+    def __post_init__(self) -> None:
+        # Dùng chung model embedding với VectorDB thay vì tải thêm một bản
+        self.vectorDB = FAISS.load_local(
+            path_save_VectorDB,
+            self.model_embedding,
+            allow_dangerous_deserialization=True
+        )
 
 call_model : dataclass = Call_Model()
 
@@ -92,16 +145,42 @@ class Respone:
         """
         self.user_query : str = user_query
 
+    @cached_property
+    def query_embedding(self) -> List[float]:
+        """
+        Embedding của câu hỏi, chỉ tính một lần và dùng chung cho router và retrieval.
+        
+        Returns:
+            List[float] vector embedding của câu hỏi
+        """
+        with stage_timer("embed_query"):
+            return call_model.model_embedding.embed_query(self.user_query)
+
+    @property
+    def get_question_type(self) -> str:
+        """
+        Định tuyến câu hỏi (THEORY, PRACTICE, MULTIPLE_CHOICE).
+        
+        Với routing_mode = embedding, router dùng lại query_embedding nên gần như
+        không tốn thêm thời gian; ngược lại dùng classify_physics_question và
+        không tính embedding (câu hỏi PRACTICE, MULTIPLE_CHOICE không cần retrieval).
+        
+        Returns:
+            String loại câu hỏi
+        """
+        if ROUTING_MODE != "embedding":
+            return route_question(self.user_query)
+        return route_question(self.user_query, self.query_embedding)
+
     @property
     def get_informatin_json(self) -> str:
         """
-        Đọc file JSON chứa thông tin dataset.
+        Đọc file JSON chứa thông tin dataset (được cache cho tới khi file thay đổi).
         
         Returns:
             Dict chứa thông tin từ file JSON
         """
-        with open(path_dataset_file_json, "r", encoding="utf-8") as file:
-            return json.load(file)
+        return load_dataset_json()
 
     @property
     def get_context(self) -> str:
@@ -111,7 +190,13 @@ class Respone:
         Returns:
             String chứa context liên quan
         """
-        return get_information(self.user_query,call_model.vectorDB, call_model.reranking,self.get_informatin_json)
+        return get_information(
+            self.user_query,
+            call_model.vectorDB,
+            call_model.reranking,
+            self.get_informatin_json,
+            query_embedding=self.query_embedding
+        )
 
     @property
     def get_respone(self) -> str:
@@ -121,5 +206,53 @@ class Respone:
         Returns:
             String chứa câu trả lời từ AI
         """
-        return Answer_Question_From_Documents(self.user_query,self.get_context).run
+        context : str = self.get_context
+        with stage_timer("gemini"):
+            return AnswerQuestionFromDocuments(self.user_query, context).run()
+
+    @property
+    def get_multiple_choice_respone(self) -> Optional[str]:
+        """
+        Trả lời câu hỏi trắc nghiệm bằng model trắc nghiệm qua inference server.
+
+        Returns:
+            String đáp án, hoặc None nếu không tách được lựa chọn / server không phản hồi
+        """
+        parsed : Optional[Tuple[str, List[str]]] = split_multiple_choice(self.user_query)
+        if parsed is None:
+            return None
+        question, options = parsed
+        global _multiple_choice_client
+        if _multiple_choice_client is None:
+            _multiple_choice_client = Multiple_Choice_Client()
+        try:
+            with stage_timer("multiple_choice"):
+                result : Dict = _multiple_choice_client.score(question, options)
+        # requests.RequestException là OSError, body không phải JSON là ValueError
+        except (OSError, ValueError) as error:
+            logger.warning("Inference server trắc nghiệm không phản hồi (%r), dùng RAG", error)
+            return None
+        letter : str = str(result.get("predicted_answer") or "")
+        index : int = ord(letter) - ord("A") if len(letter) == 1 else -1
+        if not 0 <= index < len(options):
+            return None
+        return f"Đáp án: {letter}. {options[index]}"
+
+    @property
+    def get_routed_respone(self) -> str:
+        """
+        Định tuyến câu hỏi rồi trả lời bằng pipeline tương ứng.
+
+        MULTIPLE_CHOICE dùng model trắc nghiệm (inference server), các loại còn lại và
+        trường hợp model trắc nghiệm không dùng được thì dùng RAG (get_respone).
+
+        Returns:
+            String chứa câu trả lời
+        """
+        if self.get_question_type == "MULTIPLE_CHOICE":
+            answer : Optional[str] = self.get_multiple_choice_respone
+            if answer is not None:
+                return answer
+            DEGRADATIONS.inc("multiple_choice_to_rag")
+        return self.get_respone
 
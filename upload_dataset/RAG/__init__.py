@@ -1,3 +1,4 @@
 from .document_loader import *
 from .chunking_dataset import *
+from .deduplicate_dataset import *
 from .save_VectorDB import *
\ No newline at end of file
@@ -1 +1 @@
-from .split_data import Chunking_Data
+from .split_data import Chunking_Data, SENTENCE_SPLIT_REGEX
@@ -8,6 +8,9 @@ from typing import (
 from tqdm import tqdm
 import logging
 
+# Regex tách câu, SemanticChunker embedding từng câu tách theo regex này
+SENTENCE_SPLIT_REGEX : str = r"(?<=[.?!])\s+"
+
 class Chunking_Data:
     def __init__(self, documents: List[str], model_embedding: HuggingFaceEmbeddings) -> None:
         '''
@@ -25,7 +28,7 @@ class Chunking_Data:
                 embeddings=self.__model_embedding,
                 breakpoint_threshold_type="percentile",  # hoặc "standard_deviation", "interquartile"
                 breakpoint_threshold_amount=95,
-                sentence_split_regex=r"(?<=[.?!])\s+",  # Regex để tách câu
+                sentence_split_regex=SENTENCE_SPLIT_REGEX,  # Regex để tách câu
             )
             
             # Hiển thị tiến độ khi split documents
@@ -0,0 +1,153 @@
+from typing import (
+    Dict,
+    List,
+    Tuple
+)
+from tqdm import tqdm
+import numpy as np
+import json
+import re
+import zlib
+
+from ..save_VectorDB.checkpoint import chunk_id
+
+# Số nguyên tố Mersenne 2^61 - 1 dùng cho các hàm hash (a * x + b) % P
+_MERSENNE_PRIME : int = (1 << 61) - 1
+_MAX_HASH : int = (1 << 32) - 1
+_WORD_REGEX = re.compile(r"\w+", re.UNICODE)
+
+
+def _candidate_probability(similarity : np.ndarray, bands : int, rows : int) -> np.ndarray:
+    """Xác suất hai chunk có độ tương đồng Jaccard similarity rơi vào cùng bucket ở ít nhất một band"""
+    return 1 - (1 - similarity ** rows) ** bands
+
+
+def _choose_bands(
+    num_perm : int,
+    threshold : float,
+    false_positive_weight : float = 0.01,
+    false_negative_weight : float = 0.99,
+    steps : int = 1000
+) -> Tuple[int, int]:
+    """
+    Chọn số band b và số dòng r (b * r <= num_perm) cực tiểu tổng có trọng số của
+    diện tích false positive (cặp có Jaccard < threshold vẫn thành ứng viên) và
+    false negative (cặp có Jaccard >= threshold không bao giờ được so sánh), như datasketch.
+
+    Chọn theo điểm giữa của đường cong S ((1/b)^(1/r) = threshold) thì ngay tại threshold
+    xác suất thành ứng viên chỉ khoảng 0.5: với 128 hàm hash, ngưỡng 0.85 cho b=8, r=16 và
+    hơn nửa số cặp gần trùng bị bỏ sót. False positive chỉ tốn một lần so signature (ứng
+    viên được lọc lại theo Jaccard ước lượng >= threshold) còn false negative là bản trùng bị
+    giữ lại, nên false negative được đánh trọng số cao hơn nhiều: 128 hàm hash, ngưỡng 0.85
+    cho b=14, r=9, xác suất thành ứng viên tại 0.85 khoảng 0.97.
+    """
+    below : np.ndarray = (np.arange(steps) + 0.5) / steps * threshold
+    above : np.ndarray = threshold + (np.arange(steps) + 0.5) / steps * (1 - threshold)
+    best : Tuple[int, int] = (num_perm, 1)
+    best_error : float = float("inf")
+    for bands in range(1, num_perm + 1):
+        for rows in range(1, num_perm // bands + 1):
+            false_positive : float = float(_candidate_probability(below, bands, rows).mean()) * threshold
+            false_negative : float = float(1 - _candidate_probability(above, bands, rows).mean()) * (1 - threshold)
+            error : float = false_positive_weight * false_positive + false_negative_weight * false_negative
+            if error < best_error:
+                best, best_error = (bands, rows), error
+    return best
+
+
+class Deduplicate_Data:
+    def __init__(
+        self,
+        documents : List,
+        threshold : float = 0.85,
+        num_perm : int = 128,
+        shingle_size : int = 3,
+        seed : int = 42
+    ) -> None:
+        '''
+        documents : danh sách chunks (Document) sau khi chunking
+        threshold : ngưỡng độ tương đồng Jaccard, chunk có độ tương đồng >= threshold với chunk đã giữ sẽ bị loại
+        num_perm : số hàm hash của MinHash (càng lớn càng chính xác nhưng chậm hơn)
+        shingle_size : số từ trong mỗi shingle
+        '''
+        self.__documents : List = documents
+        self.__threshold : float = threshold
+        self.__num_perm : int = num_perm
+        self.__shingle_size : int = shingle_size
+
+        generator = np.random.default_rng(seed)
+        self.__a = generator.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self.__b = generator.integers(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.__bands, self.__rows = _choose_bands(num_perm, threshold)
+
+    def __shingles(self, text : str) -> np.ndarray:
+        words : List[str] = _WORD_REGEX.findall(text.lower())
+        size : int = self.__shingle_size
+        if len(words) <= size:
+            grams = {" ".join(words)}
+        else:
+            grams = {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+        return np.fromiter(
+            (zlib.crc32(gram.encode("utf-8")) & _MAX_HASH for gram in grams),
+            dtype=np.uint64,
+            count=len(grams)
+        )
+
+    def signature(self, text : str) -> np.ndarray:
+        """Tính MinHash signature (num_perm giá trị) của một đoạn văn bản"""
+        hashes : np.ndarray = self.__shingles(text)
+        values = (self.__a[:, None] * hashes[None, :] + self.__b[:, None]) % np.uint64(_MERSENNE_PRIME)
+        return values.min(axis=1)
+
+    @property
+    def run(self) -> List:
+        """
+        Loại các chunks gần trùng nhau, giữ lại chunk xuất hiện đầu tiên.
+        Chunk được giữ lưu id các chunks bị gộp vào metadata["duplicate_ids"] (chuỗi json,
+        vì Chroma chỉ nhận metadata dạng scalar) và số lượng vào metadata["duplicate_count"].
+        """
+        kept : List = []
+        kept_signatures : List[np.ndarray] = []
+        absorbed : List[List[str]] = []
+        buckets : List[Dict[bytes, List[int]]] = [{} for _ in range(self.__bands)]
+        rows : int = self.__rows
+
+        print("Đang loại bỏ chunks trùng lặp...")
+        for doc in tqdm(self.__documents, desc="Deduplicating chunks"):
+            signature : np.ndarray = self.signature(doc.page_content)
+            keys : List[bytes] = [
+                signature[band * rows:(band + 1) * rows].tobytes()
+                for band in range(self.__bands)
+            ]
+
+            # Các chunk đã giữ rơi vào cùng bucket ở ít nhất một band là ứng viên trùng lặp,
+            # chỉ gộp khi Jaccard ước lượng từ signature >= threshold
+            candidates = set()
+            for band, key in enumerate(keys):
+                candidates.update(buckets[band].get(key, ()))
+
+            best_index : int = -1
+            best_similarity : float = self.__threshold
+            for index in candidates:
+                similarity : float = float(np.mean(kept_signatures[index] == signature))
+                if similarity >= best_similarity:
+                    best_index, best_similarity = index, similarity
+
+            if best_index >= 0:
+                absorbed[best_index].append(chunk_id(doc))
+                continue
+
+            index = len(kept)
+            kept.append(doc)
+            kept_signatures.append(signature)
+            absorbed.append([])
+            for band, key in enumerate(keys):
+                buckets[band].setdefault(key, []).append(index)
+
+        for doc, duplicate_ids in zip(kept, absorbed):
+            if duplicate_ids:
+                doc.metadata["duplicate_ids"] = json.dumps(duplicate_ids)
+                doc.metadata["duplicate_count"] = len(duplicate_ids)
+
+        print(f"Giữ lại {len(kept)}/{len(self.__documents)} chunks (ngưỡng {self.__threshold})")
+        return kept
@@ -1 +1,2 @@
-from .get_data import get_data
\ No newline at end of file
+from .get_data import get_data
+from .pdf_backend import PDF_BACKENDS, PDF_Extractor
@@ -1,28 +1,47 @@
-from langchain.document_loaders import DirectoryLoader, PyPDFLoader, Docx2txtLoader
-from typing import List
+from langchain.document_loaders import DirectoryLoader, Docx2txtLoader
+from typing import List, Optional
+from pathlib import Path
+from tqdm import tqdm
+
+from .pdf_backend import PDF_Extractor
 
 class get_data:
-    def __init__(self, path_folder: str) -> None:
+    def __init__(
+        self,
+        path_folder: str,
+        backend: str = "pymupdf",
+        max_workers: Optional[int] = None,
+        cache_dir: Optional[str] = None
+    ) -> None:
         """
         path_folder : đường dẫn đến folder chứa file pdf và word
+        backend : thư viện đọc PDF ("pymupdf", "pdfplumber", "pypdf")
+        max_workers : số process đọc song song các trang của file PDF lớn
+        cache_dir : folder cache text từng trang (mặc định <path_folder>/.page_cache)
         """
         self.__path_folder: str = path_folder
-    
+        self.pdf_extractor: PDF_Extractor = PDF_Extractor(
+            backend=backend,
+            max_workers=max_workers,
+            cache_dir=cache_dir or str(Path(path_folder) / ".page_cache")
+        )
+
     # hàm đọc file pdf và word trong folder chuyển về dạng list
     @property
     def read(self) -> List[str]:
         documents = []
-        
+
         # Đọc file PDF
-        pdf_loader = DirectoryLoader(
-            path=self.__path_folder,
-            glob="**/*.pdf",
-            loader_cls=PyPDFLoader,
-            show_progress=True
+        pdf_files = sorted(Path(self.__path_folder).rglob("*.pdf"))
+        for path_pdf in tqdm(pdf_files, desc="Đọc file PDF"):
+            documents.extend(self.pdf_extractor.extract(str(path_pdf)))
+
+        stats = self.pdf_extractor.stats
+        print(
+            f"📄 {int(stats['pages'])} trang PDF ({int(stats['pages_cached'])} trang từ cache) "
+            f"trong {stats['seconds']:.2f}s - {self.pdf_extractor.pages_per_second:.1f} trang/s"
         )
-        pdf_docs = pdf_loader.load()
-        documents.extend(pdf_docs)
-        
+
         # Đọc file Word (.docx)
         docx_loader = DirectoryLoader(
             path=self.__path_folder,
@@ -32,7 +51,7 @@ class get_data:
         )
         docx_docs = docx_loader.load()
         documents.extend(docx_docs)
-        
+
         # Đọc file Word (.doc)
         try:
             doc_loader = DirectoryLoader(
@@ -45,5 +64,5 @@ class get_data:
             documents.extend(doc_docs)
         except Exception as e:
             print(f"Không thể đọc file .doc: {e}")
-        
-        return documents
\ No newline at end of file
+
+        return documents
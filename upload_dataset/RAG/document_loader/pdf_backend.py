@@ -0,0 +1,173 @@
+from langchain.schema import Document
+from concurrent.futures import ProcessPoolExecutor
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Tuple
+)
+from importlib import metadata
+import hashlib
+import os
+import time
+
+PDF_BACKENDS : Tuple[str, ...] = ("pymupdf", "pdfplumber", "pypdf")
+# Tên package (distribution) của từng backend, dùng để lấy version
+_BACKEND_PACKAGES : Dict[str, str] = {"pymupdf": "PyMuPDF", "pdfplumber": "pdfplumber", "pypdf": "PyPDF2"}
+
+
+def file_hash(path : str) -> str:
+    """sha1 nội dung file, dùng làm khóa cache (đổi nội dung file thì cache tự mất hiệu lực)"""
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+
+def backend_version(backend : str) -> str:
+    """Version của thư viện đọc PDF, "unknown" nếu không tìm được package"""
+    try:
+        return metadata.version(_BACKEND_PACKAGES[backend])
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def count_pages(path : str, backend : str) -> int:
+    if backend == "pymupdf":
+        import pymupdf
+        with pymupdf.open(path) as pdf:
+            return pdf.page_count
+    if backend == "pdfplumber":
+        import pdfplumber
+        with pdfplumber.open(path) as pdf:
+            return len(pdf.pages)
+    from PyPDF2 import PdfReader
+    return len(PdfReader(path).pages)
+
+
+def extract_pages(path : str, backend : str, pages : List[int]) -> List[Tuple[int, str]]:
+    """
+    Trích xuất text của các trang trong một file PDF.
+    Hàm ở mức module để có thể chạy trong worker process.
+    """
+    result : List[Tuple[int, str]] = []
+    if backend == "pymupdf":
+        import pymupdf
+        with pymupdf.open(path) as pdf:
+            for page in pages:
+                result.append((page, pdf.load_page(page).get_text("text")))
+    elif backend == "pdfplumber":
+        import pdfplumber
+        with pdfplumber.open(path) as pdf:
+            for page in pages:
+                result.append((page, pdf.pages[page].extract_text() or ""))
+    else:
+        from PyPDF2 import PdfReader
+        reader = PdfReader(path)
+        for page in pages:
+            result.append((page, reader.pages[page].extract_text() or ""))
+    return result
+
+
+class Page_Cache:
+    def __init__(self, cache_dir : Optional[str], namespace : str = "") -> None:
+        """
+        cache_dir : folder lưu text từng trang theo <namespace>/<hash file>/<số trang>.txt, None thì không dùng cache
+        namespace : backend và version của nó (vd "pymupdf-1.24.1"), đổi backend hoặc nâng version
+                    thì text trích xuất có thể khác nên dùng cache riêng
+        """
+        self.__cache_dir : Optional[str] = cache_dir
+        self.__namespace : str = namespace
+
+    def __path(self, hash_file : str, page : int) -> str:
+        return os.path.join(self.__cache_dir, self.__namespace, hash_file, f"{page}.txt")
+
+    def get(self, hash_file : str, page : int) -> Optional[str]:
+        if self.__cache_dir is None:
+            return None
+        path : str = self.__path(hash_file, page)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as file:
+            return file.read()
+
+    def put(self, hash_file : str, page : int, text : str) -> None:
+        if self.__cache_dir is None:
+            return
+        path : str = self.__path(hash_file, page)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as file:
+            file.write(text)
+        os.replace(path + ".tmp", path)
+
+
+class PDF_Extractor:
+    def __init__(
+        self,
+        backend : str = "pymupdf",
+        max_workers : Optional[int] = None,
+        min_pages_parallel : int = 64,
+        cache_dir : Optional[str] = None
+    ) -> None:
+        """
+        backend : thư viện đọc PDF ("pymupdf" nhanh nhất, "pdfplumber", "pypdf")
+        max_workers : số process để đọc song song các trang (mặc định = số CPU)
+        min_pages_parallel : file có từ số trang này trở lên mới chia trang cho nhiều process
+        cache_dir : folder cache text từng trang
+        """
+        if backend not in PDF_BACKENDS:
+            raise ValueError(f"backend phải là một trong {PDF_BACKENDS}, nhận được: {backend}")
+        self.__backend : str = backend
+        self.__max_workers : int = max_workers or os.cpu_count() or 1
+        self.__min_pages_parallel : int = min_pages_parallel
+        self.__cache : Page_Cache = Page_Cache(cache_dir, f"{backend}-{backend_version(backend)}")
+        self.stats : Dict[str, float] = {"pages": 0, "pages_cached": 0, "seconds": 0.0}
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.stats["pages"] / self.stats["seconds"] if self.stats["seconds"] else 0.0
+
+    def __extract_uncached(self, path : str, pages : List[int]) -> List[Tuple[int, str]]:
+        if len(pages) < self.__min_pages_parallel or self.__max_workers <= 1:
+            return extract_pages(path, self.__backend, pages)
+
+        # Chia các trang thành các đoạn liên tiếp để mỗi worker chỉ mở file một lần cho mỗi đoạn
+        num_parts : int = min(len(pages), self.__max_workers * 4)
+        size : int = -(-len(pages) // num_parts)
+        parts : List[List[int]] = [pages[i:i + size] for i in range(0, len(pages), size)]
+
+        result : List[Tuple[int, str]] = []
+        with ProcessPoolExecutor(max_workers=self.__max_workers) as executor:
+            futures = [executor.submit(extract_pages, path, self.__backend, part) for part in parts]
+            for future in futures:
+                result.extend(future.result())
+        return result
+
+    def extract(self, path : str) -> List[Document]:
+        """Đọc một file PDF, trả về mỗi trang là một Document (metadata giống PyPDFLoader)"""
+        start : float = time.perf_counter()
+        hash_file : str = file_hash(path)
+        num_pages : int = count_pages(path, self.__backend)
+
+        texts : Dict[int, str] = {}
+        missing : List[int] = []
+        for page in range(num_pages):
+            text : Optional[str] = self.__cache.get(hash_file, page)
+            if text is None:
+                missing.append(page)
+            else:
+                texts[page] = text
+
+        for page, text in self.__extract_uncached(path, missing):
+            texts[page] = text
+            self.__cache.put(hash_file, page, text)
+
+        self.stats["pages"] += num_pages
+        self.stats["pages_cached"] += num_pages - len(missing)
+        self.stats["seconds"] += time.perf_counter() - start
+
+        return [
+            Document(page_content=texts[page], metadata={"source": path, "page": page})
+            for page in range(num_pages)
+        ]
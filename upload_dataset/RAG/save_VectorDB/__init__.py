@@ -1,8 +1,19 @@
 from tqdm import tqdm
 from langchain.vectorstores import Chroma
 from langchain.embeddings import OpenAIEmbeddings
+from collections import deque
 import math
 import os
+import time
+
+from .checkpoint import (
+    CHECKPOINT_FILE_NAME,
+    CHECKPOINT_LOG_FILE_NAME,
+    REPORT_FILE_NAME,
+    Build_Checkpoint,
+    chunk_id,
+    write_json_atomic
+)
 
 def read_Vector_DB(path_VectorDB: str, embeddings=None):
     """
@@ -46,13 +57,35 @@ def read_Vector_DB(path_VectorDB: str, embeddings=None):
         print(f"❌ Lỗi khi đọc Vector DB: {e}")
         raise e
 
-def create_vectorstore_with_progress(documents, embeddings, persist_directory, batch_size) -> Chroma:
-    """Tạo vectorstore với progress bar"""
+def create_vectorstore_with_progress(
+    documents,
+    embeddings,
+    persist_directory,
+    batch_size,
+    resume : bool = False,
+    max_retries : int = 3,
+    retry_delay : float = 2.0
+) -> Chroma:
+    """
+    Tạo vectorstore với progress bar và checkpoint theo từng batch
+
+    Args:
+        documents: Danh sách chunks (Document) cần embedding
+        embeddings: Embedding function
+        persist_directory: Folder lưu VectorDB và file checkpoint
+        batch_size: Số chunks mỗi batch
+        resume: True thì bỏ qua các chunks đã được ghi ở lần chạy trước
+        max_retries: Số lần thử lại tối đa cho một batch lỗi
+        retry_delay: Thời gian chờ (giây) trước lần thử lại đầu tiên, nhân đôi sau mỗi lần
+    """
     
     # Tạo folder nếu chưa có
     os.makedirs(persist_directory, exist_ok=True)
     
-    all_list = os.listdir(persist_directory)
+    all_list = [
+        name for name in os.listdir(persist_directory)
+        if name not in (CHECKPOINT_FILE_NAME, CHECKPOINT_LOG_FILE_NAME, REPORT_FILE_NAME)
+    ]
     
     if (len(all_list) == 0):
         print("Chưa có VectorDB tôi sẽ tạo VectorDB mới")
@@ -65,23 +98,53 @@ def create_vectorstore_with_progress(documents, embeddings, persist_directory, b
         print("Đã có VectorDB bây giờ sẽ đọc và thêm dữ liệu")
         vectorstore = read_Vector_DB(persist_directory, embeddings)
     
+    checkpoint = Build_Checkpoint(persist_directory, resume=resume)
+
+    # Gán id ổn định cho từng chunk, bỏ chunk trùng id và chunk đã ghi ở lần trước
+    all_ids = []
+    pending = []
+    locations = {}
+    for doc in documents:
+        id_chunk = chunk_id(doc)
+        if id_chunk in locations:
+            continue
+        locations[id_chunk] = (doc.metadata.get("source", ""), doc.metadata.get("page"))
+        all_ids.append(id_chunk)
+        if not checkpoint.is_done(id_chunk):
+            pending.append((id_chunk, doc))
+
     # Chia documents thành batches
-    total_docs = len(documents)
+    total_docs = len(pending)
     num_batches = math.ceil(total_docs / batch_size)
     
-    print(f"📝 Tổng số documents: {total_docs}")
+    print(f"📝 Tổng số documents: {len(all_ids)}")
+    print(f"⏭️  Đã có trong checkpoint: {len(all_ids) - total_docs}")
     print(f"📦 Số batches: {num_batches}")
     print(f"🔢 Batch size: {batch_size}")
+
+    # Số chunks được ghi trong lần chạy này (không tính chunks đã có từ checkpoint khi resume)
+    written = 0
+
+    def add_batch(batch) -> None:
+        nonlocal written
+        ids = [id_chunk for id_chunk, _ in batch]
+        vectorstore.add_documents(documents=[doc for _, doc in batch], ids=ids)
+        # Persist trước rồi mới ghi checkpoint để checkpoint chỉ chứa chunks đã nằm trên đĩa
+        vectorstore.persist()
+        checkpoint.mark_done(ids)
+        written += len(ids)
+
+    retry_queue = deque()
     
     # Progress bar
     with tqdm(total=total_docs, desc="Bắt đầu embedding: ") as pbar:
         for i in range(0, total_docs, batch_size):
             # Lấy batch hiện tại
-            batch = documents[i:i + batch_size]
+            batch = pending[i:i + batch_size]
             
             try:
                 # Thêm batch vào vectorstore
-                vectorstore.add_documents(documents=batch)
+                add_batch(batch)
                 
                 # Update progress bar
                 pbar.update(len(batch))
@@ -93,11 +156,48 @@ def create_vectorstore_with_progress(documents, embeddings, persist_directory, b
                 })
                 
             except Exception as e:
-                print(f"❌ Lỗi khi thêm batch {i//batch_size + 1}: {e}")
-                continue
+                print(f"❌ Lỗi khi thêm batch {i//batch_size + 1}: {e} (đưa vào hàng đợi thử lại)")
+                checkpoint.mark_failed([id_chunk for id_chunk, _ in batch], str(e))
+                retry_queue.append((batch, 1))
+
+        # Thử lại các batch lỗi với thời gian chờ tăng dần
+        while retry_queue:
+            batch, attempt = retry_queue.popleft()
+            time.sleep(retry_delay * 2 ** (attempt - 1))
+            try:
+                add_batch(batch)
+                pbar.update(len(batch))
+            except Exception as e:
+                print(f"❌ Thử lại lần {attempt} thất bại ({len(batch)} chunks): {e}")
+                checkpoint.mark_failed([id_chunk for id_chunk, _ in batch], str(e))
+                if attempt < max_retries:
+                    retry_queue.append((batch, attempt + 1))
     
     # Persist sau khi xong
     print("💾 Persisting to disk...")
     vectorstore.persist()
-    print("✅ Complete!")
-    
\ No newline at end of file
+    checkpoint.save()
+
+    # Báo cáo các chunks chưa bao giờ được ghi vào VectorDB
+    not_indexed = [id_chunk for id_chunk in all_ids if not checkpoint.is_done(id_chunk)]
+    report = {
+        "total_chunks": len(all_ids),
+        "indexed_chunks": len(all_ids) - len(not_indexed),
+        "written_chunks": written,
+        "not_indexed": [
+            {
+                "id": id_chunk,
+                "source": locations[id_chunk][0],
+                "page": locations[id_chunk][1],
+                "error": checkpoint.failed_ids.get(id_chunk, "")
+            }
+            for id_chunk in not_indexed
+        ]
+    }
+    write_json_atomic(os.path.join(persist_directory, REPORT_FILE_NAME), report)
+
+    if not_indexed:
+        print(f"⚠️  {len(not_indexed)} chunks chưa được index, xem {REPORT_FILE_NAME} hoặc chạy lại với --resume")
+    else:
+        print("✅ Complete!")
+    return vectorstore
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+from typing import (
+    Dict,
+    List,
+    Set
+)
+
+CHECKPOINT_FILE_NAME : str = "index_checkpoint.json"
+CHECKPOINT_LOG_FILE_NAME : str = "index_checkpoint.log.jsonl"
+REPORT_FILE_NAME : str = "index_report.json"
+
+
+def chunk_id(document) -> str:
+    """
+    Sinh id ổn định cho một chunk (sha1 của nguồn + trang + nội dung).
+    Cùng một chunk luôn có cùng id giữa các lần chạy nên có thể dùng để resume.
+    """
+    metadata : Dict = getattr(document, "metadata", None) or {}
+    key : str = f"{metadata.get('source', '')}|{metadata.get('page', '')}|{document.page_content}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def write_json_atomic(path : str, data) -> None:
+    """Ghi file json theo kiểu atomic (ghi file tạm, fsync rồi os.replace)"""
+    path_tmp : str = path + ".tmp"
+    with open(path_tmp, "w", encoding="utf-8") as file:
+        json.dump(data, file, ensure_ascii=False, indent=2)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(path_tmp, path)
+
+
+class Build_Checkpoint:
+    def __init__(self, persist_directory : str, resume : bool = False, compact_every : int = 100) -> None:
+        """
+        persist_directory : folder chứa VectorDB, file checkpoint được lưu cùng chỗ
+        resume : True thì đọc lại checkpoint cũ, False thì bắt đầu checkpoint mới
+        compact_every : số bản ghi trong log trước khi gộp vào file snapshot
+
+        Mỗi batch chỉ append một dòng (id của batch) vào file log JSONL nên chi phí ghi
+        checkpoint tỉ lệ với kích thước batch, không phải tổng số chunks đã ghi. Sau
+        compact_every bản ghi, trạng thái được ghi lại vào snapshot (index_checkpoint.json)
+        rồi log được làm rỗng. Khi đọc: snapshot + phát lại log (bỏ qua dòng cuối ghi dở).
+        """
+        self.__path : str = os.path.join(persist_directory, CHECKPOINT_FILE_NAME)
+        self.__path_log : str = os.path.join(persist_directory, CHECKPOINT_LOG_FILE_NAME)
+        self.__compact_every : int = compact_every
+        self.__log_records : int = 0
+        self.done_ids : Set[str] = set()
+        self.failed_ids : Dict[str, str] = {}
+
+        if not resume:
+            for path in (self.__path, self.__path_log):
+                if os.path.exists(path):
+                    os.remove(path)
+            return
+
+        if os.path.exists(self.__path):
+            with open(self.__path, "r", encoding="utf-8") as file:
+                data : Dict = json.load(file)
+            self.done_ids = set(data.get("done_ids", []))
+            self.failed_ids = data.get("failed_ids", {})
+        if os.path.exists(self.__path_log):
+            with open(self.__path_log, "r", encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        record : Dict = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Dòng ghi dở: gộp ngay để lần append sau không nối vào dòng hỏng
+                        self.save()
+                        break
+                    self.__apply(record)
+                    self.__log_records += 1
+        if self.done_ids or self.failed_ids:
+            print(f"♻️  Resume từ checkpoint: {len(self.done_ids)} chunks đã được ghi")
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    def is_done(self, id_chunk : str) -> bool:
+        return id_chunk in self.done_ids
+
+    def __apply(self, record : Dict) -> None:
+        if "done" in record:
+            self.done_ids.update(record["done"])
+            for id_chunk in record["done"]:
+                self.failed_ids.pop(id_chunk, None)
+        else:
+            for id_chunk in record["failed"]:
+                self.failed_ids[id_chunk] = record["error"]
+
+    def __append(self, record : Dict) -> None:
+        self.__apply(record)
+        with open(self.__path_log, "a", encoding="utf-8") as file:
+            file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        self.__log_records += 1
+        if self.__log_records >= self.__compact_every:
+            self.save()
+
+    def mark_done(self, ids : List[str]) -> None:
+        """Chỉ gọi sau khi batch đã được persist xuống đĩa"""
+        self.__append({"done": ids})
+
+    def mark_failed(self, ids : List[str], error : str) -> None:
+        self.__append({"failed": ids, "error": error})
+
+    def save(self) -> None:
+        """Gộp log vào snapshot: ghi snapshot (atomic) trước rồi mới làm rỗng log"""
+        write_json_atomic(self.__path, {
+            "done_ids": sorted(self.done_ids),
+            "failed_ids": self.failed_ids
+        })
+        # Dừng giữa hai bước thì log chỉ bị phát lại trên snapshot đã chứa nó, kết quả không đổi
+        with open(self.__path_log, "w", encoding="utf-8") as file:
+            file.flush()
+            os.fsync(file.fileno())
+        self.__log_records = 0
@@ -0,0 +1,228 @@
+"""
+Benchmark tốc độ tạo VectorDB (Create_VectorDB_Update_Dataset.run).
+
+Sinh (hoặc đọc) một bộ tài liệu vật lý tiếng Việt ở nhiều kích thước, chạy toàn bộ
+pipeline ingestion cho từng kích thước trong một process riêng và ghi report JSON:
+docs/s, pages/s, sentences embedded/s, chunks/s, vectors written/s, peak RSS và
+thời gian từng bước. Truyền --baseline để so sánh với report của commit trước.
+
+Cách chạy:
+    python -m upload_dataset.benchmark --sizes 10 50 200 --output bench_ingestion.json
+    python -m upload_dataset.benchmark --corpus dataset_test --output bench_ingestion.json
+    python -m upload_dataset.benchmark --sizes 10 50 --baseline bench_old.json
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import (
+    Dict,
+    List,
+    Optional
+)
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+TOPICS : List[Dict[str, str]] = [
+    {"name": "động năng", "formula": "Wđ = ½mv²", "unit": "J"},
+    {"name": "thế năng trọng trường", "formula": "Wt = mgh", "unit": "J"},
+    {"name": "định luật II Newton", "formula": "F = ma", "unit": "N"},
+    {"name": "động lượng", "formula": "p = mv", "unit": "kg·m/s"},
+    {"name": "công suất", "formula": "P = A/t", "unit": "W"},
+    {"name": "định luật Ôm", "formula": "I = U/R", "unit": "A"},
+    {"name": "áp suất chất lỏng", "formula": "p = ρgh", "unit": "Pa"},
+    {"name": "nhiệt lượng", "formula": "Q = mcΔt", "unit": "J"},
+    {"name": "chu kì con lắc đơn", "formula": "T = 2π√(l/g)", "unit": "s"},
+    {"name": "bước sóng", "formula": "λ = v/f", "unit": "m"},
+    {"name": "lực hấp dẫn", "formula": "F = Gm₁m₂/r²", "unit": "N"},
+    {"name": "cảm ứng từ trong ống dây", "formula": "B = 4π·10⁻⁷·nI", "unit": "T"},
+]
+
+TEMPLATES : List[str] = [
+    "Trong chương này chúng ta tìm hiểu {name}.",
+    "Công thức của {name} là {formula}, đơn vị đo là {unit}.",
+    "Ví dụ: một vật có khối lượng {m} kg chuyển động với vận tốc {v} m/s.",
+    "Khi áp dụng {formula} cần chú ý đổi đơn vị về hệ SI trước khi thay số.",
+    "Đại lượng {name} phụ thuộc vào các điều kiện của bài toán như ma sát và lực cản không khí.",
+    "Bài tập {i}: hãy tính {name} khi biết các đại lượng đã cho với sai số nhỏ hơn {e}%.",
+    "Nhận xét: kết quả tính được phải có đơn vị {unit} và bậc độ lớn hợp lý.",
+    "Hiện tượng này được ứng dụng rộng rãi trong kĩ thuật và đời sống hằng ngày.",
+]
+
+SENTENCES_PER_PAGE : int = 24
+
+
+def synthetic_sentence(generator : random.Random, index : int) -> str:
+    topic : Dict[str, str] = generator.choice(TOPICS)
+    return generator.choice(TEMPLATES).format(
+        i=index,
+        m=generator.randint(1, 50),
+        v=generator.randint(1, 30),
+        e=generator.randint(1, 10),
+        **topic
+    )
+
+
+def generate_corpus(path_folder : str, num_docs : int, pages_per_doc : int = 3, seed : int = 42) -> None:
+    """Sinh num_docs file PDF, mỗi file pages_per_doc trang văn bản vật lý tiếng Việt"""
+    import pymupdf
+
+    generator : random.Random = random.Random(seed)
+    os.makedirs(path_folder, exist_ok=True)
+    for index_doc in range(num_docs):
+        pdf = pymupdf.open()
+        for index_page in range(pages_per_doc):
+            text : str = " ".join(
+                synthetic_sentence(generator, index_page * SENTENCES_PER_PAGE + i)
+                for i in range(SENTENCES_PER_PAGE)
+            )
+            page = pdf.new_page()
+            page.insert_htmlbox(pymupdf.Rect(50, 50, 545, 792), f"<p>{text}</p>")
+        pdf.save(os.path.join(path_folder, f"vat_ly_{index_doc:05d}.pdf"))
+        pdf.close()
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss tính bằng KB trên Linux và byte trên macOS
+    scale : float = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def run_once(path_folder : str, path_save : str, path_page_cache : str) -> Dict:
+    """Chạy toàn bộ ingestion một lần (trong process riêng để đo peak RSS chính xác)"""
+    from upload_dataset import Create_VectorDB_Update_Dataset
+
+    start : float = time.perf_counter()
+    pipeline = Create_VectorDB_Update_Dataset(path_folder, path_save, page_cache_dir=path_page_cache)
+    pipeline.run
+    total_seconds : float = time.perf_counter() - start
+
+    stats : Dict = dict(pipeline.stats)
+    stage_seconds : Dict[str, float] = stats["stage_seconds"]
+
+    def rate(count : int, stage : Optional[str]) -> float:
+        seconds : float = stage_seconds[stage] if stage else total_seconds
+        return count / seconds if seconds else 0.0
+
+    stats.update({
+        "total_seconds": total_seconds,
+        "docs_per_s": rate(stats["docs"], None),
+        "pages_per_s": rate(stats["pages"], "load_documents"),
+        "sentences_embedded_per_s": rate(stats["sentences"], "chunking"),
+        "chunks_per_s": rate(stats["chunks"], "chunking"),
+        "vectors_written_per_s": rate(stats["vectors_written"], "index"),
+        "peak_rss_mb": peak_rss_mb(),
+    })
+    return stats
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "unknown"
+
+
+# Các chỉ số càng lớn càng tốt (throughput) và càng nhỏ càng tốt
+HIGHER_IS_BETTER : List[str] = [
+    "docs_per_s",
+    "pages_per_s",
+    "sentences_embedded_per_s",
+    "chunks_per_s",
+    "vectors_written_per_s",
+]
+LOWER_IS_BETTER : List[str] = ["total_seconds", "peak_rss_mb"]
+
+
+def compare_reports(report : Dict, baseline : Dict, tolerance : float) -> List[str]:
+    """
+    So sánh report với baseline theo từng kích thước corpus.
+    Trả về danh sách các chỉ số bị giảm hiệu năng quá tolerance (tỉ lệ, ví dụ 0.1 = 10%).
+    """
+    regressions : List[str] = []
+    baseline_runs : Dict[str, Dict] = {str(run["size"]): run for run in baseline.get("runs", [])}
+    for run in report["runs"]:
+        old : Optional[Dict] = baseline_runs.get(str(run["size"]))
+        if old is None:
+            continue
+        for metric in HIGHER_IS_BETTER + LOWER_IS_BETTER:
+            if not old.get(metric):
+                continue
+            change : float = run[metric] / old[metric] - 1
+            worse : bool = change < -tolerance if metric in HIGHER_IS_BETTER else change > tolerance
+            print(f"size={run['size']:>6} {metric:<26} {old[metric]:>12.2f} -> {run[metric]:>12.2f} ({change:+.1%})")
+            if worse:
+                regressions.append(f"size={run['size']} {metric} {change:+.1%}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark tốc độ tạo VectorDB")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200], help="Số file PDF sinh ra cho mỗi lần chạy")
+    parser.add_argument("--pages_per_doc", type=int, default=3)
+    parser.add_argument("--corpus", default=None, help="Dùng folder tài liệu có sẵn thay vì sinh dữ liệu")
+    parser.add_argument("--work_dir", default=None, help="Folder tạm chứa corpus và VectorDB")
+    parser.add_argument("--output", default="bench_ingestion.json")
+    parser.add_argument("--baseline", default=None, help="Report cũ để so sánh")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Mức giảm hiệu năng chấp nhận được")
+    args = parser.parse_args()
+
+    work_dir : str = args.work_dir or tempfile.mkdtemp(prefix="bench_ingestion_")
+    os.makedirs(work_dir, exist_ok=True)
+
+    corpora : List[Dict] = []
+    if args.corpus:
+        corpora.append({"size": os.path.basename(os.path.normpath(args.corpus)), "path": args.corpus})
+    else:
+        for size in args.sizes:
+            path_corpus : str = os.path.join(work_dir, f"corpus_{size}")
+            if not os.path.isdir(path_corpus):
+                generate_corpus(path_corpus, size, pages_per_doc=args.pages_per_doc)
+            corpora.append({"size": size, "path": path_corpus})
+
+    runs : List[Dict] = []
+    context = multiprocessing.get_context("spawn")
+    for corpus in corpora:
+        path_save : str = os.path.join(work_dir, f"vectordb_{corpus['size']}")
+        # Page cache nằm trong work_dir của benchmark, không đụng tới .page_cache trong folder --corpus
+        path_page_cache : str = os.path.join(work_dir, f"page_cache_{corpus['size']}")
+        # Xóa VectorDB và page cache cũ để mỗi lần đo đều chạy từ đầu
+        shutil.rmtree(path_save, ignore_errors=True)
+        shutil.rmtree(path_page_cache, ignore_errors=True)
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            stats : Dict = executor.submit(run_once, corpus["path"], path_save, path_page_cache).result()
+        stats["size"] = corpus["size"]
+        runs.append(stats)
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+
+    report : Dict = {
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "runs": runs,
+    }
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"Đã ghi report: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline : Dict = json.load(file)
+        regressions : List[str] = compare_reports(report, baseline, args.tolerance)
+        if regressions:
+            print("⚠️  Giảm hiệu năng:\n" + "\n".join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,28 @@
-from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_core.embeddings import Embeddings
 from typing import (
     List,
-    Dict
+    Dict,
+    Optional
 )
+from contextlib import contextmanager
 from dataclasses import dataclass
+from functools import lru_cache
+import json
+import os
+import re
+import time
 import yaml
 from pathlib import Path
 
+from onnx_backend import load_embedding_model
+
 from .RAG import (
     get_data,
     Chunking_Data,
-    create_vectorstore_with_progress
+    Deduplicate_Data,
+    create_vectorstore_with_progress,
+    REPORT_FILE_NAME,
+    SENTENCE_SPLIT_REGEX
 )
 
 
@@ -20,28 +32,97 @@ with open(path_file_config, "r") as file:
     data_config : Dict[str, str] = yaml.safe_load(file)
 
 
-MODEL_NAME_EMBEDDING : str = data_config["model_embedding"]  
+MODEL_NAME_EMBEDDING : str = data_config["model_embedding"]
+DEDUP_THRESHOLD : float = data_config.get("dedup_threshold", 0.85)
+DEDUP_NUM_PERM : int = data_config.get("dedup_num_perm", 128)
+PDF_BACKEND : str = data_config.get("pdf_backend", "pymupdf")
+
+@lru_cache(maxsize=None)
+def get_model_embedding() -> Embeddings:
+    # Chỉ load model embedding một lần cho cả chunking và tạo VectorDB (PyTorch hoặc ONNX theo inference_backend)
+    return load_embedding_model(MODEL_NAME_EMBEDDING)
 
-def document_loader(path_data_pdf : str) -> List[str]: 
-    documents : List[str] = get_data(path_data_pdf).read
+def document_loader(path_data_pdf : str, page_cache_dir : Optional[str] = None) -> List[str]:
+    documents : List[str] = get_data(path_data_pdf, backend=PDF_BACKEND, cache_dir=page_cache_dir).read
     return documents
 
 def chunking(documents) -> List[str]:
-    data_split : List[str] = Chunking_Data(documents,MODEL_NAME_EMBEDDING).run
+    data_split : List[str] = Chunking_Data(documents, get_model_embedding()).run
     return data_split
 
+def deduplicate(data_split) -> List[str]:
+    data_unique : List[str] = Deduplicate_Data(
+        data_split,
+        threshold=DEDUP_THRESHOLD,
+        num_perm=DEDUP_NUM_PERM
+    ).run
+    return data_unique
+
+def count_pdf_pages(documents) -> int:
+    # Mỗi trang PDF là một Document, còn file Word cả file chỉ là một Document
+    return sum(1 for doc in documents if str(doc.metadata.get("source", "")).lower().endswith(".pdf"))
+
+def count_sentences(documents) -> int:
+    # Số câu SemanticChunker phải embedding
+    return sum(len(re.split(SENTENCE_SPLIT_REGEX, doc.page_content)) for doc in documents)
+
+@contextmanager
+def stage_timer(stage_seconds : Dict[str, float], name : str):
+    start : float = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_seconds[name] = time.perf_counter() - start
+
 class Create_VectorDB_Update_Dataset:
-    def __init__(self, path_folder : str, path_save_vector_DB : str) -> None:
+    def __init__(
+        self,
+        path_folder : str,
+        path_save_vector_DB : str,
+        resume : bool = False,
+        page_cache_dir : Optional[str] = None
+    ) -> None:
+        '''
+        page_cache_dir : folder cache text từng trang PDF (mặc định <path_folder>/.page_cache)
+        '''
         self.__path_folder : str = path_folder
         self.__path_save_vector_DB : str = path_save_vector_DB
-    
+        self.__resume : bool = resume
+        self.__page_cache_dir : Optional[str] = page_cache_dir
+        self.stats : Dict = {}
+
     @property
     def run(self) -> None:
-        documents : List[str] = document_loader(self.__path_folder)        
-        data_split : List[str] = chunking(documents)
-        create_vectorstore_with_progress(
-            documents=data_split,
-            embeddings=MODEL_NAME_EMBEDDING,
-            persist_directory=self.__path_save_vector_DB,
-            batch_size=100
-        )
+        # stats: số lượng ở mỗi bước và thời gian từng bước (giây), dùng cho benchmark
+        stage_seconds : Dict[str, float] = {}
+        self.stats = {"stage_seconds": stage_seconds}
+
+        with stage_timer(stage_seconds, "load_documents"):
+            documents : List[str] = document_loader(self.__path_folder, self.__page_cache_dir)
+        with stage_timer(stage_seconds, "load_model"):
+            model_embedding : Embeddings = get_model_embedding()
+        with stage_timer(stage_seconds, "chunking"):
+            data_split : List[str] = chunking(documents)
+        with stage_timer(stage_seconds, "deduplicate"):
+            data_unique : List[str] = deduplicate(data_split)
+        with stage_timer(stage_seconds, "index"):
+            create_vectorstore_with_progress(
+                documents=data_unique,
+                embeddings=model_embedding,
+                persist_directory=self.__path_save_vector_DB,
+                batch_size=100,
+                resume=self.__resume
+            )
+
+        with open(os.path.join(self.__path_save_vector_DB, REPORT_FILE_NAME), "r", encoding="utf-8") as file:
+            report_index : Dict = json.load(file)
+
+        self.stats.update({
+            "docs": len({doc.metadata.get("source") for doc in documents}),
+            "pages": count_pdf_pages(documents),
+            "sentences": count_sentences(documents),
+            "chunks": len(data_split),
+            "chunks_unique": len(data_unique),
+            # Chỉ tính vectors ghi trong lần chạy này (indexed_chunks gồm cả chunks đã có khi resume)
+            "vectors_written": report_index["written_chunks"]
+        })
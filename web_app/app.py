@@ -1,4 +1,5 @@
 import os
+import sys
 import logging
 from datetime import datetime
 from flask import Flask, render_template, request, redirect, url_for, flash
@@ -8,6 +9,12 @@ from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import LoginManager, login_user, login_required, logout_user, current_user
 
+# pipeline_metrics and the theory pipeline (src/) live at the repository root; this must run
+# before importing any web_app module that needs them (message_writer, chat_dispatcher)
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 
@@ -21,8 +28,9 @@ app.secret_key = os.environ.get("SESSION_SECRET")
 app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)  # needed for url_for to generate with https
 
 # Configure the SQLite database
-
+app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///physics_bot.db")
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+db.init_app(app)
 
 
 # Configure login manager
@@ -31,11 +39,42 @@ login_manager.init_app(app)
 login_manager.login_view = 'login'
 
 # Import models after db initialization to avoid circular imports
-# with app.app_context():
-#     from models import User, ChatMessage
-#     db.create_all()
+with app.app_context():
+    from models import User, ChatMessage
+    db.create_all()
+    # create_all does not add new indexes to existing tables
+    for index in ChatMessage.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+
+from chat_history import HISTORY_PAGE_DAYS, MESSAGES_PAGE_SIZE, get_history_page, get_messages_page
+from message_writer import create_message_writer
+
+# Chat messages are written behind the response in batched commits
+message_writer = create_message_writer(app, db, ChatMessage)
+
+from chat_dispatcher import ChatSaturated, ChatTimeout, chat_executor, get_chat_response, warm_up
+from pipeline_metrics import CONTENT_TYPE, REGISTRY
+
+warm_up()
+
+# Queue gauges and writer counters are read when /metrics is scraped, not on the request path
+def register_metrics():
+    gauges = {
+        'physics_chat_in_flight': ('Chat requests running or waiting on the chat executor', lambda: chat_executor.in_flight),
+        'physics_chat_capacity': ('Maximum chat requests running or waiting', lambda: chat_executor.capacity),
+        'physics_message_writer_pending': ('Chat messages waiting to be written to the database', lambda: message_writer.pending),
+    }
+    for name, (documentation, function) in gauges.items():
+        REGISTRY.gauge(name, documentation).labels().set_function(function)
+
+    for stat in ('rows_written', 'commits', 'failed_commits', 'synchronous_writes',
+                 'deferred_rows', 'replayed_rows', 'unflushed_rows'):
+        counter = REGISTRY.counter(f'physics_message_writer_{stat}_total', f'Message writer {stat.replace("_", " ")}')
+        counter.labels().set_function(lambda stat=stat: getattr(message_writer, stat))
 
-from physics_bot import get_physics_response
+    REGISTRY.register(message_writer.batch_sizes)
+
+register_metrics()
 
 # Register blueprints
 
@@ -122,100 +161,71 @@ def chat():
 @app.route('/api/chat', methods=['POST'])
 # @login_required
 def process_message():
-    data = request.json
-    message = data.get('message', '').strip()
+    data = request.get_json(silent=True) or {}
+    message = str(data.get('message') or '').strip()
     
     if not message:
         return {'error': 'Empty message'}, 400
+    received_at = datetime.utcnow()
     
-    # # Save user message to database
-    # user_message = ChatMessage(
-    #     user_id=current_user.id,
-    #     message=message,
-    #     is_from_user=True
-    # )
-    # # db.session.add(user_message)
-    
-    # # Get response from physics bot
-    # bot_response = get_physics_response(message)
+    # Answer on the bounded chat executor: shed load instead of queueing without limit
+    try:
+        bot_response = chat_executor.run(get_chat_response, message)
+    except ChatSaturated as error:
+        return {'error': 'Server is busy, please try again later.'}, 429, {'Retry-After': str(error.retry_after)}
+    except ChatTimeout as error:
+        return {'error': 'The answer took too long, please try again later.'}, 503, {'Retry-After': str(error.retry_after)}
+    except Exception:
+        logging.exception("Chat pipeline failed")
+        return {'error': 'Could not generate an answer.'}, 500
     
-    # # Save bot response to database
-    # bot_message = ChatMessage(
-    #     user_id=current_user.id,
-    #     message=bot_response,
-    #     is_from_user=False
-    # )
-    # # db.session.add(bot_message)
-    # # db.session.commit()
+    # Save both messages without waiting for the database
+    if current_user.is_authenticated:
+        message_writer.enqueue(current_user.id, message, True, timestamp=received_at)
+        message_writer.enqueue(current_user.id, bot_response, False)
     
     return {
         'response': bot_response,
-        'timestamp': user_message.timestamp.isoformat()
+        'timestamp': received_at.isoformat()
     }
 
 @app.route('/api/chat/history', methods=['GET'])
 @login_required
 def get_chat_history():
-    # Get unique conversations based on timestamps
-    # Group by timestamp date, get first user message for each conversation
-
-    # user_messages = db.session.query(
-    #     db.func.DATE(ChatMessage.timestamp).label('date'),
-    #     db.func.MIN(ChatMessage.id).label('first_id')
-    # ).filter(
-    #     ChatMessage.user_id == current_user.id,
-    #     ChatMessage.is_from_user == True
-    # ).group_by(
-    #     db.func.DATE(ChatMessage.timestamp)
-    # ).order_by(
-    #     db.func.DATE(ChatMessage.timestamp).desc()
-    # ).all()
-    
-    # # Fetch the actual messages
-    # history = []
-    # for date, first_id in user_messages:
-    #     first_message = ChatMessage.query.get(first_id)
-    #     if first_message:
-    #         history.append({
-    #             'date': date.strftime('%Y-%m-%d'),
-    #             'preview': first_message.message[:50] + ('...' if len(first_message.message) > 50 else ''),
-    #             'timestamp': first_message.timestamp.isoformat()
-    #         })
+    # One entry per conversation day (first user message), newest first, paginated by day
+    try:
+        history, next_before = get_history_page(
+            current_user.id,
+            before=request.args.get('before'),
+            limit=request.args.get('limit', HISTORY_PAGE_DAYS)
+        )
+    except ValueError:
+        return {'error': 'Invalid before date. Use YYYY-MM-DD.'}, 400
     
-    return {'history': history}
+    return {'history': history, 'next_before': next_before}
 
 @app.route('/api/chat/messages/<date>', methods=['GET'])
 @login_required
 def get_chat_messages_by_date(date):
     try:
-        # Validate date format (YYYY-MM-DD)
-        datetime.strptime(date, '%Y-%m-%d')
-        
-        # Get all messages for the specified date
-        start_date = f"{date} 00:00:00"
-        end_date = f"{date} 23:59:59"
+        # Messages of the day in order, one page per request (keyset pagination)
+        formatted_messages, next_cursor = get_messages_page(
+            current_user.id,
+            date,
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', MESSAGES_PAGE_SIZE)
+        )
         
-        messages = ChatMessage.query.filter(
-            ChatMessage.user_id == current_user.id,
-            ChatMessage.timestamp >= start_date,
-            ChatMessage.timestamp <= end_date
-        ).order_by(ChatMessage.timestamp).all()
-        
-        # Format messages for response
-        formatted_messages = []
-        for msg in messages:
-            formatted_messages.append({
-                'id': msg.id,
-                'message': msg.message,
-                'is_from_user': msg.is_from_user,
-                'timestamp': msg.timestamp.isoformat()
-            })
-        
-        return {'messages': formatted_messages}
+        return {'messages': formatted_messages, 'next_cursor': next_cursor}
     
     except ValueError:
-        # Invalid date format
+        # Invalid date format or cursor
         return {'error': 'Invalid date format. Use YYYY-MM-DD.'}, 400
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    # Prometheus text format: stage latencies, cache hits, errors, degradations and queue depths
+    return REGISTRY.render(), 200, {'Content-Type': CONTENT_TYPE}
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,177 @@
+"""
+Chat Dispatcher - runs chat requests on a bounded thread pool
+
+Model calls are slow, so /api/chat must not run them on the Flask worker
+thread without limits. Requests run on a fixed number of threads with a
+fixed-size waiting queue. When every slot is taken the request is rejected
+immediately (429), and a request that waits longer than its timeout gets a
+503. Both responses carry a Retry-After estimated from recent service times,
+so overload sheds load quickly instead of piling up threads.
+"""
+
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+# The theory pipeline lives in src/ at the repository root
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from pipeline_metrics import DEGRADATIONS, stage_timer
+
+CHAT_WORKERS = int(os.environ.get("CHAT_WORKERS", 4))
+CHAT_QUEUE_SIZE = int(os.environ.get("CHAT_QUEUE_SIZE", 16))
+CHAT_TIMEOUT = float(os.environ.get("CHAT_TIMEOUT", 60))
+CHAT_PIPELINE = os.environ.get("CHAT_PIPELINE", "theory")
+
+MAX_RETRY_AFTER = 120
+
+logger = logging.getLogger(__name__)
+
+
+class ChatSaturated(Exception):
+    """Raised when every worker and queue slot is taken"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Chat queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class ChatTimeout(Exception):
+    """Raised when a request does not finish within its timeout"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Chat request timed out, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    """
+    Thread pool that accepts at most max_workers running + max_queue waiting tasks.
+    """
+
+    def __init__(self, max_workers=CHAT_WORKERS, max_queue=CHAT_QUEUE_SIZE, timeout=CHAT_TIMEOUT):
+        self.max_workers = max_workers
+        self.capacity = max_workers + max_queue
+        self.timeout = timeout
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chat")
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        # Exponential moving average of the service time (seconds)
+        self._service_time = None
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def retry_after(self):
+        """Seconds until a slot is likely to be free"""
+        service_time = self._service_time or self.timeout
+        waves = max(1, self._in_flight) / self.max_workers
+        return int(min(MAX_RETRY_AFTER, max(1, math.ceil(service_time * waves))))
+
+    def _release(self, future):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _timed(self, function, *args):
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                if self._service_time is None:
+                    self._service_time = elapsed
+                else:
+                    self._service_time = 0.8 * self._service_time + 0.2 * elapsed
+
+    def submit(self, function, *args, timed=True):
+        """
+        Queue a task without waiting, raises ChatSaturated when full.
+
+        timed=False keeps the task out of the service time estimate (e.g. model loading).
+        """
+        if not self._slots.acquire(blocking=False):
+            DEGRADATIONS.inc("chat_saturated")
+            raise ChatSaturated(self.retry_after())
+        with self._lock:
+            self._in_flight += 1
+        if timed:
+            future = self._executor.submit(self._timed, function, *args)
+        else:
+            future = self._executor.submit(function, *args)
+        future.add_done_callback(self._release)
+        return future
+
+    def run(self, function, *args):
+        """
+        Run a task and wait for its result.
+
+        Raises:
+            ChatSaturated: No free slot
+            ChatTimeout: The task did not finish within the timeout
+        """
+        future = self.submit(function, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            # Still queued: drop it. Already running: it keeps its slot until it finishes
+            future.cancel()
+            DEGRADATIONS.inc("chat_timeout")
+            raise ChatTimeout(self.retry_after())
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def load_pipeline():
+    """
+    Load the answer function once (the theory pipeline loads its models on import).
+
+    Falls back to the keyword physics bot when the theory pipeline cannot be loaded.
+    """
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            if CHAT_PIPELINE == "theory":
+                try:
+                    from src.router_theory import Respone
+                    # Routed: multiple-choice questions go to the multiple-choice model, the rest to RAG
+                    _pipeline = lambda message: Respone(message).get_routed_respone
+                except Exception as error:
+                    # Missing index (RuntimeError), failed model download (OSError), ...: fall back
+                    # once instead of re-importing the models on every request
+                    logger.warning("Theory pipeline unavailable (%r), using physics_bot", error, exc_info=True)
+                    DEGRADATIONS.inc("pipeline_fallback")
+            if _pipeline is None:
+                from physics_bot import get_physics_response
+                _pipeline = get_physics_response
+    return _pipeline
+
+
+def get_chat_response(message):
+    """Answer one chat message (runs on an executor thread)"""
+    pipeline = load_pipeline()
+    with stage_timer("chat_pipeline"):
+        return pipeline(message)
+
+
+chat_executor = BoundedExecutor()
+
+
+def warm_up():
+    """Start loading the pipeline in the background so the first request does not pay for it"""
+    try:
+        chat_executor.submit(load_pipeline, timed=False)
+    except ChatSaturated:
+        pass
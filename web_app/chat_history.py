@@ -0,0 +1,151 @@
+"""
+Chat History - paginated queries over ChatMessage
+
+Both queries walk the (user_id, timestamp) index, so their cost depends on
+the page size and not on how many messages a user has.
+
+- get_history_page: one entry per day (the first user message of that day),
+  newest day first. A single recursive query jumps from day to day with index
+  seeks instead of grouping every row by DATE(timestamp).
+- get_messages_page: the messages of one day with keyset (cursor)
+  pagination on (timestamp, id).
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import text, tuple_
+
+from app import db
+from models import ChatMessage
+
+HISTORY_PAGE_DAYS = 30
+MAX_HISTORY_PAGE_DAYS = 100
+MESSAGES_PAGE_SIZE = 50
+MAX_MESSAGES_PAGE_SIZE = 200
+PREVIEW_LENGTH = 50
+
+# days: the last user message of each day, walking backwards one index seek per day.
+# For every day the first user message is then found with one more index seek.
+HISTORY_SQL = text("""
+WITH RECURSIVE days(day_end, depth) AS (
+    SELECT (
+        SELECT MAX(timestamp) FROM chat_message
+        WHERE user_id = :user_id AND is_from_user AND timestamp < :before
+    ), 1
+    UNION ALL
+    SELECT (
+        SELECT MAX(timestamp) FROM chat_message
+        WHERE user_id = :user_id AND is_from_user AND timestamp < DATE(days.day_end)
+    ), depth + 1
+    FROM days
+    WHERE days.day_end IS NOT NULL AND depth < :limit
+)
+SELECT m.message, m.timestamp
+FROM days
+JOIN chat_message m ON m.id = (
+    SELECT id FROM chat_message
+    WHERE user_id = :user_id AND is_from_user AND timestamp >= DATE(days.day_end)
+    ORDER BY timestamp, id
+    LIMIT 1
+)
+WHERE days.day_end IS NOT NULL
+ORDER BY m.timestamp DESC
+""")
+
+
+def _clamp(value, default, maximum):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(value, maximum))
+
+
+def _as_datetime(value):
+    # SQLite returns timestamps from raw SQL as strings
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def get_history_page(user_id, before=None, limit=None):
+    """
+    One entry per conversation day, newest first.
+
+    Args:
+        user_id: Owner of the messages
+        before: Only days before this date (YYYY-MM-DD), the next_before of the previous page
+        limit: Number of days per page
+
+    Returns:
+        (history, next_before): next_before is None on the last page
+
+    Raises:
+        ValueError: Invalid before date
+    """
+    limit = _clamp(limit, HISTORY_PAGE_DAYS, MAX_HISTORY_PAGE_DAYS)
+    before = datetime.strptime(before, '%Y-%m-%d') if before else datetime.max.replace(microsecond=0)
+
+    rows = db.session.execute(HISTORY_SQL, {'user_id': user_id, 'before': before, 'limit': limit}).all()
+
+    history = []
+    for message, timestamp in rows:
+        timestamp = _as_datetime(timestamp)
+        history.append({
+            'date': timestamp.strftime('%Y-%m-%d'),
+            'preview': message[:PREVIEW_LENGTH] + ('...' if len(message) > PREVIEW_LENGTH else ''),
+            'timestamp': timestamp.isoformat()
+        })
+
+    next_before = history[-1]['date'] if len(history) == limit else None
+    return history, next_before
+
+
+def encode_cursor(message):
+    return f"{message.timestamp.isoformat()}|{message.id}"
+
+
+def decode_cursor(cursor):
+    """Raises ValueError for a malformed cursor"""
+    timestamp, message_id = cursor.rsplit('|', 1)
+    return datetime.fromisoformat(timestamp), int(message_id)
+
+
+def get_messages_page(user_id, date, cursor=None, limit=None):
+    """
+    Messages of one day in order, one page at a time.
+
+    Args:
+        user_id: Owner of the messages
+        date: Day (YYYY-MM-DD)
+        cursor: next_cursor of the previous page
+        limit: Number of messages per page
+
+    Returns:
+        (messages, next_cursor): next_cursor is None on the last page
+
+    Raises:
+        ValueError: Invalid date or cursor
+    """
+    limit = _clamp(limit, MESSAGES_PAGE_SIZE, MAX_MESSAGES_PAGE_SIZE)
+    start = datetime.strptime(date, '%Y-%m-%d')
+
+    query = ChatMessage.query.filter(
+        ChatMessage.user_id == user_id,
+        ChatMessage.timestamp >= start,
+        ChatMessage.timestamp < start + timedelta(days=1)
+    )
+    if cursor:
+        query = query.filter(tuple_(ChatMessage.timestamp, ChatMessage.id) > decode_cursor(cursor))
+
+    # One extra row tells whether there is a next page
+    rows = query.order_by(ChatMessage.timestamp, ChatMessage.id).limit(limit + 1).all()
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+
+    messages = [{
+        'id': msg.id,
+        'message': msg.message,
+        'is_from_user': msg.is_from_user,
+        'timestamp': msg.timestamp.isoformat()
+    } for msg in rows[:limit]]
+    return messages, next_cursor
@@ -7,12 +7,12 @@ import requests
 from app import db
 from flask import Blueprint, redirect, request, url_for, flash
 from flask_login import login_required, login_user, logout_user
+from google_provider import google_provider
 from models import User
 from oauthlib.oauth2 import WebApplicationClient
 
 GOOGLE_CLIENT_ID = os.environ.get("GOOGLE_OAUTH_CLIENT_ID")
 GOOGLE_CLIENT_SECRET = os.environ.get("GOOGLE_OAUTH_CLIENT_SECRET")
-GOOGLE_DISCOVERY_URL = "https://accounts.google.com/.well-known/openid-configuration"
 
 # Make sure to use this redirect URL. It has to match the one in the whitelist
 DEV_REDIRECT_URL = f'https://{os.environ.get("REPLIT_DEV_DOMAIN", "")}/google_login/callback'
@@ -41,8 +41,11 @@ def login():
         flash("Google OAuth is not configured. Please check your environment variables.", "danger")
         return redirect(url_for("login"))
         
-    google_provider_cfg = requests.get(GOOGLE_DISCOVERY_URL).json()
-    authorization_endpoint = google_provider_cfg["authorization_endpoint"]
+    try:
+        authorization_endpoint = google_provider.endpoint("authorization_endpoint")
+    except (requests.RequestException, ValueError, KeyError) as e:
+        flash(f"Google sign-in is unavailable: {str(e)}", "danger")
+        return redirect(url_for("login"))
 
     request_uri = client.prepare_request_uri(
         authorization_endpoint,
@@ -67,8 +70,12 @@ def callback():
     
     # Find out what URL to hit to get tokens that allow you to ask for
     # things on behalf of a user
-    google_provider_cfg = requests.get(GOOGLE_DISCOVERY_URL).json()
-    token_endpoint = google_provider_cfg["token_endpoint"]
+    try:
+        token_endpoint = google_provider.endpoint("token_endpoint")
+        userinfo_endpoint = google_provider.endpoint("userinfo_endpoint")
+    except (requests.RequestException, ValueError, KeyError) as e:
+        flash(f"Google sign-in is unavailable: {str(e)}", "danger")
+        return redirect(url_for("login"))
 
     # Prepare and send a request to get tokens
     token_url, headers, body = client.prepare_token_request(
@@ -81,7 +88,7 @@ def callback():
     )
     
     try:
-        token_response = requests.post(
+        token_response = google_provider.post(
             token_url,
             headers=headers,
             data=body,
@@ -95,11 +102,10 @@ def callback():
         return redirect(url_for("login"))
 
     # Get user info from Google
-    userinfo_endpoint = google_provider_cfg["userinfo_endpoint"]
     uri, headers, body = client.add_token(userinfo_endpoint)
     
     try:
-        userinfo_response = requests.get(uri, headers=headers, data=body)
+        userinfo_response = google_provider.get(uri, headers=headers, data=body)
         userinfo = userinfo_response.json()
     except Exception as e:
         flash(f"Failed to get user info: {str(e)}", "danger")
@@ -0,0 +1,156 @@
+"""
+Google Provider - HTTP access to the Google OpenID provider
+
+Every OAuth call (discovery, token exchange, userinfo) goes through one
+pooled requests.Session, so connections are reused across sign-ins, and
+every call has a (connect, read) timeout instead of waiting forever.
+
+The discovery document is fetched once and cached for as long as its
+Cache-Control header allows (max-age minus Age, nothing for no-store or
+no-cache, OAUTH_DISCOVERY_TTL when the header says nothing). Concurrent
+sign-ins share a single refresh, and a stale document is served (and retried
+every STALE_RETRY_SECONDS) if a refresh fails.
+
+GOOGLE_DISCOVERY_URL can point at a local stub provider for testing.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+GOOGLE_DISCOVERY_URL = os.environ.get(
+    "GOOGLE_DISCOVERY_URL", "https://accounts.google.com/.well-known/openid-configuration"
+)
+OAUTH_CONNECT_TIMEOUT = float(os.environ.get("OAUTH_CONNECT_TIMEOUT", 3))
+OAUTH_READ_TIMEOUT = float(os.environ.get("OAUTH_READ_TIMEOUT", 10))
+OAUTH_POOL_SIZE = int(os.environ.get("OAUTH_POOL_SIZE", 10))
+# Used when the discovery response has no Cache-Control max-age
+OAUTH_DISCOVERY_TTL = float(os.environ.get("OAUTH_DISCOVERY_TTL", 3600))
+# After a failed refresh the stale document is kept this long before trying again
+STALE_RETRY_SECONDS = 30
+
+MAX_AGE_REGEX = re.compile(r'(?:^|,)\s*max-age\s*=\s*"?(\d+)"?', re.IGNORECASE)
+NO_CACHE_REGEX = re.compile(r'(?:^|,)\s*(no-store|no-cache)\b', re.IGNORECASE)
+
+logger = logging.getLogger(__name__)
+
+
+def create_session(pool_size=OAUTH_POOL_SIZE):
+    """Session with a connection pool per host and retries for idempotent requests"""
+    session = requests.Session()
+    # POST (token exchange) is not retried: an authorization code can only be used once
+    retry = Retry(total=2, connect=2, read=1, backoff_factor=0.2,
+                  status_forcelist=(502, 503, 504), allowed_methods=frozenset(["GET"]))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def cache_ttl(headers, default_ttl=OAUTH_DISCOVERY_TTL):
+    """Seconds a response may be cached according to its Cache-Control and Age headers"""
+    cache_control = headers.get("Cache-Control", "")
+    if NO_CACHE_REGEX.search(cache_control):
+        return 0.0
+    match = MAX_AGE_REGEX.search(cache_control)
+    if not match:
+        return default_ttl
+    try:
+        age = float(headers.get("Age", 0))
+    except ValueError:
+        age = 0.0
+    return max(0.0, int(match.group(1)) - age)
+
+
+class DiscoveryCache:
+    """
+    OpenID discovery document cached according to HTTP caching headers.
+    """
+
+    def __init__(self, url, session, timeout, default_ttl=OAUTH_DISCOVERY_TTL):
+        """
+        Args:
+            url: Discovery document URL
+            session: requests.Session used for the fetch
+            timeout: (connect, read) timeout in seconds
+            default_ttl: Cache lifetime when the response has no max-age
+        """
+        self.url = url
+        self.session = session
+        self.timeout = timeout
+        self.default_ttl = default_ttl
+
+        self._lock = threading.Lock()
+        self._document = None
+        self._expires_at = 0.0
+        self.fetches = 0
+
+    def _fetch(self):
+        response = self.session.get(self.url, timeout=self.timeout)
+        response.raise_for_status()
+        document = response.json()
+        self.fetches += 1
+        self._document = document
+        self._expires_at = time.monotonic() + cache_ttl(response.headers, self.default_ttl)
+        return document
+
+    def get(self):
+        """
+        Return the discovery document, fetching it when the cached copy has expired.
+
+        Raises:
+            requests.RequestException / ValueError: Fetch failed and nothing was cached
+        """
+        document = self._document
+        if document is not None and time.monotonic() < self._expires_at:
+            return document
+
+        with self._lock:
+            # Another request may have refreshed it while we waited for the lock
+            if self._document is not None and time.monotonic() < self._expires_at:
+                return self._document
+            try:
+                return self._fetch()
+            except (requests.RequestException, ValueError):
+                if self._document is None:
+                    raise
+                logger.warning("Refreshing %s failed, using the cached document", self.url, exc_info=True)
+                self._expires_at = time.monotonic() + STALE_RETRY_SECONDS
+                return self._document
+
+    def invalidate(self):
+        with self._lock:
+            self._expires_at = 0.0
+
+
+class GoogleProvider:
+    """
+    Google OpenID endpoints behind a shared session, cached discovery and timeouts.
+    """
+
+    def __init__(self, discovery_url=GOOGLE_DISCOVERY_URL, session=None,
+                 timeout=(OAUTH_CONNECT_TIMEOUT, OAUTH_READ_TIMEOUT), default_ttl=OAUTH_DISCOVERY_TTL):
+        self.session = session or create_session()
+        self.timeout = timeout
+        self.discovery = DiscoveryCache(discovery_url, self.session, timeout, default_ttl)
+
+    def endpoint(self, name):
+        """URL of a discovery entry, e.g. 'authorization_endpoint'"""
+        return self.discovery.get()[name]
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def post(self, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.post(url, **kwargs)
+
+
+google_provider = GoogleProvider()
@@ -0,0 +1,402 @@
+"""
+Message Writer - write-behind persistence for ChatMessage
+
+/api/chat only puts messages into a bounded in-memory buffer. A background
+thread inserts them in batches (one bulk INSERT + one commit per batch),
+either when max_batch messages are waiting or every flush_interval seconds.
+
+Guarantees:
+- At-least-once: before enqueue returns, the message is appended to a local
+  spool file (JSONL, fsynced). It is acknowledged in the spool only after
+  its batch has been committed; a failed commit is rolled back and retried
+  with backoff.
+- Crash recovery: every process spools to its own segment and holds an
+  exclusive flock on it. A segment that no live process holds a lock on was
+  left by a process that crashed, was killed or gave up at shutdown; the
+  first writer to start claims it and replays it. Replay skips rows that are
+  already in the database (same user_id and timestamp), so a message that
+  was committed but not yet acknowledged is not inserted twice.
+- Bounded memory: when the buffer is full, enqueue waits briefly and then
+  writes the message synchronously. If the database is down too, it waits at
+  most DEFER_TIMEOUT for buffer space and then leaves the message in the
+  spool only (deferred_rows), to be replayed on the next start.
+- Flush on shutdown: close() (registered with atexit) drains the buffer.
+  Rows that cannot be committed in time stay in the spool (unflushed_rows).
+
+Messages become visible in the history after at most flush_interval seconds.
+"""
+
+import atexit
+import collections
+import fcntl
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import insert, tuple_
+
+from pipeline_metrics import Histogram
+
+MESSAGE_BUFFER_SIZE = int(os.environ.get("MESSAGE_BUFFER_SIZE", 10000))
+MESSAGE_FLUSH_INTERVAL = float(os.environ.get("MESSAGE_FLUSH_INTERVAL", 0.5))
+MESSAGE_MAX_BATCH = int(os.environ.get("MESSAGE_MAX_BATCH", 500))
+MESSAGE_SPOOL_DIR = os.environ.get(
+    "MESSAGE_SPOOL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "message_spool")
+)
+# A segment is rotated after this many rows that are not all acknowledged yet
+MESSAGE_SPOOL_SEGMENT_ROWS = int(os.environ.get("MESSAGE_SPOOL_SEGMENT_ROWS", 10000))
+
+# Time enqueue waits for room in a full buffer before writing synchronously
+ENQUEUE_TIMEOUT = 0.05
+# Time enqueue waits for room when the synchronous write failed as well
+DEFER_TIMEOUT = 1.0
+MAX_RETRY_DELAY = 5.0
+SHUTDOWN_ATTEMPTS = 3
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+logger = logging.getLogger(__name__)
+
+
+def _encode_row(row):
+    return json.dumps(dict(row, timestamp=row['timestamp'].isoformat()), ensure_ascii=False) + "\n"
+
+
+def _read_rows(file):
+    """Rows of a spool segment, stopping at a line the crashed process did not finish"""
+    rows = []
+    file.seek(0)
+    for line in file:
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError:
+            break
+        row['timestamp'] = datetime.fromisoformat(row['timestamp'])
+        rows.append(row)
+    return rows
+
+
+class SpoolSegment:
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.file = open(path, 'a+', encoding='utf-8')
+        fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        self.rows = 0
+        self.outstanding = 0
+
+
+class MessageSpool:
+    """
+    Local JSONL segments holding every message that is not committed yet.
+    """
+
+    def __init__(self, directory=MESSAGE_SPOOL_DIR, segment_rows=MESSAGE_SPOOL_SEGMENT_ROWS):
+        self.directory = directory
+        self.segment_rows = segment_rows
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._segments = {}
+        self._active = None
+
+    def _rotate(self):
+        previous = self._active
+        path = os.path.join(self.directory, f"{os.getpid()}-{uuid.uuid4().hex}.jsonl")
+        self._active = SpoolSegment(path)
+        self._segments[self._active.name] = self._active
+        if previous is not None and previous.outstanding == 0:
+            self._remove(previous)
+        return self._active
+
+    def _remove(self, segment):
+        # Removed while still locked, so no other process can claim it in between
+        os.remove(segment.path)
+        segment.file.close()
+        self._segments.pop(segment.name, None)
+
+    def append(self, row):
+        """Durably record one row, returns the segment name to acknowledge after commit"""
+        line = _encode_row(row)
+        with self._lock:
+            segment = self._active
+            if segment is None or segment.rows >= self.segment_rows:
+                segment = self._rotate()
+            segment.file.write(line)
+            segment.file.flush()
+            os.fsync(segment.file.fileno())
+            segment.rows += 1
+            segment.outstanding += 1
+            return segment.name
+
+    def ack(self, names):
+        """Mark committed rows; a segment without outstanding rows is emptied (active) or removed"""
+        with self._lock:
+            for name, count in collections.Counter(names).items():
+                segment = self._segments[name]
+                segment.outstanding -= count
+                if segment.outstanding > 0:
+                    continue
+                if segment is self._active:
+                    segment.file.truncate(0)
+                    segment.file.flush()
+                    os.fsync(segment.file.fileno())
+                    segment.rows = 0
+                else:
+                    self._remove(segment)
+
+    def claim_orphans(self):
+        """Segments nobody holds a lock on, returned locked as (path, file)"""
+        claimed = []
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith('.jsonl') or name in self._segments:
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                file = open(path, 'r', encoding='utf-8')
+            except FileNotFoundError:
+                continue
+            try:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                file.close()
+                continue
+            # Another process may have replayed and removed it before we got the lock
+            if not os.path.exists(path):
+                file.close()
+                continue
+            claimed.append((path, file))
+        return claimed
+
+    def close(self):
+        """Remove fully acknowledged segments, keep the rest on disk for replay"""
+        with self._lock:
+            for segment in list(self._segments.values()):
+                if segment.outstanding == 0:
+                    self._remove(segment)
+                else:
+                    segment.file.close()
+            self._segments.clear()
+            self._active = None
+
+
+class MessageWriter:
+    """
+    Batches ChatMessage inserts on a background thread.
+    """
+
+    def __init__(self, app, db, model, max_buffer=MESSAGE_BUFFER_SIZE,
+                 flush_interval=MESSAGE_FLUSH_INTERVAL, max_batch=MESSAGE_MAX_BATCH,
+                 spool_dir=MESSAGE_SPOOL_DIR):
+        """
+        Args:
+            app: Flask app (the writer thread needs an app context)
+            db: Flask-SQLAlchemy instance
+            model: Mapped class to insert into (ChatMessage)
+            max_buffer: Maximum number of messages waiting to be written
+            flush_interval: Maximum seconds a message waits before its batch is committed
+            max_batch: Maximum number of messages per commit
+            spool_dir: Directory of the spool segments (shared by all workers of the app)
+        """
+        self.app = app
+        self.db = db
+        self.model = model
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.spool_dir = spool_dir
+
+        self._buffer = queue.Queue(maxsize=max_buffer)
+        self._stop = threading.Event()
+        self._thread = None
+        self._spool = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        # Registered on /metrics by the app
+        self.batch_sizes = Histogram(
+            'physics_message_writer_batch_size', 'Chat messages per message writer commit',
+            buckets=BATCH_SIZE_BUCKETS
+        )
+        self.commits = 0
+        self.rows_written = 0
+        self.failed_commits = 0
+        self.synchronous_writes = 0
+        self.deferred_rows = 0
+        self.replayed_rows = 0
+        self.unflushed_rows = 0
+        self._in_flight = 0
+
+    def _ensure_started(self):
+        # Started lazily (and again after fork) so each gunicorn worker has its own thread and spool segment
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._spool = MessageSpool(self.spool_dir)
+                self._thread = threading.Thread(target=self._run, name="message-writer", daemon=True)
+                self._thread.start()
+
+    def enqueue(self, user_id, message, is_from_user, timestamp=None):
+        """Spool one message and queue it for insertion (timestamp defaults to now)"""
+        row = {
+            'user_id': user_id,
+            'message': message,
+            'is_from_user': is_from_user,
+            'timestamp': timestamp or datetime.utcnow()
+        }
+        self._ensure_started()
+        item = (self._spool.append(row), row)
+        try:
+            self._buffer.put(item, timeout=ENQUEUE_TIMEOUT)
+            return
+        except queue.Full:
+            pass
+
+        # Buffer full: write it on the request thread instead
+        try:
+            self._commit([row])
+        except Exception:
+            logger.exception("Synchronous chat message write failed")
+        else:
+            self._spool.ack([item[0]])
+            with self._stats_lock:
+                self.synchronous_writes += 1
+            return
+
+        # Database unavailable too: wait a bounded time, never hold the request thread indefinitely
+        try:
+            self._buffer.put(item, timeout=DEFER_TIMEOUT)
+        except queue.Full:
+            logger.error("Chat message buffer full and database unavailable, message kept in the spool until restart")
+            with self._stats_lock:
+                self.deferred_rows += 1
+
+    @property
+    def pending(self):
+        return self._buffer.qsize()
+
+    def _next_batch(self):
+        """Wait for the first message, then collect more until max_batch or flush_interval"""
+        try:
+            batch = [self._buffer.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch:
+            # After the deadline (or when shutting down) only take what is already buffered
+            timeout = 0 if self._stop.is_set() else deadline - time.monotonic()
+            try:
+                batch.append(self._buffer.get(timeout=timeout) if timeout > 0 else self._buffer.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _commit(self, rows, skip_existing=False):
+        """
+        One bulk INSERT and commit, raises on failure after rolling back.
+
+        skip_existing: leave out rows already in the table (spool replay)
+        """
+        with self.app.app_context():
+            try:
+                if skip_existing:
+                    keys = [(row['user_id'], row['timestamp']) for row in rows]
+                    existing = set(self.db.session.query(self.model.user_id, self.model.timestamp).filter(
+                        tuple_(self.model.user_id, self.model.timestamp).in_(keys)
+                    ).all())
+                    rows = [row for row in rows if (row['user_id'], row['timestamp']) not in existing]
+                if rows:
+                    self.db.session.execute(insert(self.model), rows)
+                    self.db.session.commit()
+            except Exception:
+                self.db.session.rollback()
+                raise
+            finally:
+                self.db.session.remove()
+
+        if not rows:
+            return
+        self.batch_sizes.labels().observe(len(rows))
+        with self._stats_lock:
+            self.commits += 1
+            self.rows_written += len(rows)
+
+    def _write(self, rows, skip_existing=False):
+        """Retry until the rows are committed, backing off; False if given up at shutdown"""
+        delay = 0.1
+        attempts = 0
+        while True:
+            try:
+                self._commit(rows, skip_existing)
+                return True
+            except Exception:
+                attempts += 1
+                with self._stats_lock:
+                    self.failed_commits += 1
+                if self._stop.is_set() and attempts >= SHUTDOWN_ATTEMPTS:
+                    # Shutting down and the database keeps failing: the rows stay in the spool
+                    logger.error("Leaving %d chat messages in the spool at shutdown", len(rows))
+                    return False
+                logger.exception("Failed to commit %d chat messages, retrying in %.1fs", len(rows), delay)
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+
+    def _replay(self):
+        """Commit the segments of processes that stopped before acknowledging them"""
+        for path, file in self._spool.claim_orphans():
+            rows = _read_rows(file)
+            logger.info("Replaying %d chat messages from %s", len(rows), path)
+            written = all(
+                self._write(rows[start:start + self.max_batch], skip_existing=True)
+                for start in range(0, len(rows), self.max_batch)
+            )
+            if written:
+                os.remove(path)
+                with self._stats_lock:
+                    self.replayed_rows += len(rows)
+            file.close()
+            if not written:
+                return
+
+    def _run(self):
+        self._replay()
+        while not self._stop.is_set() or not self._buffer.empty():
+            batch = self._next_batch()
+            if not batch:
+                continue
+            self._in_flight = len(batch)
+            if self._write([row for _, row in batch]):
+                self._spool.ack([name for name, _ in batch])
+            else:
+                with self._stats_lock:
+                    self.unflushed_rows += len(batch)
+            self._in_flight = 0
+
+    def close(self, timeout=10.0):
+        """Flush what is still buffered within timeout seconds and stop the writer thread"""
+        self._stop.set()
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            # The process is exiting: what is not committed yet is replayed from the spool on the next start
+            unflushed = self.pending + self._in_flight
+            logger.error("Message writer did not finish within %.1fs, %d chat messages left in the spool",
+                         timeout, unflushed)
+            with self._stats_lock:
+                self.unflushed_rows += unflushed
+            return
+        self._spool.close()
+
+
+def create_message_writer(app, db, model):
+    """Create the writer and flush it when the process exits"""
+    writer = MessageWriter(app, db, model)
+    atexit.register(writer.close)
+    return writer
@@ -16,3 +16,8 @@ class ChatMessage(db.Model):
     message = db.Column(db.Text, nullable=False)
     is_from_user = db.Column(db.Boolean, default=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # History and message listing always filter by user and range-scan by time
+    __table_args__ = (
+        db.Index('ix_chat_message_user_timestamp', 'user_id', 'timestamp'),
+    )
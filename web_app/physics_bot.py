@@ -1,8 +1,21 @@
 """
 Physics Bot - A simple bot that responds to physics questions
+
+The response table is compiled once into a ResponseTable:
+- an Aho-Corasick automaton over the keys for phrase matches (the first key,
+  in table order, that occurs in the question), and
+- an inverted index from word to keys for partial matches (the key sharing
+  the most words with the question).
+
+Answering costs time proportional to the question length, not the table
+size. Set PHYSICS_RESPONSES_PATH to load the table from a JSON file
+({"key": "response", ...}) instead of the built-in one.
 """
 
+import json
+import os
 import re
+from collections import Counter
 
 # Dictionary of physics-related questions and answers
 PHYSICS_RESPONSES = {
@@ -58,47 +71,136 @@ PHYSICS_RESPONSES = {
     "standard model": "The Standard Model of particle physics is the theory describing three of the four known fundamental forces in the universe (electromagnetic, weak, and strong), as well as classifying all known elementary particles."
 }
 
-def get_physics_response(question):
+GREETING_REGEX = re.compile(r'\b(hi|hello|hey|greetings|howdy)\b')
+THANKS_REGEX = re.compile(r'\b(thanks|thank you|thank you very much|appreciate it)\b')
+
+GREETING_RESPONSE = "Hello! I'm Physics Bot. Ask me any physics-related question, and I'll do my best to answer."
+THANKS_RESPONSE = "You're welcome! Feel free to ask more physics questions."
+DEFAULT_RESPONSE = "I'm not sure about that specific physics concept. Try asking about Newton's laws, gravity, relativity, quantum mechanics, or other fundamental physics topics."
+
+
+class ResponseTable:
+    """
+    Keyword -> response table compiled for matching in one pass over the question.
+    """
+
+    def __init__(self, responses):
+        """
+        Args:
+            responses: Dict of key -> response, in priority order
+        """
+        self.keys = list(responses)
+        self.responses = [responses[key] for key in self.keys]
+        self._build_automaton()
+        self._build_index()
+
+    def _build_automaton(self):
+        # Aho-Corasick: goto transitions, failure links and, per state, the
+        # smallest key index among all keys ending there (directly or via failure links)
+        self._goto = [{}]
+        self._first_key = [len(self.keys)]
+        for index, key in enumerate(self.keys):
+            state = 0
+            for char in key:
+                if char not in self._goto[state]:
+                    self._goto.append({})
+                    self._first_key.append(len(self.keys))
+                    self._goto[state][char] = len(self._goto) - 1
+                state = self._goto[state][char]
+            self._first_key[state] = min(self._first_key[state], index)
+
+        self._fail = [0] * len(self._goto)
+        # Breadth-first, so failure targets are complete before their children (depth-1 states fail to the root)
+        order = list(self._goto[0].values())
+        for state in order:
+            for char, child in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._first_key[child] = min(self._first_key[child], self._first_key[self._fail[child]])
+                order.append(child)
+
+    def _build_index(self):
+        # word -> [(key index, number of times the word appears in the key)]
+        self._index = {}
+        for index, key in enumerate(self.keys):
+            for word, count in Counter(key.split()).items():
+                self._index.setdefault(word, []).append((index, count))
+
+    def phrase_match(self, text):
+        """Index of the first key (table order) occurring in text, or None"""
+        best = len(self.keys)
+        state = 0
+        for char in text:
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            if self._first_key[state] < best:
+                best = self._first_key[state]
+                if best == 0:
+                    break
+        return best if best < len(self.keys) else None
+
+    def word_match(self, text):
+        """Index of the key sharing the most words with text (first key on ties), or None"""
+        scores = {}
+        for word in set(text.split()):
+            for index, count in self._index.get(word, ()):
+                scores[index] = scores.get(index, 0) + count
+        if not scores:
+            return None
+        return min(scores, key=lambda index: (-scores[index], index))
+
+
+def load_physics_responses(path):
+    """Load a key -> response table from a JSON file"""
+    with open(path, "r", encoding="utf-8") as file:
+        responses = json.load(file)
+    if not isinstance(responses, dict):
+        raise ValueError(f"{path} must contain a JSON object of key -> response")
+    return responses
+
+
+PHYSICS_RESPONSES_PATH = os.environ.get("PHYSICS_RESPONSES_PATH")
+if PHYSICS_RESPONSES_PATH:
+    PHYSICS_RESPONSES = load_physics_responses(PHYSICS_RESPONSES_PATH)
+
+RESPONSE_TABLE = ResponseTable(PHYSICS_RESPONSES)
+
+def get_physics_response(question, table=None):
     """
     Generate a response to a physics-related question.
     
     Args:
         question (str): The user's physics question
+        table (ResponseTable): Table to answer from (defaults to the compiled PHYSICS_RESPONSES)
         
     Returns:
         str: The physics bot's response
     """
+    table = table or RESPONSE_TABLE
+    
     # Convert question to lowercase for case-insensitive matching
     question_lower = question.lower()
     
     # Check if this is a greeting
-    greeting_pattern = r'\b(hi|hello|hey|greetings|howdy)\b'
-    if re.search(greeting_pattern, question_lower):
-        return "Hello! I'm Physics Bot. Ask me any physics-related question, and I'll do my best to answer."
+    if GREETING_REGEX.search(question_lower):
+        return GREETING_RESPONSE
     
     # Check if this is a thank you
-    thanks_pattern = r'\b(thanks|thank you|thank you very much|appreciate it)\b'
-    if re.search(thanks_pattern, question_lower):
-        return "You're welcome! Feel free to ask more physics questions."
+    if THANKS_REGEX.search(question_lower):
+        return THANKS_RESPONSE
     
-    # Check for best match in our knowledge base
-    best_match = None
-    best_score = 0
+    # Direct match: the first key in the table that appears in the question
+    index = table.phrase_match(question_lower)
     
-    for key in PHYSICS_RESPONSES:
-        if key in question_lower:
-            # Direct match
-            return PHYSICS_RESPONSES[key]
-        
-        # Check for partial matches
-        score = sum(1 for word in key.split() if word in question_lower.split())
-        if score > best_score:
-            best_score = score
-            best_match = key
+    # Otherwise the key sharing the most words with the question
+    if index is None:
+        index = table.word_match(question_lower)
     
-    # If we found a good partial match
-    if best_score > 0:
-        return PHYSICS_RESPONSES[best_match]
+    if index is not None:
+        return table.responses[index]
     
     # Default response
-    return "I'm not sure about that specific physics concept. Try asking about Newton's laws, gravity, relativity, quantum mechanics, or other fundamental physics topics."
+    return DEFAULT_RESPONSE
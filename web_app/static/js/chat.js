@@ -131,6 +131,13 @@ document.addEventListener('DOMContentLoaded', function() {
             body: JSON.stringify({ message: message }),
         })
         .then(response => {
+            if (response.status === 429 || response.status === 503) {
+                // Server is overloaded: tell the user when to retry
+                const retryAfter = response.headers.get('Retry-After');
+                const error = new Error('Server busy');
+                error.retryAfter = retryAfter;
+                throw error;
+            }
             if (!response.ok) {
                 throw new Error('Network response was not ok');
             }
@@ -159,13 +166,23 @@ document.addEventListener('DOMContentLoaded', function() {
             removeLoadingIndicator();
             
             // Show error message
-            addBotMessage("Sorry, I'm having trouble connecting. Please try again later.");
+            if (error.retryAfter) {
+                addBotMessage(`I'm answering a lot of questions right now. Please try again in ${error.retryAfter} seconds.`);
+            } else {
+                addBotMessage("Sorry, I'm having trouble connecting. Please try again later.");
+            }
         });
     }
     
-    // Function to load chat history
-    function loadChatHistory() {
-        fetch('/api/chat/history')
+    // Latest history request, so a reload wins over a slow older page
+    let historyRequest = 0;
+    
+    // Function to load chat history, one page of days at a time (older pages are appended)
+    function loadChatHistory(before) {
+        const request = ++historyRequest;
+        const url = before ? '/api/chat/history?before=' + encodeURIComponent(before) : '/api/chat/history';
+        
+        fetch(url)
         .then(response => {
             if (!response.ok) {
                 throw new Error('Failed to load chat history');
@@ -173,8 +190,15 @@ document.addEventListener('DOMContentLoaded', function() {
             return response.json();
         })
         .then(data => {
-            // Clear current history
-            chatHistory.innerHTML = '';
+            // Ignore pages of a history that has been reloaded since
+            if (request !== historyRequest) {
+                return;
+            }
+            
+            // Clear current history, unless this is an older page
+            if (!before) {
+                chatHistory.innerHTML = '';
+            }
             
             // Group chats by date
             const chatsByDate = {};
@@ -229,8 +253,12 @@ document.addEventListener('DOMContentLoaded', function() {
                 });
             });
             
+            if (data.next_before) {
+                addLoadOlderDaysButton(data.next_before);
+            }
+            
             // If no history, add a message
-            if (data.history.length === 0) {
+            if (!before && data.history.length === 0) {
                 const noHistory = document.createElement('p');
                 noHistory.className = 'text-muted text-center small mt-3';
                 noHistory.textContent = 'No chat history yet.';
@@ -238,6 +266,9 @@ document.addEventListener('DOMContentLoaded', function() {
             }
         })
         .catch(error => {
+            if (request !== historyRequest) {
+                return;
+            }
             console.error('Error loading chat history:', error);
             const errorMsg = document.createElement('p');
             errorMsg.className = 'text-danger text-center small mt-3';
@@ -246,6 +277,25 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
+    // Function to add a button that loads the next (older) page of days
+    function addLoadOlderDaysButton(before) {
+        const button = document.createElement('button');
+        button.type = 'button';
+        button.className = 'btn btn-outline-secondary btn-sm';
+        button.textContent = 'Load older days';
+        
+        const buttonContainer = document.createElement('div');
+        buttonContainer.className = 'd-flex justify-content-center my-2';
+        buttonContainer.appendChild(button);
+        
+        button.addEventListener('click', () => {
+            buttonContainer.remove();
+            loadChatHistory(before);
+        });
+        
+        chatHistory.appendChild(buttonContainer);
+    }
+    
     // Function to update active chat in sidebar
     function updateActiveChatInSidebar(activeDate) {
         // Remove active class from all history items
@@ -258,40 +308,67 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
+    // Function to load one page of chat messages (keyset pagination)
+    function fetchChatMessagesPage(date, cursor) {
+        const url = cursor
+            ? `/api/chat/messages/${date}?cursor=${encodeURIComponent(cursor)}`
+            : `/api/chat/messages/${date}`;
+        return fetch(url).then(response => {
+            if (!response.ok) {
+                throw new Error('Failed to load chat messages');
+            }
+            return response.json();
+        });
+    }
+    
+    // Date whose messages are shown: pages that arrive after switching to another date are ignored
+    let currentMessagesDate = null;
+    
     // Function to load chat messages by date
     function loadChatMessagesByDate(date) {
         // Clear current messages
         chatMessages.innerHTML = '';
+        currentMessagesDate = date;
         
         // Show loading indicator
         showLoadingIndicator();
         
-        fetch(`/api/chat/messages/${date}`)
-        .then(response => {
-            if (!response.ok) {
-                throw new Error('Failed to load chat messages');
-            }
-            return response.json();
-        })
+        loadChatMessagesPage(date, null, 0);
+    }
+    
+    // Function to load one page of chat messages, the next page is only fetched on demand
+    function loadChatMessagesPage(date, cursor, messageCount) {
+        fetchChatMessagesPage(date, cursor)
         .then(data => {
+            if (date !== currentMessagesDate) {
+                return;
+            }
+            
             // Remove loading indicator
             removeLoadingIndicator();
             
-            if (data.messages && data.messages.length > 0) {
-                // Add messages to chat
-                data.messages.forEach(msg => {
-                    if (msg.is_from_user) {
-                        addUserMessage(msg.message);
-                    } else {
-                        addBotMessage(msg.message);
-                    }
-                });
-            } else {
+            // Add messages to chat
+            const messages = data.messages || [];
+            messages.forEach(msg => {
+                if (msg.is_from_user) {
+                    addUserMessage(msg.message);
+                } else {
+                    addBotMessage(msg.message);
+                }
+            });
+            messageCount += messages.length;
+            
+            if (data.next_cursor) {
+                addLoadMoreButton(date, data.next_cursor, messageCount);
+            } else if (messageCount === 0) {
                 // No messages found
                 addBotMessage("No messages found for this date.");
             }
         })
         .catch(error => {
+            if (date !== currentMessagesDate) {
+                return;
+            }
             console.error('Error loading chat messages:', error);
             
             // Remove loading indicator
@@ -302,6 +379,26 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
+    // Function to add a button that loads the next page of messages
+    function addLoadMoreButton(date, cursor, messageCount) {
+        const button = document.createElement('button');
+        button.type = 'button';
+        button.className = 'btn btn-outline-secondary btn-sm';
+        button.textContent = 'Load more messages';
+        
+        const buttonContainer = document.createElement('div');
+        buttonContainer.className = 'd-flex justify-content-center my-2';
+        buttonContainer.appendChild(button);
+        
+        button.addEventListener('click', () => {
+            buttonContainer.remove();
+            showLoadingIndicator();
+            loadChatMessagesPage(date, cursor, messageCount);
+        });
+        
+        chatMessages.appendChild(buttonContainer);
+    }
+    
     // Function to format date
     function formatDate(dateStr) {
         const today = new Date();